@@ -0,0 +1,137 @@
+"""Vectorized analytics over game record files
+
+Every statistic is a sum of NumPy reductions over chunks of records, so whole
+files are analysed without building Player/Team objects or replaying games.
+"""
+import numpy as np
+from bitboard import NUM_OF_CARDS
+from game_record import GameRecordReader, EMPTY
+
+CHUNK_SIZE = 1 << 18
+
+SUIT_NAMES = ("PASS", "CLUBS", "DIAMONDS", "HEARTS", "SPADES", "NOTRUMP")
+
+
+def contract_values(contracts: np.ndarray) -> np.ndarray:
+    """Bid values (1-6) of contract ranks"""
+    return (contracts.astype(np.int64) - 1) // 5 + 1
+
+
+def contract_suits(contracts: np.ndarray) -> np.ndarray:
+    """SuitsEnum values (1-5) of contract ranks"""
+    return (contracts.astype(np.int64) - 1) % 5 + 1
+
+
+def count_chunk(records: np.ndarray) -> dict:
+    """Additive counts of a chunk of records
+
+    Parameters
+    ----------
+    records : np.ndarray
+        Array of game_record.RECORD_DTYPE
+
+    Returns
+    -------
+    dict
+        Arrays of counts, summed over chunks by analyse
+    """
+    played = records["declarer"] != EMPTY
+    games = records[played]
+    num_of_games = len(games)
+
+    tricks = games["tricks"].astype(np.int64)
+    declarer = games["declarer"].astype(np.int64)
+    contract = games["contract"].astype(np.int64)
+    # Seats 0/2 are team 0, seats 1/3 are team 1
+    team_won = np.stack([tricks[:, 0] > tricks[:, 1], tricks[:, 1] > tricks[:, 0]], axis=1)
+    declarer_tricks = tricks[np.arange(num_of_games), declarer % 2]
+    made = declarer_tricks >= contract_values(contract) + 6
+
+    # Seat of every card from the deal
+    owners = np.empty((num_of_games, NUM_OF_CARDS), dtype=np.int64)
+    rows = np.arange(num_of_games)[:, None]
+    owners[rows, games["deal"].reshape(num_of_games, NUM_OF_CARDS)] = np.repeat(
+        np.arange(4), 13)
+    play = games["play"].astype(np.int64)
+    play_owners = np.take_along_axis(owners, play, axis=1)
+    won_trick = (play_owners.reshape(num_of_games, 13, 4)
+                 == games["trick_winners"][:, :, None]).reshape(num_of_games, NUM_OF_CARDS)
+
+    return {
+        "records": np.int64(len(records)),
+        "games": np.int64(num_of_games),
+        "team_won": team_won.sum(axis=0),
+        "declarer_games": np.bincount(declarer, minlength=4),
+        "declarer_made": np.bincount(declarer[made], minlength=4),
+        "contract_games": np.bincount(contract, minlength=31),
+        "contract_made": np.bincount(contract[made], minlength=31),
+        "trump_games": np.bincount(contract_suits(contract), minlength=6),
+        "card_played": np.bincount(play.ravel(), minlength=NUM_OF_CARDS),
+        "card_won": np.bincount(play[won_trick], minlength=NUM_OF_CARDS),
+    }
+
+
+def _rate(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator),
+                     where=denominator > 0)
+
+
+def analyse(source, chunk_size=CHUNK_SIZE) -> dict:
+    """Batch statistics of a game record file
+
+    Parameters
+    ----------
+    source : str | os.PathLike | GameRecordReader | np.ndarray
+        Record file, reader or array of records
+    chunk_size : int, optional
+        Number of records reduced at once, by default CHUNK_SIZE
+
+    Returns
+    -------
+    dict
+        records, games and all_pass counts,
+        win_rate_by_seat : rate of games won by the team of each seat,
+        declarer_success_by_seat : rate of contracts made per declarer seat,
+        contract_success_rate : rate of contracts made over every game,
+        contract_success : {contract rank: rate} for contracts played,
+        contract_games : {contract rank: games},
+        trump_frequencies : {suit name: rate of games},
+        card_trick_win_rate : rate of tricks won by each card index
+    """
+    if isinstance(source, np.ndarray):
+        records = source
+    elif isinstance(source, GameRecordReader):
+        records = source.records
+    else:
+        records = GameRecordReader(source).records
+
+    totals = None
+    for start in range(0, len(records), chunk_size):
+        counts = count_chunk(records[start:start + chunk_size])
+        if totals is None:
+            totals = counts
+        else:
+            totals = {name: totals[name] + counts[name] for name in totals}
+    if totals is None:
+        totals = count_chunk(records[:0])
+
+    games = int(totals["games"])
+    team_won = _rate(totals["team_won"], games)
+    contracts = np.flatnonzero(totals["contract_games"])
+    contract_success = _rate(totals["contract_made"], totals["contract_games"])
+    trump_frequencies = _rate(totals["trump_games"], games)
+    return {
+        "records": int(totals["records"]),
+        "games": games,
+        "all_pass": int(totals["records"]) - games,
+        "win_rate_by_seat": team_won[[0, 1, 0, 1]],
+        "declarer_success_by_seat": _rate(totals["declarer_made"], totals["declarer_games"]),
+        "contract_success_rate": float(_rate(totals["declarer_made"].sum(), games)),
+        "contract_success": {int(rank): float(contract_success[rank]) for rank in contracts},
+        "contract_games": {int(rank): int(totals["contract_games"][rank]) for rank in contracts},
+        "trump_frequencies": {SUIT_NAMES[suit]: float(trump_frequencies[suit])
+                              for suit in range(1, 6)},
+        "card_trick_win_rate": _rate(totals["card_won"], totals["card_played"]),
+    }
@@ -0,0 +1,128 @@
+"""Batched NumPy auction simulator
+
+Runs many auctions of trump_ai.random_AB bidders at once, with the rules of
+runner.play_game: seat 0 bids first, the auction ends after three passes in
+a row and the seat of the last pass is the declarer. Bids are handled as
+Bid ranks (0 is PASS, (value - 1) * 5 + suit otherwise).
+"""
+import numpy as np
+
+from analytics import SUIT_NAMES, contract_suits, contract_values
+from trump import BID_LADDER
+
+# Largest number of auctions drawn in one NumPy step
+BATCH_SIZE = 1 << 20
+
+NUM_OF_RANKS = len(BID_LADDER)
+
+
+def random_bids(highest: np.ndarray, rng, rate=1.0, beta=(2, 2)) -> np.ndarray:
+    """Vectorized trump_ai.random_AB over the highest bid rank of each auction
+
+    The value is the closest of 0-6 to an exponential sample and the suit
+    the closest of 1-5 to a scaled beta sample, a bid not above the highest
+    bid is a PASS.
+
+    Parameters
+    ----------
+    highest : np.ndarray
+        Rank of the highest bid of each auction
+    rng : np.random.Generator
+    rate : float, optional
+        Rate of the exponential distribution of the values, by default 1.0
+    beta : tuple, optional
+        Parameters of the beta distribution of the suits, by default (2, 2)
+
+    Returns
+    -------
+    np.ndarray
+        Rank of the bids
+    """
+    values = np.minimum(np.floor(rng.exponential(1 / rate, len(highest)) + 0.5), 6).astype(np.int64)
+    suits = np.minimum(np.floor(rng.beta(*beta, len(highest)) * 4 + 0.5), 4).astype(np.int64) + 1
+    ranks = np.where(values > 0, (values - 1) * 5 + suits, 0)
+    return np.where(ranks > highest, ranks, 0)
+
+
+def simulate_auctions(num_of_auctions: int, seed=None, rate=1.0, beta=(2, 2)) -> dict:
+    """Final contracts of many random auctions
+
+    Parameters
+    ----------
+    num_of_auctions : int
+    seed : int | None, optional
+        Seed of the NumPy Generator, by default None
+    rate : float, optional
+        See random_bids, by default 1.0
+    beta : tuple, optional
+        See random_bids, by default (2, 2)
+
+    Returns
+    -------
+    dict
+        contract : rank of the final contract of each auction (0 for all pass),
+        declarer : seat of the declarer of each auction,
+        length : number of bids of each auction
+    """
+    rng = np.random.default_rng(seed)
+    contract = np.zeros(num_of_auctions, dtype=np.int64)
+    declarer = np.zeros(num_of_auctions, dtype=np.int64)
+    length = np.zeros(num_of_auctions, dtype=np.int64)
+    for start in range(0, num_of_auctions, BATCH_SIZE):
+        stop = min(start + BATCH_SIZE, num_of_auctions)
+        # Auctions still running, their highest bid and passes in a row
+        active = np.arange(start, stop)
+        highest = np.zeros(len(active), dtype=np.int64)
+        passes = np.zeros(len(active), dtype=np.int64)
+        turn = 0
+        while len(active):
+            bids = random_bids(highest, rng, rate, beta)
+            turn += 1
+            passes = np.where(bids == 0, passes + 1, 0)
+            highest = np.maximum(highest, bids)
+            finished = passes == 3
+            ended = active[finished]
+            contract[ended] = highest[finished]
+            declarer[ended] = (turn - 1) % 4
+            length[ended] = turn
+            running = ~finished
+            active = active[running]
+            highest = highest[running]
+            passes = passes[running]
+    return {"contract": contract, "declarer": declarer, "length": length}
+
+
+def auction_statistics(num_of_auctions: int, seed=None, rate=1.0, beta=(2, 2)) -> dict:
+    """Distributions of the final contracts of random auctions
+
+    Returns
+    -------
+    dict
+        auctions and all_pass_rate,
+        contracts : {contract rank: rate} over the auctions with a contract,
+        trump_frequencies : {suit name: rate} over the auctions with a contract,
+        contract_values : rate of each contract value 1-6,
+        declarer_rates : rate of each declarer seat over the auctions with a contract,
+        length_distribution : rate of each auction length,
+        mean_length
+    """
+    auctions = simulate_auctions(num_of_auctions, seed, rate, beta)
+    contract = auctions["contract"]
+    played = contract > 0
+    num_of_contracts = max(int(played.sum()), 1)
+    contract_counts = np.bincount(contract[played], minlength=NUM_OF_RANKS)
+    suit_counts = np.bincount(contract_suits(contract[played]), minlength=6)
+    value_counts = np.bincount(contract_values(contract[played]), minlength=7)
+    lengths = np.bincount(auctions["length"])
+    return {
+        "auctions": num_of_auctions,
+        "all_pass_rate": float(1 - played.mean()) if num_of_auctions else 0.0,
+        "contracts": {int(rank): float(contract_counts[rank] / num_of_contracts)
+                      for rank in np.flatnonzero(contract_counts)},
+        "trump_frequencies": {SUIT_NAMES[suit]: float(suit_counts[suit] / num_of_contracts)
+                              for suit in range(1, 6)},
+        "contract_values": value_counts[1:] / num_of_contracts,
+        "declarer_rates": np.bincount(auctions["declarer"][played], minlength=4) / num_of_contracts,
+        "length_distribution": lengths / max(num_of_auctions, 1),
+        "mean_length": float(auctions["length"].mean()) if num_of_auctions else 0.0,
+    }
@@ -0,0 +1,300 @@
+"""Benchmark suite for the rules, the AI and full game throughput
+
+Every benchmark builds its fixtures from a fixed seed and reports the
+operations per second (best of several repeats) and, under tracemalloc,
+the peak memory of an operation and the memory it retains. Results are saved as JSON baselines and a
+later run is compared against a baseline to flag regressions.
+
+    python benchmark.py --save baseline.json
+    python benchmark.py --compare baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import logic
+import runner
+import trump_ai
+from trump import Bid, Deck, Player, SuitsEnum, PASS, CARDS
+
+SEED = 2020
+# Minimum wall time of a repeat, the number of operations is scaled to reach it
+MIN_TIME = 0.2
+REPEATS = 3
+# Relative drop of ops/sec flagged as a regression
+TOLERANCE = 0.10
+
+
+def _dealt_player(rng):
+    player = Player()
+    player.set_cards(rng.sample(CARDS, 13))
+    return player
+
+
+def bench_deck_build():
+    return Deck
+
+
+def bench_deck_shuffle():
+    deck = Deck()
+    return deck.shuffle
+
+
+def bench_deal_hands():
+    players = [Player() for _ in range(4)]
+
+    def deal():
+        deck = Deck(shuffle=True)
+        for player in players:
+            player.reset()
+            player.build_hand_from_deck(deck)
+    return deal
+
+
+def bench_playable_cards():
+    rng = random.Random(SEED)
+    players = [_dealt_player(rng) for _ in range(16)]
+    suits = list(SuitsEnum.suits_only())
+
+    def playable_cards():
+        for player in players:
+            for suit in suits:
+                player.playable_cards(suit)
+    return playable_cards
+
+
+def bench_playable_lead_cards():
+    rng = random.Random(SEED)
+    players = [_dealt_player(rng) for _ in range(16)]
+
+    def playable_lead_cards():
+        for player in players:
+            player.playable_lead_cards(trump_played=False, trump_suit=SuitsEnum.SPADES)
+            player.playable_lead_cards(trump_played=True, trump_suit=SuitsEnum.SPADES)
+    return playable_lead_cards
+
+
+def bench_compare_cards():
+    rng = random.Random(SEED)
+    tricks = [rng.sample(CARDS, 4) for _ in range(64)]
+
+    def compare_cards():
+        for trick in tricks:
+            logic.compare_cards(trick, trick[0].suit, trump_suit=SuitsEnum.HEARTS)
+    return compare_cards
+
+
+def bench_playable_bid():
+    bids = [PASS] + [Bid(value, suit) for value in range(1, 7) for suit in range(1, 6)][:-1]
+
+    def playable_bid():
+        for bid in bids:
+            logic.playable_bid(bid)
+    return playable_bid
+
+
+def bench_random_ab():
+    bids = [PASS, Bid(1, 3), Bid(3, 2), Bid(5, 5)]
+
+    def random_ab():
+        for bid in bids:
+            trump_ai.random_AB(bid)
+    return random_ab
+
+
+def _bench_monte_carlo_lp(iteration, engine="python"):
+    def setup():
+        rng = random.Random(SEED)
+        player = _dealt_player(rng)
+        return lambda: trump_ai.monte_carlo_LP(
+            player, [], trump_suit=SuitsEnum.HEARTS, iteration=iteration, engine=engine)
+    return setup
+
+
+def bench_game():
+    players = runner.generate_players()
+    teams = runner.generate_teams(players)
+
+    def game():
+        runner.play_game(players, teams)
+    return game
+
+
+# Name and fixture builder of every benchmark, the builder returns the operation to time
+BENCHMARKS = {
+    "deck_build": bench_deck_build,
+    "deck_shuffle": bench_deck_shuffle,
+    "deal_hands": bench_deal_hands,
+    "playable_cards": bench_playable_cards,
+    "playable_lead_cards": bench_playable_lead_cards,
+    "compare_cards": bench_compare_cards,
+    "playable_bid": bench_playable_bid,
+    "random_AB": bench_random_ab,
+    "monte_carlo_LP_10": _bench_monte_carlo_lp(10),
+    "monte_carlo_LP_100": _bench_monte_carlo_lp(100),
+    "monte_carlo_LP_1000": _bench_monte_carlo_lp(1000),
+    "monte_carlo_LP_1000_numpy": _bench_monte_carlo_lp(1000, engine="numpy"),
+    "monte_carlo_LP_10000_numpy": _bench_monte_carlo_lp(10000, engine="numpy"),
+    "game": bench_game,
+}
+
+
+def _timed(operation, number) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        operation()
+    return time.perf_counter() - start
+
+
+def run_benchmark(name: str, min_time=MIN_TIME, repeats=REPEATS) -> dict:
+    """Time one benchmark of BENCHMARKS
+
+    Parameters
+    ----------
+    name : str
+    min_time : float, optional
+        Minimum seconds of a repeat, by default MIN_TIME
+    repeats : int, optional
+        The best repeat is reported, by default REPEATS
+
+    Returns
+    -------
+    dict
+        ops_per_sec, number of operations per repeat, peak_bytes_per_op the
+        mean peak of the traced memory during an operation above the memory
+        traced before it, and retained_bytes_per_op and
+        retained_blocks_per_op the memory still held after the operations.
+        Memory freed and reused within an operation is only counted once in
+        the peak, tracemalloc cannot count every allocation
+    """
+    random.seed(SEED)
+    # Some rules print, keep the output out of the measurements
+    with contextlib.redirect_stdout(io.StringIO()):
+        operation = BENCHMARKS[name]()
+        # Warm up and scale the number of operations to the minimum time
+        number = 1
+        while True:
+            elapsed = _timed(operation, number)
+            if elapsed >= min_time / 10:
+                break
+            number *= 10
+        number = max(1, int(number * min_time / elapsed))
+
+        random.seed(SEED)
+        best = min(_timed(operation, number) for _ in range(repeats))
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        traced = min(number, 100)
+        peak_bytes = 0
+        for _ in range(traced):
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            operation()
+            _, peak = tracemalloc.get_traced_memory()
+            peak_bytes += peak - start
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+    # The snapshots are traced too, leave them out of the retained memory
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    retained_bytes = retained_blocks = 0
+    for stat in after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "filename"):
+        retained_bytes += max(stat.size_diff, 0)
+        retained_blocks += max(stat.count_diff, 0)
+    return {
+        "ops_per_sec": number / best,
+        "number": number,
+        "peak_bytes_per_op": peak_bytes / traced,
+        "retained_bytes_per_op": retained_bytes / traced,
+        "retained_blocks_per_op": retained_blocks / traced,
+    }
+
+
+def run_suite(names=None, min_time=MIN_TIME, repeats=REPEATS, verbose=False) -> dict:
+    """Run the benchmarks, every one of BENCHMARKS by default
+
+    Returns
+    -------
+    dict
+        Machine information and the results of run_benchmark by name
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            raise ValueError("Unknown benchmark {}".format(name))
+        results[name] = run_benchmark(name, min_time, repeats)
+        if verbose:
+            result = results[name]
+            print("{:<28}{:>14,.1f} ops/s{:>12,.0f} peak B/op{:>10,.1f} retained B/op{:>8,.2f} blocks/op".format(
+                name, result["ops_per_sec"], result["peak_bytes_per_op"], result["retained_bytes_per_op"],
+                result["retained_blocks_per_op"]))
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": SEED,
+        "results": results,
+    }
+
+
+def save_baseline(suite: dict, path):
+    with open(path, "w") as f:
+        json.dump(suite, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(suite: dict, baseline: dict, tolerance=TOLERANCE) -> list:
+    """Benchmarks slower than the baseline by more than tolerance
+
+    Returns
+    -------
+    list
+        (name, baseline ops/sec, ops/sec, relative change) of each regression
+    """
+    regressions = []
+    for name, result in suite["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["ops_per_sec"]
+        after = result["ops_per_sec"]
+        change = after / before - 1
+        if change < -tolerance:
+            regressions.append((name, before, after, change))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("names", nargs="*", help="benchmarks to run, by default all of them")
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="JSON baseline to flag regressions against")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    args = parser.parse_args(argv)
+
+    suite = run_suite(args.names, args.min_time, args.repeats, verbose=True)
+    if args.save:
+        save_baseline(suite, args.save)
+    if args.compare:
+        regressions = compare(suite, load_baseline(args.compare), args.tolerance)
+        for name, before, after, change in regressions:
+            print("REGRESSION {}: {:,.1f} -> {:,.1f} ops/s ({:+.1%})".format(
+                name, before, after, change))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Bitboard representation of cards
+
+A card is encoded as a single bit index in a 52-bit integer:
+
+    index = (suit - 1) * 13 + (pip - 2)
+
+so CLUBS occupy bits 0-12, DIAMONDS 13-25, HEARTS 26-38 and SPADES 39-51.
+Inside a suit a higher pip is always a higher bit, which means the winner of a
+set of cards of one suit is simply its highest set bit.
+
+Hands, the deck and the cards played are all plain ints built from these bits.
+"""
+import random
+
+NUM_OF_CARDS = 52
+CARDS_PER_SUIT = 13
+
+FULL_MASK = (1 << NUM_OF_CARDS) - 1
+
+# Indexed by SuitsEnum value, PASS (0) and NOTRUMP (5) have no cards
+SUIT_MASKS = (
+    0,
+    0x1FFF,
+    0x1FFF << 13,
+    0x1FFF << 26,
+    0x1FFF << 39,
+    0,
+)
+
+
+def card_index(suit: int, pip: int) -> int:
+    """Bit index of a card given its suit and pip value
+
+    Parameters
+    ----------
+    suit : int | SuitsEnum
+        Suit value from 1-4
+    pip : int | PipsEnum
+        Pip value from 2-14
+
+    Returns
+    -------
+    int
+    """
+    return (suit - 1) * CARDS_PER_SUIT + (pip - 2)
+
+
+def suit_of(index: int) -> int:
+    """Suit value (1-4) of a card index"""
+    return index // CARDS_PER_SUIT + 1
+
+
+def pip_of(index: int) -> int:
+    """Pip value (2-14) of a card index"""
+    return index % CARDS_PER_SUIT + 2
+
+
+def mask_of(cards) -> int:
+    """Build a mask from an iterable of Card objects
+
+    Parameters
+    ----------
+    cards : iterable of Card
+
+    Returns
+    -------
+    int
+    """
+    mask = 0
+    for card in cards:
+        mask |= 1 << card.index
+    return mask
+
+
+def mask_from_indices(indices) -> int:
+    """Build a mask from an iterable of card indices"""
+    mask = 0
+    for index in indices:
+        mask |= 1 << index
+    return mask
+
+
+def indices(mask: int) -> list:
+    """List the card indices of a mask from the lowest to the highest bit
+
+    Parameters
+    ----------
+    mask : int
+
+    Returns
+    -------
+    list
+        list of int
+    """
+    result = []
+    while mask:
+        low = mask & -mask
+        result.append(low.bit_length() - 1)
+        mask ^= low
+    return result
+
+
+def available_suits(mask: int) -> set:
+    """Set of suit values (1-4) present in a mask"""
+    return {suit for suit in range(1, 5) if mask & SUIT_MASKS[suit]}
+
+
+def is_void(mask: int) -> bool:
+    """Check if a mask has no card of at least one suit"""
+    return not (mask & SUIT_MASKS[1] and mask & SUIT_MASKS[2]
+                and mask & SUIT_MASKS[3] and mask & SUIT_MASKS[4])
+
+
+def playable(mask: int, suit: int) -> int:
+    """Legal cards of a hand in a defending position
+
+    Parameters
+    ----------
+    mask : int
+        Hand mask
+    suit : int | SuitsEnum
+        The suit called by the leading player
+
+    Returns
+    -------
+    int
+        Mask of the cards following suit, or the whole hand when void in suit
+    """
+    legal = mask & SUIT_MASKS[suit]
+    return legal if legal else mask
+
+
+def playable_lead(mask: int, trump_played=False, trump_suit=None) -> int:
+    """Legal cards of a hand in a leading position
+
+    Trump suit cards cannot be led until a trump has been played, unless the
+    hand holds nothing else.
+
+    Parameters
+    ----------
+    mask : int
+        Hand mask
+    trump_played : bool, optional, by default False
+    trump_suit : int | SuitsEnum | None, optional, by default None
+
+    Returns
+    -------
+    int
+    """
+    if trump_played or not trump_suit:
+        return mask
+    legal = mask & ~SUIT_MASKS[trump_suit]
+    return legal if legal else mask
+
+
+def winner(trick: int, suit_call: int, trump_suit=None) -> int:
+    """Index of the winning card of a trick
+
+    Parameters
+    ----------
+    trick : int
+        Mask of the cards in the trick
+    suit_call : int | SuitsEnum
+        The suit called by the leading player
+    trump_suit : int | SuitsEnum | None, optional, by default None
+
+    Returns
+    -------
+    int
+        Index of the winning card, -1 if no card follows the suit call
+    """
+    if trump_suit:
+        trumps = trick & SUIT_MASKS[trump_suit]
+        if trumps:
+            return trumps.bit_length() - 1
+    return (trick & SUIT_MASKS[suit_call]).bit_length() - 1
+
+
+def random_card(mask: int, rng=random) -> int:
+    """Pick the index of a random card from a non-empty mask
+
+    Parameters
+    ----------
+    mask : int
+    rng : random.Random, optional
+        Random source, by default the random module
+
+    Returns
+    -------
+    int
+    """
+    n = rng.randrange(mask.bit_count())
+    for _ in range(n):
+        mask &= mask - 1
+    return (mask & -mask).bit_length() - 1
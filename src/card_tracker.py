@@ -0,0 +1,263 @@
+"""Card location tracking and constraint aware dealing
+
+The tracker keeps, for every seat, the mask of the cards the seat may still
+hold. The dealer samples deals of the unseen cards uniformly among the deals
+consistent with those masks, without rejection.
+"""
+import random
+from bisect import bisect_right
+from itertools import accumulate
+from math import comb
+
+import bitboard
+from bitboard import FULL_MASK, SUIT_MASKS
+
+
+class CardTracker:
+
+    def __init__(self, players: list, num_of_cards=13):
+        """Track the possible holdings of every player of a game
+
+        Parameters
+        ----------
+        players : list
+            list of 4 players (Player Object) indexed by seat
+        num_of_cards : int, optional
+            Cards dealt to each player, by default 13
+        """
+        self._seats = {id(player): seat for seat, player in enumerate(players)}
+        self._possible = [FULL_MASK] * len(players)
+        self._counts = [num_of_cards] * len(players)
+        self._played = 0
+
+    def seat(self, player) -> int:
+        return self._seats[id(player)]
+
+    @property
+    def played(self) -> int:
+        """Mask of the cards played"""
+        return self._played
+
+    def possible(self, seat: int) -> int:
+        """Mask of the cards a seat may hold"""
+        return self._possible[seat]
+
+    def count(self, seat: int) -> int:
+        """Number of cards held by a seat"""
+        return self._counts[seat]
+
+    def void_suits(self, seat: int) -> set:
+        """Suits a seat is known to be void in"""
+        return {suit for suit in range(1, 5)
+                if not self._possible[seat] & SUIT_MASKS[suit]}
+
+    def observe_play(self, player, card, suit_call=None):
+        """Update the tracker after Player.play
+
+        Parameters
+        ----------
+        player : Player
+        card : Card
+        suit_call : SuitsEnum | None, optional
+            The suit called by the leading player, None for the lead
+        """
+        seat = self._seats[id(player)]
+        not_card = ~(1 << card.index)
+        possible = self._possible
+        possible[0] &= not_card
+        possible[1] &= not_card
+        possible[2] &= not_card
+        possible[3] &= not_card
+        # A player who does not follow suit is void in the suit call
+        if suit_call and card.suit != suit_call:
+            possible[seat] &= ~SUIT_MASKS[suit_call]
+        self._counts[seat] -= 1
+        self._played |= 1 << card.index
+
+
+class ConstraintDealer:
+
+    def __init__(self, possible: list, counts: list):
+        """Uniform sampler of deals consistent with the possible holdings
+
+        Cards with the same set of possible seats are exchangeable, so the
+        number of consistent deals is counted class by class over the
+        remaining hand capacities, and a deal is drawn by walking the classes
+        with probabilities proportional to those counts.
+
+        Parameters
+        ----------
+        possible : list
+            Mask of the cards each hidden seat may hold
+        counts : list
+            Number of cards to deal to each hidden seat
+
+        Raises
+        ------
+        ValueError
+            When no deal satisfies the constraints
+        """
+        self._counts = tuple(counts)
+        cards = 0
+        for mask in possible:
+            cards |= mask
+        # Group the cards by the seats that may hold them
+        classes = {}
+        for card in bitboard.indices(cards):
+            seats = tuple(seat for seat, mask in enumerate(possible) if mask >> card & 1)
+            classes.setdefault(seats, []).append(card)
+        self._classes = list(classes.items())
+        self._ways = {}
+        self._split_tables = {}
+        if self._num_of_ways(0, self._counts) == 0:
+            raise ValueError("No deal is consistent with the tracked cards")
+
+    @property
+    def counts(self) -> tuple:
+        """Number of cards dealt to each hidden seat"""
+        return self._counts
+
+    @classmethod
+    def from_tracker(cls, tracker: CardTracker, observer):
+        """Dealer of the hidden hands seen from the observer
+
+        Parameters
+        ----------
+        tracker : CardTracker
+        observer : Player
+            Player whose own cards are known
+
+        Returns
+        -------
+        tuple
+            ConstraintDealer and the list of hidden seats it deals to,
+            clockwise from the observer
+        """
+        observer_seat = tracker.seat(observer)
+        unseen = FULL_MASK & ~(tracker.played | observer.mask)
+        seats = [(observer_seat + offset) % 4 for offset in range(1, 4)]
+        dealer = cls([tracker.possible(seat) & unseen for seat in seats],
+                     [tracker.count(seat) for seat in seats])
+        return dealer, seats
+
+    def _compositions(self, num_of_cards, seats, capacities):
+        """Every split of num_of_cards over seats within capacities"""
+        if len(seats) == 1:
+            if num_of_cards <= capacities[seats[0]]:
+                yield (num_of_cards,)
+            return
+        for first in range(min(num_of_cards, capacities[seats[0]]) + 1):
+            for rest in self._compositions(num_of_cards - first, seats[1:], capacities):
+                yield (first,) + rest
+
+    def _num_of_ways(self, class_index, capacities) -> int:
+        """Number of deals of the classes from class_index filling capacities"""
+        if class_index == len(self._classes):
+            return 1 if not any(capacities) else 0
+        key = (class_index, capacities)
+        ways = self._ways.get(key)
+        if ways is None:
+            ways = 0
+            for split, weight in self._splits(class_index, capacities):
+                ways += weight
+            self._ways[key] = ways
+        return ways
+
+    def _split_table(self, class_index, capacities) -> tuple:
+        """Splits of a class and their cumulative number of deals, cached"""
+        key = (class_index, capacities)
+        table = self._split_tables.get(key)
+        if table is None:
+            splits = list(self._splits(class_index, capacities))
+            table = ([split for split, _ in splits],
+                     list(accumulate(weight for _, weight in splits)))
+            self._split_tables[key] = table
+        return table
+
+    def _splits(self, class_index, capacities):
+        """Splits of a class with the number of deals each one leads to"""
+        seats, cards = self._classes[class_index]
+        for split in self._compositions(len(cards), seats, capacities):
+            remaining = list(capacities)
+            multinomial = 1
+            left = len(cards)
+            for seat, num_of_cards in zip(seats, split):
+                remaining[seat] -= num_of_cards
+                multinomial *= comb(left, num_of_cards)
+                left -= num_of_cards
+            remaining = tuple(remaining)
+            weight = multinomial * self._num_of_ways(class_index + 1, remaining)
+            if weight:
+                yield split, weight
+
+    def sample_batch(self, num_of_deals: int, rng):
+        """Draw many consistent deals at once with NumPy
+
+        Every deal gets the same distribution as sample: the split of each
+        class is drawn for all the deals sharing the same capacities left,
+        and the cards of the class are shuffled and handed out in seat order.
+
+        Parameters
+        ----------
+        num_of_deals : int
+        rng : np.random.Generator
+
+        Returns
+        -------
+        np.ndarray
+            Hidden seat holding each card in every deal, -1 for the cards
+            not dealt, int8 of shape (num_of_deals, 52)
+        """
+        import numpy as np
+        owners = np.full((num_of_deals, bitboard.NUM_OF_CARDS), -1, dtype=np.int8)
+        capacities = np.tile(np.array(self._counts, dtype=np.int64), (num_of_deals, 1))
+        rows = np.arange(num_of_deals)[:, None]
+        for class_index, (seats, cards) in enumerate(self._classes):
+            splits = np.empty((num_of_deals, len(seats)), dtype=np.int64)
+            # Group the deals by their capacities left, packed 6 bits per seat
+            packed = (capacities << (6 * np.arange(len(self._counts)))).sum(axis=1)
+            groups, first, inverse = np.unique(packed, return_index=True, return_inverse=True)
+            for group in range(len(groups)):
+                in_group = np.flatnonzero(inverse == group) if len(groups) > 1 else rows[:, 0]
+                group_splits, cumulative_ways = self._split_table(
+                    class_index, tuple(int(capacity) for capacity in capacities[first[group]]))
+                # Same choice as bisect_right over the cumulative number of deals
+                bounds = np.array([ways / cumulative_ways[-1] for ways in cumulative_ways])
+                choice = np.searchsorted(bounds, rng.random(len(in_group)), side="right")
+                splits[in_group] = np.array(group_splits)[np.minimum(choice, len(group_splits) - 1)]
+            shuffled = np.array(cards)[rng.random((num_of_deals, len(cards))).argsort(axis=1)]
+            # Seat of each position of the shuffled cards
+            ends = splits.cumsum(axis=1)
+            positions = np.arange(len(cards))[None, :, None]
+            owners[rows, shuffled] = np.array(seats)[(positions >= ends[:, None, :]).sum(axis=2)]
+            capacities[:, list(seats)] -= splits
+        return owners
+
+    def sample(self, rng=random) -> list:
+        """Draw a consistent deal
+
+        Parameters
+        ----------
+        rng : random.Random, optional, by default the random module
+
+        Returns
+        -------
+        list
+            Hand mask of each hidden seat
+        """
+        hands = [0] * len(self._counts)
+        capacities = self._counts
+        for class_index, (seats, cards) in enumerate(self._classes):
+            splits, cumulative_ways = self._split_table(class_index, capacities)
+            split = splits[bisect_right(
+                cumulative_ways, rng.randrange(cumulative_ways[-1]))]
+            shuffled = rng.sample(cards, len(cards))
+            start = 0
+            remaining = list(capacities)
+            for seat, num_of_cards in zip(seats, split):
+                for card in shuffled[start:start + num_of_cards]:
+                    hands[seat] |= 1 << card
+                start += num_of_cards
+                remaining[seat] -= num_of_cards
+            capacities = tuple(remaining)
+        return hands
@@ -0,0 +1,313 @@
+"""Double dummy solver
+
+Perfect information alpha-beta search over the trick play, with the rules of
+the game: players follow the suit call when they can, and the trump suit
+cannot be led until a trump card has been played (unless only trumps remain).
+
+Hands are bitboard masks (see bitboard.py), seats go clockwise from 0 to 3 and
+seats 0/2 play against seats 1/3. Results are tricks won by the 0/2 side,
+converted to the declarer's side by solve and solve_table.
+
+The search is pure Python: a strain and declarer take about 0.1s with 8
+cards per hand and 0.5s with 9, and every card more multiplies that by
+about 5, so a full 13 card deal takes minutes. It is meant for endings and
+offline analysis, not for decisions at the table.
+"""
+import bitboard
+from bitboard import SUIT_MASKS, CARDS_PER_SUIT
+from transposition import TranspositionTable, suit_pattern
+
+
+def canonical_key(hands, leader: int, trump_played: bool) -> tuple:
+    """Hashable key of a position at the start of a trick
+
+    Ranks are relative to the cards that remain, so positions which only
+    differ by already played cards share the same key.
+    """
+    h0, h1, h2, h3 = hands
+    return (suit_pattern((h0 & 0x1FFF, h1 & 0x1FFF, h2 & 0x1FFF, h3 & 0x1FFF)),
+            suit_pattern((h0 >> 13 & 0x1FFF, h1 >> 13 & 0x1FFF,
+                           h2 >> 13 & 0x1FFF, h3 >> 13 & 0x1FFF)),
+            suit_pattern((h0 >> 26 & 0x1FFF, h1 >> 26 & 0x1FFF,
+                           h2 >> 26 & 0x1FFF, h3 >> 26 & 0x1FFF)),
+            suit_pattern((h0 >> 39, h1 >> 39, h2 >> 39, h3 >> 39)),
+            leader, trump_played)
+
+
+class DoubleDummySolver:
+
+    def __init__(self, trump_suit=None, table=None, max_size=1_000_000, policy="lru"):
+        """Double dummy solver for a given trump suit
+
+        Parameters
+        ----------
+        trump_suit : SuitsEnum | int | None, optional
+            None or SuitsEnum.NOTRUMP for a no trump game, by default None
+        table : TranspositionTable, optional
+            Transposition table of canonical_key -> (lower, upper) bounds on
+            the tricks won by seats 0/2, shared between searches of the same
+            trump suit, by default a new table
+        max_size : int, optional
+            Size of the new table, by default 1_000_000
+        policy : str, optional
+            Eviction policy of the new table, lru/depth, by default "lru"
+        """
+        self._trump_suit = trump_suit
+        self._trump_mask = SUIT_MASKS[trump_suit] if trump_suit else 0
+        if table is None:
+            table = TranspositionTable(max_size=max_size, policy=policy)
+        self._table = table
+        self.nodes = 0
+
+    @property
+    def table(self):
+        return self._table
+
+    def tricks(self, hands, leader: int, trump_played=False) -> int:
+        """Maximum number of remaining tricks won by seats 0/2
+
+        Parameters
+        ----------
+        hands : list
+            4 hand masks of equal size, indexed by seat
+        leader : int
+            Seat leading the next trick
+        trump_played : bool, optional, by default False
+
+        Returns
+        -------
+        int
+        """
+        hands = list(hands)
+        lower = 0
+        upper = hands[leader].bit_count()
+        # Binary search over null window searches
+        while lower < upper:
+            target = (lower + upper + 1) // 2
+            if self._search(hands, leader, trump_played, target):
+                lower = target
+            else:
+                upper = target - 1
+        return lower
+
+    def _search(self, hands, leader, trump_played, target) -> bool:
+        """Can seats 0/2 win at least target of the remaining tricks"""
+        if target <= 0:
+            return True
+        num_of_tricks = hands[leader].bit_count()
+        if target > num_of_tricks:
+            return False
+
+        key = canonical_key(hands, leader, trump_played)
+        bounds = self._table.get(key)
+        if bounds is None:
+            # Tricks the leader can cash bound the result from one side
+            quick_tricks = self._quick_tricks(hands, leader, trump_played)
+            lower = self._trump_tricks(hands, 0)
+            upper = num_of_tricks - self._trump_tricks(hands, 1)
+            if leader % 2 == 0:
+                lower = max(lower, quick_tricks)
+            else:
+                upper = min(upper, num_of_tricks - quick_tricks)
+            bounds = (lower, upper)
+        lower, upper = bounds
+        if lower >= target:
+            self._table.store(key, bounds, num_of_tricks)
+            return True
+        if upper < target:
+            self._table.store(key, bounds, num_of_tricks)
+            return False
+
+        remaining = hands[0] | hands[1] | hands[2] | hands[3]
+        result = self._play(hands, leader, trump_played, target,
+                            remaining, 0, 0, -1, -1)
+        if result:
+            lower = target
+        else:
+            upper = target - 1
+        self._table.store(key, (lower, upper), num_of_tricks)
+        return result
+
+    def _play(self, hands, leader, trump_played, target, remaining,
+              position, suit_call, winning_card, winning_seat) -> bool:
+        """Search the play of the card at position in the current trick"""
+        self.nodes += 1
+        seat = (leader + position) % 4
+        hand = hands[seat]
+        if position == 0:
+            legal = bitboard.playable_lead(
+                hand, trump_played, self._trump_suit)
+        else:
+            legal = bitboard.playable(hand, suit_call)
+        maximizing = seat % 2 == 0
+        partner_winning = position > 0 and (winning_seat - seat) % 2 == 0
+
+        for card in self._ordered_moves(legal, remaining, winning_card,
+                                        partner_winning):
+            hands[seat] = hand ^ (1 << card)
+            if position == 0:
+                result = self._play(hands, leader, trump_played, target, remaining,
+                                    1, card // CARDS_PER_SUIT + 1, card, seat)
+            else:
+                if self._beats(card, winning_card):
+                    card_won, seat_won = card, seat
+                else:
+                    card_won, seat_won = winning_card, winning_seat
+                if position == 3:
+                    result = self._search(
+                        hands, seat_won,
+                        trump_played or bool((1 << card_won) & self._trump_mask),
+                        target - (seat_won % 2 == 0))
+                else:
+                    result = self._play(hands, leader, trump_played, target, remaining,
+                                        position + 1, suit_call, card_won, seat_won)
+            hands[seat] = hand
+            if result == maximizing:
+                return result
+        return not maximizing
+
+    def _quick_tricks(self, hands, leader, trump_played) -> int:
+        """Tricks the leader wins by leading the top cards of their suits
+
+        A non trump suit only counts the rounds every other player follows,
+        unless that player holds no trump to ruff with.
+        """
+        hand = hands[leader]
+        remaining = hands[0] | hands[1] | hands[2] | hands[3]
+        trump_mask = self._trump_mask
+        quick_tricks = 0
+        for suit in range(1, 5):
+            suit_mask = SUIT_MASKS[suit]
+            if suit_mask == trump_mask and not trump_played:
+                continue
+            suit_remaining = remaining & suit_mask
+            # Count the top remaining cards of the suit held by the leader
+            top_run = 0
+            while suit_remaining:
+                top = suit_remaining.bit_length() - 1
+                if not hand >> top & 1:
+                    break
+                top_run += 1
+                suit_remaining ^= 1 << top
+            if top_run and trump_mask and suit_mask != trump_mask:
+                for seat in range(4):
+                    if seat != leader and hands[seat] & trump_mask:
+                        top_run = min(top_run, (hands[seat] & suit_mask).bit_count())
+            quick_tricks += top_run
+        return quick_tricks
+
+    def _trump_tricks(self, hands, side: int) -> int:
+        """Tricks a side is sure to win with the top trumps
+
+        Every card is played before the end of the hand and the highest
+        remaining trump always wins its trick, so each top trump of a single
+        player is a sure trick.
+        """
+        trump_mask = self._trump_mask
+        if not trump_mask:
+            return 0
+        first, second = hands[side] & trump_mask, hands[side + 2] & trump_mask
+        trumps = (hands[0] | hands[1] | hands[2] | hands[3]) & trump_mask
+        first_tricks = second_tricks = 0
+        while trumps:
+            top = 1 << trumps.bit_length() - 1
+            if first & top:
+                first_tricks += 1
+            elif second & top:
+                second_tricks += 1
+            else:
+                break
+            trumps ^= top
+        return max(first_tricks, second_tricks)
+
+    def _beats(self, card: int, winning_card: int) -> bool:
+        """Check if card beats the card currently winning the trick"""
+        if card // CARDS_PER_SUIT == winning_card // CARDS_PER_SUIT:
+            return card > winning_card
+        return bool((1 << card) & self._trump_mask)
+
+    def _ordered_moves(self, legal, remaining, winning_card, partner_winning) -> list:
+        """One card of each group of equivalent legal cards, best guesses first
+
+        Cards of a hand are equivalent when no remaining card of another hand
+        (or of the current trick) ranks between them. The highest card of each
+        group is kept.
+        """
+        moves = []
+        for suit in range(1, 5):
+            suit_legal = legal & SUIT_MASKS[suit]
+            if not suit_legal:
+                continue
+            suit_remaining = remaining & SUIT_MASKS[suit]
+            in_sequence = False
+            while suit_remaining:
+                top = suit_remaining.bit_length() - 1
+                suit_remaining ^= 1 << top
+                if suit_legal >> top & 1:
+                    if not in_sequence:
+                        moves.append(top)
+                    in_sequence = True
+                else:
+                    in_sequence = False
+
+        if winning_card < 0:
+            # Leading, try the highest cards first
+            moves.sort(key=lambda card: -(card % CARDS_PER_SUIT))
+        elif partner_winning:
+            # Partner wins the trick, try to give the cheapest card
+            moves.sort(key=lambda card: card % CARDS_PER_SUIT)
+        else:
+            # Try the cheapest card beating the trick, then the cheapest loser
+            moves.sort(key=lambda card: (not self._beats(card, winning_card),
+                                         card % CARDS_PER_SUIT))
+        return moves
+
+
+def solve(hands, declarer: int, trump_suit=None, solver=None) -> int:
+    """Maximum tricks won by the declarer's side when the declarer leads the first trick
+
+    Parameters
+    ----------
+    hands : list
+        4 hand masks of equal size, indexed by seat
+    declarer : int
+        Seat of the declarer
+    trump_suit : SuitsEnum | int | None, optional, by default None
+    solver : DoubleDummySolver, optional
+        Solver to reuse for the same trump suit, by default a new solver
+
+    Returns
+    -------
+    int
+    """
+    if solver is None:
+        solver = DoubleDummySolver(trump_suit)
+    tricks = solver.tricks(hands, declarer)
+    if declarer % 2 == 0:
+        return tricks
+    return hands[declarer].bit_count() - tricks
+
+
+def solve_table(hands, strains=(1, 2, 3, 4, 5)) -> dict:
+    """Double dummy table of the maximum tricks per strain and declarer
+
+    Parameters
+    ----------
+    hands : list
+        4 hand masks of equal size, indexed by seat
+    strains : iterable, optional
+        Trump suits to solve, SuitsEnum values 1-4 or 5 for NOTRUMP,
+        by default all of them
+
+    Returns
+    -------
+    dict
+        strain -> list of tricks indexed by declarer seat
+    """
+    table = {}
+    for strain in strains:
+        # The transposition table is shared by the four declarers of a strain
+        solver = DoubleDummySolver(strain)
+        table[strain] = [solve(hands, declarer, strain, solver)
+                         for declarer in range(4)]
+    return table
@@ -0,0 +1,208 @@
+"""Compact append-only binary game records
+
+A record file is a 16 byte header followed by fixed size records of
+RECORD_DTYPE. Cards are stored as bitboard indices (see bitboard.py), bids as
+Bid ranks (0 is PASS) and players as seats 0-3, seat 0 being the watched
+player. Unused slots are filled with EMPTY.
+
+The reader memory-maps the file, so columns are NumPy views over the records
+on disk and nothing is parsed or loaded into Python objects.
+"""
+import os
+import struct
+import numpy as np
+
+MAGIC = b"TCGR"
+VERSION = 1
+HEADER = struct.Struct("<4sII4x")
+HEADER_SIZE = HEADER.size
+
+EMPTY = 255
+
+# 30 bids at most, each after up to 2 passes, and the 3 final passes
+MAX_BIDS = 96
+
+RECORD_DTYPE = np.dtype([
+    ("deal", np.uint8, (4, 13)),
+    ("first_bidder", np.uint8),
+    ("num_of_bids", np.uint8),
+    ("bids", np.uint8, (MAX_BIDS,)),
+    ("declarer", np.uint8),
+    ("contract", np.uint8),
+    ("play", np.uint8, (52,)),
+    ("trick_winners", np.uint8, (13,)),
+    ("tricks", np.uint8, (2,)),
+    ("won", np.uint8),
+])
+
+RECORD_SIZE = RECORD_DTYPE.itemsize
+
+
+def empty_records(num_of_records: int) -> np.ndarray:
+    """Array of records with every slot set to EMPTY"""
+    records = np.empty(num_of_records, dtype=RECORD_DTYPE)
+    records.view(np.uint8)[:] = EMPTY
+    records["num_of_bids"] = 0
+    records["tricks"] = 0
+    records["won"] = 0
+    return records
+
+
+def fill_record(record, hands, first_bidder, bids, declarer=None, contract=None,
+                play=(), trick_winners=(), tricks=(0, 0), won=False):
+    """Write a game into a record in place
+
+    Parameters
+    ----------
+    record : np.void
+        A row of an array of RECORD_DTYPE, e.g. records[i]
+    hands : list
+        4 hand masks as dealt, indexed by seat
+    first_bidder : int
+        Seat of the first player of the auction
+    bids : list
+        Ranks of the bids in auction order
+    declarer : int | None, optional
+        Seat of the declarer, None when every player passed
+    contract : int | None, optional
+        Rank of the contract
+    play : list, optional
+        Card indices in play order
+    trick_winners : list, optional
+        Seat winning each trick
+    tricks : tuple, optional
+        Tricks won by seats 0/2 and by seats 1/3
+    won : bool, optional
+        The watched player's team won the game
+    """
+    for seat, hand in enumerate(hands):
+        cards = []
+        while hand:
+            low = hand & -hand
+            cards.append(low.bit_length() - 1)
+            hand ^= low
+        record["deal"][seat, :len(cards)] = cards
+    record["first_bidder"] = first_bidder
+    record["num_of_bids"] = len(bids)
+    record["bids"][:len(bids)] = bids
+    if declarer is not None:
+        record["declarer"] = declarer
+        record["contract"] = contract
+    record["play"][:len(play)] = play
+    record["trick_winners"][:len(trick_winners)] = trick_winners
+    record["tricks"] = tricks
+    record["won"] = won
+
+
+def _read_header(file):
+    magic, version, record_size = HEADER.unpack(file.read(HEADER_SIZE))
+    if magic != MAGIC:
+        raise ValueError("Not a game record file")
+    if version != VERSION or record_size != RECORD_SIZE:
+        raise ValueError(
+            f"Unsupported game record version {version} of record size {record_size}")
+
+
+class GameRecordWriter:
+
+    def __init__(self, path, buffer_size=4096):
+        """Append game records to a file
+
+        Records are buffered and written in blocks of buffer_size, the file is
+        created with its header when missing.
+
+        Parameters
+        ----------
+        path : str | os.PathLike
+        buffer_size : int, optional
+            Number of records kept in memory before writing, by default 4096
+        """
+        self._path = path
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as file:
+                _read_header(file)
+            self._file = open(path, "ab")
+        else:
+            self._file = open(path, "wb")
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE))
+        self._buffer = empty_records(buffer_size)
+        self._buffered = 0
+        self.num_of_records = 0
+
+    def next_record(self):
+        """Next free record of the buffer, to fill with fill_record
+
+        Returns
+        -------
+        np.void
+        """
+        if self._buffered == len(self._buffer):
+            self.flush()
+        record = self._buffer[self._buffered]
+        self._buffered += 1
+        self.num_of_records += 1
+        return record
+
+    def write_game(self, *args, **kwargs):
+        """Append a game, takes the arguments of fill_record after the record"""
+        fill_record(self.next_record(), *args, **kwargs)
+
+    def write_records(self, records: np.ndarray):
+        """Append an array of RECORD_DTYPE"""
+        self.flush()
+        self._file.write(np.ascontiguousarray(records, dtype=RECORD_DTYPE).tobytes())
+        self.num_of_records += len(records)
+
+    def flush(self):
+        """Write the buffered records to the file"""
+        if self._buffered:
+            self._file.write(self._buffer[:self._buffered].tobytes())
+            self._buffer = empty_records(len(self._buffer))
+            self._buffered = 0
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class GameRecordReader:
+
+    def __init__(self, path):
+        """Memory-mapped read only view of a game record file
+
+        Parameters
+        ----------
+        path : str | os.PathLike
+        """
+        with open(path, "rb") as file:
+            _read_header(file)
+        num_of_records = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+        if num_of_records:
+            self._records = np.memmap(path, dtype=RECORD_DTYPE, mode="r",
+                                      offset=HEADER_SIZE, shape=(num_of_records,))
+        else:
+            self._records = np.empty(0, dtype=RECORD_DTYPE)
+
+    @property
+    def records(self) -> np.ndarray:
+        """Structured array of every record"""
+        return self._records
+
+    @property
+    def columns(self) -> tuple:
+        return RECORD_DTYPE.names
+
+    def __getitem__(self, column) -> np.ndarray:
+        """Column of every record as a view, e.g. reader["deal"]"""
+        return self._records[column]
+
+    def __len__(self) -> int:
+        return len(self._records)
@@ -0,0 +1,166 @@
+"""Table driven hand evaluation features
+
+Every feature of a suit holding is read from a table indexed by the 13-bit
+mask of the holding (bit 0 is the TWO, bit 12 the ACE), so the features of
+a hand are 4 table lookups per feature whatever the hand. batch_features
+evaluates arrays of hand masks with the same tables in NumPy.
+"""
+from collections import namedtuple
+
+from bitboard import CARDS_PER_SUIT
+
+HOLDINGS = 1 << CARDS_PER_SUIT
+HOLDING_MASK = HOLDINGS - 1
+
+ACE, KING, QUEEN, JACK = 12, 11, 10, 9
+# Milton Work honour points
+HONOUR_POINTS = {ACE: 4, KING: 3, QUEEN: 2, JACK: 1}
+
+HandFeatures = namedtuple(
+    "HandFeatures", ["lengths", "hcp", "suit_hcp", "stoppers", "quick_tricks", "longest_suit"])
+
+
+def _has(holding, pip):
+    return holding >> pip & 1
+
+
+def _stopper(holding, length) -> bool:
+    """A, Kx, Qxx or Jxxx stops the suit"""
+    return bool(_has(holding, ACE) or (_has(holding, KING) and length >= 2)
+                or (_has(holding, QUEEN) and length >= 3) or (_has(holding, JACK) and length >= 4))
+
+
+def _quick_tricks(holding) -> float:
+    """AK = 2, AQ = 1.5, A = 1, KQ = 1, Kx = 0.5"""
+    ace, king, queen = _has(holding, ACE), _has(holding, KING), _has(holding, QUEEN)
+    if ace:
+        return 2.0 if king else 1.5 if queen else 1.0
+    if king:
+        return 1.0 if queen else 0.5 if holding.bit_count() >= 2 else 0.0
+    return 0.0
+
+
+# Create the lookup tables of every suit holding
+SUIT_LENGTH = tuple(holding.bit_count() for holding in range(HOLDINGS))
+SUIT_HCP = tuple(sum(points for pip, points in HONOUR_POINTS.items() if _has(holding, pip))
+                 for holding in range(HOLDINGS))
+SUIT_STOPPER = tuple(_stopper(holding, SUIT_LENGTH[holding]) for holding in range(HOLDINGS))
+SUIT_QUICK_TRICKS = tuple(_quick_tricks(holding) for holding in range(HOLDINGS))
+
+
+def holdings(mask: int) -> tuple:
+    """13-bit holding of each suit (CLUBS, DIAMONDS, HEARTS, SPADES) of a hand mask"""
+    return (mask & HOLDING_MASK, mask >> 13 & HOLDING_MASK,
+            mask >> 26 & HOLDING_MASK, mask >> 39 & HOLDING_MASK)
+
+
+def hand_features(mask: int) -> HandFeatures:
+    """Features of a hand from its bitboard mask, e.g. Player.mask
+
+    Parameters
+    ----------
+    mask : int
+
+    Returns
+    -------
+    HandFeatures
+        lengths, suit_hcp and stoppers per suit (CLUBS to SPADES), hcp and
+        quick_tricks of the hand and longest_suit, the SuitsEnum value of
+        the longest suit (the highest suit on ties)
+    """
+    suits = holdings(mask)
+    lengths = tuple(SUIT_LENGTH[holding] for holding in suits)
+    suit_hcp = tuple(SUIT_HCP[holding] for holding in suits)
+    longest = max(range(4), key=lambda suit: (lengths[suit], suit))
+    return HandFeatures(
+        lengths, sum(suit_hcp), suit_hcp,
+        tuple(SUIT_STOPPER[holding] for holding in suits),
+        sum(SUIT_QUICK_TRICKS[holding] for holding in suits),
+        longest + 1)
+
+
+def partnership_tricks(mask: int, partner_mask: int, strain: int) -> int:
+    """Tricks a partnership expects to take in a strain, estimated from the features of both hands
+
+    Side tricks are the quick tricks outside the trump suit. A trump suit
+    wins the length of the longer trump holding plus the ruffs of the
+    shorter one in its short suits, no trump wins the length beyond 4 of
+    the stopped long suits. This is a bidding estimate, see
+    double_dummy.solve for the exact number of tricks.
+
+    Parameters
+    ----------
+    mask : int
+    partner_mask : int
+    strain : int
+        Trump suit as a SuitsEnum value from 1-4, 5 for NOTRUMP
+
+    Returns
+    -------
+    int
+        Estimated tricks from 0-13
+    """
+    side = (holdings(mask), holdings(partner_mask))
+    trump = strain - 1 if 1 <= strain <= 4 else None
+    tricks = 0.0
+    for suit in range(4):
+        if suit == trump:
+            continue
+        tricks += sum(SUIT_QUICK_TRICKS[suits[suit]] for suits in side)
+        if trump is None and any(SUIT_STOPPER[suits[suit]] for suits in side):
+            tricks += max(max(SUIT_LENGTH[suits[suit]] for suits in side) - 4, 0)
+    if trump is not None:
+        trumps = [SUIT_LENGTH[suits[trump]] for suits in side]
+        short_hand = side[trumps.index(min(trumps))]
+        ruffs = sum(max(3 - SUIT_LENGTH[short_hand[suit]], 0) for suit in range(4) if suit != trump)
+        tricks += max(trumps) + min(min(trumps), ruffs)
+    return min(int(tricks), 13)
+
+
+_TABLES = None
+
+
+def _tables() -> dict:
+    global _TABLES
+    if _TABLES is None:
+        import numpy as np
+        _TABLES = {
+            "length": np.array(SUIT_LENGTH, dtype=np.int8),
+            "hcp": np.array(SUIT_HCP, dtype=np.int8),
+            "stopper": np.array(SUIT_STOPPER, dtype=bool),
+            "quick_tricks": np.array(SUIT_QUICK_TRICKS, dtype=np.float32),
+        }
+    return _TABLES
+
+
+def batch_features(masks) -> dict:
+    """Features of an array of hand masks with NumPy
+
+    Parameters
+    ----------
+    masks : array_like
+        Hand masks, shape (num_of_hands,)
+
+    Returns
+    -------
+    dict
+        Arrays of the HandFeatures fields, lengths, suit_hcp and stoppers of
+        shape (num_of_hands, 4), the others of shape (num_of_hands,)
+    """
+    import numpy as np
+    tables = _tables()
+    masks = np.asarray(masks, dtype=np.uint64)
+    shifts = np.arange(4, dtype=np.uint64) * np.uint64(CARDS_PER_SUIT)
+    suits = ((masks[:, None] >> shifts) & np.uint64(HOLDING_MASK)).astype(np.intp)
+    lengths = tables["length"][suits]
+    suit_hcp = tables["hcp"][suits]
+    # Highest suit on ties, as in hand_features
+    longest = 3 - lengths[:, ::-1].argmax(axis=1)
+    return {
+        "lengths": lengths,
+        "hcp": suit_hcp.sum(axis=1, dtype=np.int64),
+        "suit_hcp": suit_hcp,
+        "stoppers": tables["stopper"][suits],
+        "quick_tricks": tables["quick_tricks"][suits].sum(axis=1),
+        "longest_suit": longest + 1,
+    }
@@ -0,0 +1,201 @@
+"""Optional instrumentation of the hot paths
+
+Counters and per-phase timers recorded by runner, trump_ai and logic. It is
+disabled by default: counters are guarded by ``if instrument.ENABLED`` at
+the call sites and phase() returns a shared no-op context manager, so a
+disabled run pays an attribute lookup per event.
+
+Every event is aggregated in the module and forwarded to the sink callback
+given to enable, as ``sink(kind, name, value)`` with kind "count" or "time".
+
+cProfile runs are set up without editing the code through environment
+variables read by runner._simulate_shard (worker processes inherit them):
+
+    TRUMP_PROFILE=profiles/       dump one .prof file per simulated shard
+    TRUMP_PROFILE_RATE=0.1        only profile a fraction of the shards
+"""
+import cProfile
+import os
+import pstats
+import random
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+PROFILE_ENV = "TRUMP_PROFILE"
+PROFILE_RATE_ENV = "TRUMP_PROFILE_RATE"
+
+ENABLED = False
+_sink = None
+counters = Counter()
+timers = Counter()
+phase_calls = Counter()
+
+
+def enable(sink=None):
+    """Start recording events
+
+    Parameters
+    ----------
+    sink : callable | None, optional
+        Called as sink(kind, name, value) for every event, by default None
+    """
+    global ENABLED, _sink
+    _sink = sink
+    ENABLED = True
+
+
+def disable():
+    global ENABLED, _sink
+    ENABLED = False
+    _sink = None
+
+
+def reset():
+    """Clear the aggregated counters and timers"""
+    counters.clear()
+    timers.clear()
+    phase_calls.clear()
+
+
+def count(name: str, n=1):
+    """Add n to a counter, call sites check ENABLED first"""
+    counters[name] += n
+    if _sink is not None:
+        _sink("count", name, n)
+
+
+def add_time(name: str, seconds: float):
+    """Add the duration of one run of a phase"""
+    timers[name] += seconds
+    phase_calls[name] += 1
+    if _sink is not None:
+        _sink("time", name, seconds)
+
+
+class _Phase:
+
+    __slots__ = ("_name", "_start")
+
+    def __init__(self, name):
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        add_time(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class _NoPhase:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(name: str):
+    """Context manager timing a phase, a shared no-op when disabled"""
+    if ENABLED:
+        return _Phase(name)
+    return _NO_PHASE
+
+
+def snapshot() -> dict:
+    """Aggregated counters, timers (seconds) and number of runs of each phase"""
+    return {
+        "counters": dict(counters),
+        "timers": dict(timers),
+        "phase_calls": dict(phase_calls),
+    }
+
+
+def merge(other: dict):
+    """Add a snapshot, e.g. from a worker process, forwarding it to the sink"""
+    for name, n in other["counters"].items():
+        count(name, n)
+    for name, seconds in other["timers"].items():
+        timers[name] += seconds
+        phase_calls[name] += other["phase_calls"][name]
+        if _sink is not None:
+            _sink("time", name, seconds)
+
+
+def report(stream=None):
+    """Print the aggregated timers and counters"""
+    stream = stream or sys.stderr
+    for name, seconds in sorted(timers.items(), key=lambda item: -item[1]):
+        print("{:<24}{:>10.3f} s{:>10} runs".format(name, seconds, phase_calls[name]),
+              file=stream)
+    for name, n in sorted(counters.items()):
+        print("{:<24}{:>12}".format(name, n), file=stream)
+
+
+@contextmanager
+def instrumented(sink=None):
+    """Enable the instrumentation for a block and yield the live counters
+
+    Example
+    -------
+    with instrument.instrumented():
+        runner.simulate_games(1000, workers=4)
+    instrument.report()
+    """
+    reset()
+    enable(sink)
+    try:
+        yield snapshot
+    finally:
+        disable()
+
+
+@contextmanager
+def profile(path=None, sort="cumulative", limit=30, stream=None):
+    """Run a block under cProfile
+
+    Parameters
+    ----------
+    path : str | os.PathLike | None, optional
+        Dump the stats to this file, by default print them
+    sort : str, optional
+        pstats sort key of the printed stats, by default "cumulative"
+    limit : int, optional
+        Number of printed functions, by default 30
+    stream : file, optional, by default sys.stderr
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path is not None:
+            profiler.dump_stats(path)
+        else:
+            pstats.Stats(profiler, stream=stream or sys.stderr).sort_stats(sort).print_stats(limit)
+
+
+def shard_profile(seed: int):
+    """cProfile context of a simulated shard, set up from PROFILE_ENV and PROFILE_RATE_ENV
+
+    The shards profiled are chosen from their seed, so a rerun profiles the
+    same shards.
+    """
+    directory = os.environ.get(PROFILE_ENV)
+    if not directory:
+        return nullcontext()
+    rate = float(os.environ.get(PROFILE_RATE_ENV, 1.0))
+    if random.Random(seed).random() >= rate:
+        return nullcontext()
+    os.makedirs(directory, exist_ok=True)
+    return profile(os.path.join(directory, "shard-{:016x}.prof".format(seed)))
@@ -0,0 +1,137 @@
+"""Information Set Monte Carlo Tree Search
+
+Single observer ISMCTS: every playout samples the hidden hands, walks down a
+tree of moves shared by all the sampled deals with UCB among the moves legal
+in that deal, expands one move and plays random legal cards to the end of the
+hand.
+
+Seats are relative to the observer, seat 0 is the observer and the seats go
+clockwise (next_player) so seats 0/2 play against seats 1/3.
+"""
+import math
+import random
+import time
+
+import bitboard
+import playout
+from state import GameState
+
+
+class _Node:
+
+    __slots__ = ("move", "seat", "parent", "children", "visits", "availability", "reward")
+
+    def __init__(self, move=None, seat=None, parent=None):
+        self.move = move
+        self.seat = seat
+        self.parent = parent
+        self.children = {}
+        self.visits = 0
+        self.availability = 1
+        self.reward = 0.0
+
+
+def search(hand: int, dealer, trick=(), trump_suit=None, trump_played=False,
+           time_budget_ms=None, max_playouts=None, exploration=0.7, rng=random):
+    """Search the best card of the observer
+
+    Stops when the time budget or the number of playouts runs out, whichever
+    comes first, and returns the most visited move found so far.
+
+    Parameters
+    ----------
+    hand : int
+        Mask of the observer's hand
+    dealer : card_tracker.ConstraintDealer
+        Dealer of the hidden hands of seats 1, 2 and 3
+    trick : iterable, optional
+        Card indices already played to the current trick, by default ()
+    trump_suit : SuitsEnum | int | None, optional, by default None
+    trump_played : bool, optional, by default False
+    time_budget_ms : float | None, optional
+        Wall clock budget in milliseconds, by default None
+    max_playouts : int | None, optional
+        Maximum number of playouts, at least 1, by default 1000 when there is
+        no time budget. One playout is always played, however short the budget
+    exploration : float, optional
+        UCB exploration constant, by default 0.7
+    rng : random.Random, optional, by default the random module
+
+    Returns
+    -------
+    tuple
+        Card index of the best move and a stats dict of playouts, elapsed
+        seconds and playouts_per_sec
+
+    Raises
+    ------
+    ValueError
+        If max_playouts is below 1
+    """
+    if time_budget_ms is None and max_playouts is None:
+        max_playouts = 1000
+    if max_playouts is not None and max_playouts < 1:
+        raise ValueError("max_playouts must be at least 1")
+    start = time.perf_counter()
+    deadline = start + time_budget_ms / 1000 if time_budget_ms is not None else None
+    trick = list(trick)
+    leader = (4 - len(trick)) % 4
+    root = _Node()
+
+    playouts = 0
+    while max_playouts is None or playouts < max_playouts:
+        if deadline is not None and playouts and time.perf_counter() >= deadline:
+            break
+        hands = [hand] + dealer.sample(rng)
+        position = GameState(hands, leader, trump_suit, trump_played, trick)
+        node = root
+
+        # Selection and expansion
+        while not position.finished():
+            legal = position.legal_moves()
+            moves = bitboard.indices(legal)
+            untried = [move for move in moves if move not in node.children]
+            seat = position.to_move()
+            if untried:
+                move = rng.choice(untried)
+                child = _Node(move, seat, node)
+                node.children[move] = child
+                position.make_move(move)
+                node = child
+                break
+            best_value = -1.0
+            for move in moves:
+                child = node.children[move]
+                child.availability += 1
+            for move in moves:
+                child = node.children[move]
+                value = (child.reward / child.visits + exploration *
+                         math.sqrt(math.log(child.availability) / child.visits))
+                if value > best_value:
+                    best_value = value
+                    best_move = move
+            node = node.children[best_move]
+            position.make_move(best_move)
+
+        # Random playout to the end of the hand
+        won = playout.playout(position.hands, position.leader, trump_suit,
+                              position.trump_played, position.trick, rng)
+        tricks = (position.tricks[0] + won[0], position.tricks[1] + won[1])
+
+        # Backpropagation of the share of tricks won by each mover's team
+        total = tricks[0] + tricks[1]
+        while node.parent is not None:
+            node.visits += 1
+            node.reward += tricks[node.seat % 2] / total
+            node = node.parent
+        root.visits += 1
+        playouts += 1
+
+    elapsed = time.perf_counter() - start
+    best = max(root.children.values(), key=lambda child: child.visits)
+    stats = {
+        "playouts": playouts,
+        "elapsed": elapsed,
+        "playouts_per_sec": playouts / elapsed if elapsed > 0 else 0.0,
+    }
+    return best.move, stats
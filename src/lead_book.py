@@ -0,0 +1,197 @@
+"""Precomputed opening lead book
+
+monte_carlo_LP scores a lead by how often it wins the trick against random
+hands of the other players. On the opening lead every unseen card is
+equally likely to be in any hidden hand, so that rate only depends on the
+pattern of the lead card:
+
+- length : cards held by the leader in the suit led (1-13),
+- higher : unseen cards of the suit led higher than the card (0-12),
+- trumps : cards held by the leader in the trump suit (0-12), or NOTRUMP
+  when there is no trump and TRUMP_LEAD when the card is a trump.
+
+The generator simulates every pattern offline with the vectorized rollout
+kernel and stores the win rates in a small table file, read back through a
+memory map. A missing pattern (NaN) makes the lookup return None so the
+caller falls back to simulation.
+
+    python lead_book.py lead_book.bin --iteration 20000
+"""
+import argparse
+import struct
+
+import numpy as np
+
+import bitboard
+from bitboard import CARDS_PER_SUIT, SUIT_MASKS
+
+MAGIC = b"TCLB"
+# Version 2 fills the hands of the trump leads up to 13 cards
+VERSION = 2
+HEADER = struct.Struct("<4sIIII")
+HEADER_SIZE = HEADER.size
+
+NOTRUMP = 14
+TRUMP_LEAD = 15
+SHAPE = (CARDS_PER_SUIT + 1, CARDS_PER_SUIT, 16)
+
+HAND_SIZE = 13
+
+
+def pattern(hand: int, card: int, trump_suit=None) -> tuple:
+    """Table index (length, higher, trumps) of leading card from hand"""
+    suit = bitboard.suit_of(card)
+    held_in_suit = hand & SUIT_MASKS[suit]
+    # Cards of the suit above the card, minus the ones held by the leader
+    above = SUIT_MASKS[suit] & ~((1 << (card + 1)) - 1)
+    higher = (above & ~held_in_suit).bit_count()
+    if not trump_suit or not SUIT_MASKS[trump_suit]:
+        trumps = NOTRUMP
+    elif suit == trump_suit:
+        trumps = TRUMP_LEAD
+    else:
+        trumps = (hand & SUIT_MASKS[trump_suit]).bit_count()
+    return held_in_suit.bit_count(), higher, trumps
+
+
+def representative(length: int, higher: int, trumps: int):
+    """A hand, lead card and trump suit of a pattern, None if the pattern is impossible
+
+    The card is led from CLUBS with SPADES as trumps (CLUBS for a trump
+    lead), the other cards of the suit are held below it and the rest of the
+    13 cards are DIAMONDS and HEARTS.
+    """
+    if not 1 <= length <= HAND_SIZE or not 0 <= higher <= CARDS_PER_SUIT - length:
+        return None
+    clubs, spades = 1, 4
+    card = (clubs - 1) * CARDS_PER_SUIT + CARDS_PER_SUIT - 1 - higher
+    hand = (1 << card) | bitboard.mask_from_indices(range(length - 1))
+    if trumps == TRUMP_LEAD:
+        trump_suit = clubs
+    elif trumps == NOTRUMP:
+        trump_suit = 5
+    else:
+        if length + trumps > HAND_SIZE:
+            return None
+        trump_suit = spades
+        hand |= bitboard.mask_from_indices(
+            range((spades - 1) * CARDS_PER_SUIT, (spades - 1) * CARDS_PER_SUIT + trumps))
+    filler = bitboard.indices(SUIT_MASKS[2] | SUIT_MASKS[3])
+    hand |= bitboard.mask_from_indices(filler[:HAND_SIZE - hand.bit_count()])
+    return hand, card, trump_suit
+
+
+def pattern_rate(length: int, higher: int, trumps: int, iteration=20000, rng=None) -> float:
+    """Simulated win rate of a pattern, NaN if the pattern is impossible
+
+    Parameters
+    ----------
+    length, higher, trumps : int
+        Table index of the pattern, see pattern
+    iteration : int, optional
+        Simulated tricks, by default 20000
+    rng : np.random.Generator | None, optional, by default a new Generator
+    """
+    import vectorized
+    found = representative(length, higher, trumps)
+    if found is None:
+        return float("nan")
+    hand, card, trump_suit = found
+    winners = vectorized.kernel().trick_winners(
+        [card], iteration, bitboard.indices(bitboard.FULL_MASK & ~hand), HAND_SIZE,
+        trump_suit=trump_suit, rng=rng if rng is not None else vectorized.default_rng())
+    return float((winners == 0).mean())
+
+
+def generate(iteration=20000, seed=None, verbose=False) -> np.ndarray:
+    """Win rate of every possible pattern, NaN for impossible ones
+
+    Parameters
+    ----------
+    iteration : int, optional
+        Simulated tricks per pattern, by default 20000
+    seed : int | None, optional, by default None
+
+    Returns
+    -------
+    np.ndarray
+        float32 table of shape SHAPE
+    """
+    import vectorized
+    rng = vectorized.default_rng(seed)
+    table = np.full(SHAPE, np.nan, dtype=np.float32)
+    for length in range(1, SHAPE[0]):
+        for higher in range(SHAPE[1]):
+            for trumps in range(SHAPE[2]):
+                table[length, higher, trumps] = pattern_rate(length, higher, trumps, iteration, rng)
+        if verbose:
+            print("length {} done".format(length))
+    return table
+
+
+def save(path, table: np.ndarray, iteration=0):
+    """Write a table of shape SHAPE"""
+    table = np.ascontiguousarray(table, dtype=np.float32)
+    if table.shape != SHAPE:
+        raise ValueError("Lead book table must be of shape {}".format(SHAPE))
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, iteration, table.size, 0))
+        file.write(table.tobytes())
+
+
+class LeadBook:
+
+    def __init__(self, path):
+        """Memory-mapped read only lead book
+
+        Parameters
+        ----------
+        path : str | os.PathLike
+        """
+        with open(path, "rb") as file:
+            magic, version, iteration, size, _ = HEADER.unpack(file.read(HEADER_SIZE))
+        if magic != MAGIC:
+            raise ValueError("Not a lead book file")
+        if version != VERSION or size != np.prod(SHAPE):
+            raise ValueError(f"Unsupported lead book version {version} of size {size}")
+        self.iteration = iteration
+        self._table = np.memmap(path, dtype=np.float32, mode="r", offset=HEADER_SIZE, shape=SHAPE)
+
+    @property
+    def table(self) -> np.ndarray:
+        return self._table
+
+    def rate(self, hand: int, card: int, trump_suit=None) -> float:
+        """Win rate of leading a card, NaN if the pattern is missing"""
+        return float(self._table[pattern(hand, card, trump_suit)])
+
+    def lead(self, hand: int, trump_suit=None, trump_played=False):
+        """Card index of the best opening lead of a 13 card hand
+
+        The cheapest card wins between leads of the same rate.
+
+        Returns
+        -------
+        int | None
+            None when the hand is not a full hand or a pattern is missing
+        """
+        if hand.bit_count() != HAND_SIZE:
+            return None
+        best = None
+        best_rate = -1.0
+        for card in bitboard.indices(bitboard.playable_lead(hand, trump_played, trump_suit)):
+            rate = self.rate(hand, card, trump_suit)
+            if rate != rate:
+                return None
+            if rate > best_rate:
+                best, best_rate = card, rate
+        return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the opening lead book")
+    parser.add_argument("path")
+    parser.add_argument("--iteration", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    save(args.path, generate(args.iteration, args.seed, verbose=True), args.iteration)
@@ -1,4 +1,6 @@
-from trump import PASS, SuitsEnum, Card, Bid
+from trump import PASS, SuitsEnum, Card, Bid, LEGAL_BIDS
+import bitboard
+import instrument
 
 
 def compare_cards(cards: list, suit_call: SuitsEnum, trump_suit=None) -> Card:
@@ -18,29 +20,19 @@ def compare_cards(cards: list, suit_call: SuitsEnum, trump_suit=None) -> Card:
         Card
             Winning Card
         """
-    cards_match_suit = None
-    # Check if there is a trump suit in play
-    if trump_suit:
-        # Check if there is a trump card in cards
-        cards_match_suit = list(filter(
-            lambda card: card.suit == trump_suit, cards))
-
-    # If there is no trump suit or no trump card found in cards select winner from matching suit call
-    if len(cards_match_suit) == 0:
-        cards_match_suit = list(filter(
-            lambda card: card.suit == suit_call, cards))
-        # Determine the winner of a trump card suit or a suit_call suit by its value
-    highest_card_value = 0
-    highest_card = None
-    for card in cards_match_suit:
-        if card.card_value > highest_card_value:
-            highest_card = card
-            highest_card_value = card.card_value
-    return highest_card
-
-
-def playable_bid(highest_bid: Bid) -> list:
-    """Get a list of legal Bids that can be made given a highest current bid in the auction
+    if instrument.ENABLED:
+        instrument.count("compare_cards")
+    trick = 0
+    card_at = {}
+    for card in cards:
+        trick |= 1 << card.index
+        card_at[card.index] = card
+    # Highest trump card wins, otherwise the highest card matching the suit call
+    return card_at.get(bitboard.winner(trick, suit_call, trump_suit))
+
+
+def playable_bid(highest_bid: Bid) -> tuple:
+    """Get the legal Bids that can be made given a highest current bid in the auction
 
     Parameters
     ----------
@@ -49,16 +41,10 @@ def playable_bid(highest_bid: Bid) -> list:
 
     Returns
     -------
-    list
-        List of legal bids
+    tuple
+        Precomputed tuple of legal bids, PASS followed by every higher bid
     """
-    bid_list = [PASS]
-    for i in range(1, 7):
-        for j in range(1, 6):
-            if Bid(i, SuitsEnum(j)) <= highest_bid:
-                continue
-            bid_list.append(Bid(i, SuitsEnum(j)))
-    return bid_list
+    return LEGAL_BIDS[highest_bid.rank]
 
 
 def check_pass(bid_history: list) -> bool:
@@ -1,6 +1,23 @@
-from trump import Card, Deck, Player, SuitsEnum, Team, Bid, PASS
+from collections import namedtuple, Counter
+from concurrent.futures import ProcessPoolExecutor
+import random
+import time
+from trump import Deck, Player, SuitsEnum, Team, Bid, PASS
 import trump_ai
 import logic
+import instrument
+from card_tracker import CardTracker
+try:
+    import game_record
+except ImportError:  # numpy is only needed to record games
+    game_record = None
+
+# Number of games simulated by one worker task, results do not depend on the number of workers
+SHARD_SIZE = 500
+
+# Compact result of a game, suits and seats are stored as plain ints (seat 0 is the watched player)
+GameResult = namedtuple(
+    "GameResult", ["won", "trump_suit", "contract_value", "declarer", "declarer_tricks"])
 
 
 def generate_players():
@@ -68,106 +85,321 @@ def reset(players, teams):
         team.reset()
 
 
-PLAYERS = generate_players()
-TEAMS = generate_teams(PLAYERS)
-PLAYER_WATCH = PLAYERS[0]
-TOTAL_SCORE = 0
-NUM_OF_ROUNDS = 25
+def play_game(players, teams, player_watch=None, record=None, lead_book=None, tablebase=None):
+    """Deal, run the auction and play the 13 tricks of a single game
+
+    Parameters
+    ----------
+    players : list
+        list of 4 players (Player Object) from generate_players
+    teams : list
+        list of 2 teams (Team Object) from generate_teams
+    player_watch : Player, optional
+        Player whose team plays with monte_carlo_LP/monte_carlo_DP, by default players[0]
+    record : np.void, optional
+        Row of a game_record array to fill with the deal, auction and play
+    lead_book : lead_book.LeadBook, optional
+        Book of the opening leads of the team of player_watch, by default None
+    tablebase : tablebase.Tablebase, optional
+        Endgame tablebase of the team of player_watch, by default None
 
-for x in range(NUM_OF_ROUNDS):
+    Returns
+    -------
+    GameResult | None
+        None when every player passed in the auction
+    """
+    if player_watch is None:
+        player_watch = players[0]
+    if instrument.ENABLED:
+        instrument.count("games")
+        game_start = time.perf_counter()
 
-    DECK = Deck(shuffle=True)
-    CARDS_PLAYED = []
-    TRUMP_SUIT = None
-    TRUMP_CARD_PLAYED = False
-    BID_HISTORY = []
-    HIGHEST_BID = PASS
-    CONTRACT = None
-    DECLARER = None
+    cards_played = []
+    trump_card_played = False
+    bid_history = []
+    highest_bid = PASS
 
     # Build hand for each player
-    for player in PLAYERS:
-        player.build_hand_from_deck(DECK)
-        # Check if the player is void then TRUMP CARD CAN BE PLAYED IMMEDIETLY
-        # if player.isVoid():
-        #     TRUMP_CARD_PLAYED = True
+    with instrument.phase("deal"):
+        deck = Deck(shuffle=True)
+        for player in players:
+            player.build_hand_from_deck(deck)
+            # Check if the player is void then TRUMP CARD CAN BE PLAYED IMMEDIETLY
+            # if player.isVoid():
+            #     trump_card_played = True
+    hands = [player.mask for player in players]
     # Start Auction
-    while True:
-        player = player.next_player()
-        player_bid = trump_ai.random_AB(highest_bid=HIGHEST_BID)
-        # Player make the auction bid
-        player.auction_bid(player_bid)
-        # Recheck if Bid is valid
-        if player_bid > HIGHEST_BID or player_bid == PASS:
-            # Add bid to bid history
-            bid_dict = {"player": player, "bid": player_bid}
-            BID_HISTORY.append(bid_dict)
-
-            if player_bid != PASS:
-                HIGHEST_BID = player_bid
-        else:
-            raise ValueError("Not a valid bid !")
+    with instrument.phase("auction"):
+        while True:
+            player = player.next_player()
+            player_bid = trump_ai.random_AB(highest_bid=highest_bid)
+            # Player make the auction bid
+            player.auction_bid(player_bid)
+            # Recheck if Bid is valid
+            if player_bid > highest_bid or player_bid == PASS:
+                # Add bid to bid history
+                bid_dict = {"player": player, "bid": player_bid}
+                bid_history.append(bid_dict)
+
+                if player_bid != PASS:
+                    highest_bid = player_bid
+            else:
+                raise ValueError("Not a valid bid !")
 
-        if logic.check_pass(BID_HISTORY):
-            break
-    if HIGHEST_BID == PASS:
+            if logic.check_pass(bid_history):
+                break
+    if instrument.ENABLED:
+        instrument.count("auction_rounds", len(bid_history))
+    if highest_bid == PASS:
         # raise TypeError("All PASS")
-        NUM_OF_ROUNDS -= 1
-        continue
+        if record is not None:
+            game_record.fill_record(
+                record, hands, players.index(bid_history[0]["player"]),
+                [bid["bid"].rank for bid in bid_history])
+        reset(players, teams)
+        if instrument.ENABLED:
+            instrument.count("all_pass")
+            instrument.add_time("game", time.perf_counter() - game_start)
+        return None
 
     # Get the Player Declarer from BID HISTORY last BID
-    DECLARER = BID_HISTORY[-1]["player"]
-    CONTRACT = HIGHEST_BID
-    TRUMP_SUIT = CONTRACT.suit
+    declarer = bid_history[-1]["player"]
+    contract = highest_bid
+    trump_suit = contract.suit
 
     # Start the game
-    player = DECLARER
+    player = declarer
+    trick_winners = []
+    tracker = CardTracker(players)
     for i in range(13):
 
         # Leading player chooses card
         cards = []
-        if PLAYER_WATCH == player or PLAYER_WATCH.teammate == player:
+        trick_players = [player]
+        if player_watch == player or player_watch.teammate == player:
             card = trump_ai.monte_carlo_LP(
-                player, CARDS_PLAYED, trump_played=TRUMP_CARD_PLAYED, trump_suit=TRUMP_SUIT)
+                player, cards_played, trump_played=trump_card_played, trump_suit=trump_suit,
+                tracker=tracker, book=lead_book, tablebase=tablebase)
         else:
             card = trump_ai.random_LP(
-                player, trump_played=TRUMP_CARD_PLAYED, trump_suit=TRUMP_SUIT)
+                player, trump_played=trump_card_played, trump_suit=trump_suit)
         suit_call = card.suit
         cards.append(player.play(card))
+        tracker.observe_play(player, card)
 
         # Simulatate turn for defending players
         for _ in range(3):
             player = player.next_player()
-            card = trump_ai.random_DP(player, suit_call)
+            if player_watch == player or player_watch.teammate == player:
+                card = trump_ai.monte_carlo_DP(
+                    player, cards_played, cards, trump_suit=trump_suit, tracker=tracker,
+                    tablebase=tablebase)
+            else:
+                card = trump_ai.random_DP(player, suit_call)
             cards.append(player.play(card))
+            tracker.observe_play(player, card, suit_call)
+            trick_players.append(player)
+
+        with instrument.phase("trick_resolution"):
+            # Determine winner
+            wining_card = logic.compare_cards(
+                cards, suit_call, trump_suit=trump_suit)
+            # If a trump suit won , then a trump suit is played
+            if wining_card.suit == trump_suit:
+                if trump_suit != SuitsEnum(0) or trump_suit != SuitsEnum(5):
+                    trump_card_played = True
 
-        # Determine winner
-        wining_card = logic.compare_cards(
-            cards, suit_call, trump_suit=TRUMP_SUIT)
-        # If a trump suit won , then a trump suit is played
-        if wining_card.suit == TRUMP_SUIT:
-            if TRUMP_SUIT != SuitsEnum(0) or TRUMP_SUIT != SuitsEnum(5):
-                TRUMP_CARD_PLAYED = True
-
-        # Give points to winning team
-        player_winner = wining_card.owner
-        team_winner: Team = player_winner.team
-        team_winner.points += 1
-
-        player = player_winner
-
-        # Add cards played to history of game and tricks won to winner
-        CARDS_PLAYED += cards
-        team_winner.add_tricks_won(cards)
-
-    print("Game {}:".format(x), "Trump :{} ".format(TRUMP_SUIT.name), end=" ")
-    if len(PLAYER_WATCH.team.tricks_won) > len(PLAYER_WATCH.next_player().team.tricks_won):
-        TOTAL_SCORE += 1
-        print("Won")
+            # Give points to winning team
+            player_winner = trick_players[cards.index(wining_card)]
+            team_winner: Team = player_winner.team
+            team_winner.points += 1
+
+            player = player_winner
+            trick_winners.append(players.index(player_winner))
+
+            # Add cards played to history of game and tricks won to winner
+            cards_played += cards
+            team_winner.add_tricks_won(cards)
+
+    won = len(player_watch.team.tricks_won) > len(
+        player_watch.next_player().team.tricks_won)
+    result = GameResult(won, int(trump_suit), contract.value,
+                        players.index(declarer), len(declarer.team.tricks_won))
+    if record is not None:
+        game_record.fill_record(
+            record, hands, players.index(bid_history[0]["player"]),
+            [bid["bid"].rank for bid in bid_history], result.declarer, contract.rank,
+            [card.index for card in cards_played], trick_winners,
+            (len(teams[0].tricks_won), len(teams[1].tricks_won)), won)
+    reset(players, teams)
+    if instrument.ENABLED:
+        instrument.add_time("game", time.perf_counter() - game_start)
+    return result
+
+
+def _simulate_shard(n_games, seed, record=False, instrumented=False, lead_book_path=None,
+                    tablebase_path=None):
+    """Worker task playing n_games with its own random stream
+
+    The lead book and the tablebase are memory-mapped, so the workers share
+    their pages.
+
+    Returns
+    -------
+    list | tuple
+        list of GameResult | None, and the array of game records if record,
+        followed by the instrument snapshot of the shard if instrumented
+    """
+    random.seed(seed)
+    if instrumented:
+        instrument.reset()
+        instrument.enable()
+    book = None
+    if lead_book_path is not None:
+        import lead_book
+        book = lead_book.LeadBook(lead_book_path)
+    endgames = None
+    if tablebase_path is not None:
+        import tablebase
+        endgames = tablebase.Tablebase(tablebase_path)
+    players = generate_players()
+    teams = generate_teams(players)
+    with instrument.shard_profile(seed):
+        if not record:
+            output = [play_game(players, teams, lead_book=book, tablebase=endgames)
+                      for _ in range(n_games)]
+        else:
+            records = game_record.empty_records(n_games)
+            results = [play_game(players, teams, record=records[i], lead_book=book,
+                                 tablebase=endgames)
+                       for i in range(n_games)]
+            output = results, records
+    if instrumented:
+        return output, instrument.snapshot()
+    return output
+
+
+def merge_results(results) -> dict:
+    """Merge per-game results into the summary statistics
+
+    Parameters
+    ----------
+    results : iterable of GameResult | None
+
+    Returns
+    -------
+    dict
+        games, all_pass, won, win_rate, trump_distribution, contracts,
+        contracts_made and contract_success_rate
+    """
+    all_pass = 0
+    won = 0
+    contracts_made = 0
+    trump_distribution = Counter()
+    contracts = Counter()
+    games = 0
+    for result in results:
+        if result is None:
+            all_pass += 1
+            continue
+        games += 1
+        won += result.won
+        contract = Bid(result.contract_value, SuitsEnum(result.trump_suit))
+        trump_distribution[SuitsEnum(result.trump_suit).name] += 1
+        contracts[repr(contract)] += 1
+        if result.declarer_tricks >= contract.num_of_tricks_to_win():
+            contracts_made += 1
+    return {
+        "games": games,
+        "all_pass": all_pass,
+        "won": won,
+        "win_rate": won / games if games else 0.0,
+        "trump_distribution": dict(trump_distribution),
+        "contracts": dict(contracts),
+        "contracts_made": contracts_made,
+        "contract_success_rate": contracts_made / games if games else 0.0,
+    }
+
+
+def simulate_games(n_games, workers=1, seed=None, return_results=False, record_path=None,
+                   lead_book_path=None, tablebase_path=None):
+    """Simulate games in shards of SHARD_SIZE over a process pool
+
+    Each shard gets an independent random stream derived from seed, so a
+    seeded run gives the same statistics for any number of workers.
+
+    Parameters
+    ----------
+    n_games : int
+        Number of deals, all-pass deals included
+    workers : int, optional
+        Number of processes, 1 runs in the current process, by default 1
+    seed : int | None, optional, by default None
+    return_results : bool, optional
+        Also return the list of GameResult | None, by default False
+    record_path : str | os.PathLike, optional
+        Append every game to this game_record file, by default None
+    lead_book_path : str | os.PathLike, optional
+        Play the opening leads from this lead_book file, by default None
+    tablebase_path : str | os.PathLike, optional
+        Play the last tricks from this tablebase file, by default None
+
+    Returns
+    -------
+    dict | tuple
+        Statistics from merge_results, and the list of results if return_results
+    """
+    seed_stream = random.Random(seed)
+    shards = []
+    for start in range(0, n_games, SHARD_SIZE):
+        shards.append(
+            (min(SHARD_SIZE, n_games - start), seed_stream.getrandbits(64)))
+
+    record = record_path is not None
+    # Worker processes record their own events, merged into this process
+    instrumented = instrument.ENABLED and workers != 1
+    shards = [shard + (record, instrumented, lead_book_path, tablebase_path) for shard in shards]
+    state = random.getstate()
+    if workers == 1:
+        shard_outputs = (_simulate_shard(*shard) for shard in shards)
     else:
-        print("Lost")
+        executor = ProcessPoolExecutor(max_workers=workers)
+        shard_outputs = executor.map(_simulate_shard, *zip(*shards))
+
+    shard_results = []
+    writer = game_record.GameRecordWriter(record_path) if record else None
+    try:
+        for output in shard_outputs:
+            if instrumented:
+                output, snapshot = output
+                instrument.merge(snapshot)
+            if record:
+                # Stream the records of each shard as soon as it is done
+                output, records = output
+                writer.write_records(records)
+            shard_results.append(output)
+    finally:
+        if writer is not None:
+            writer.close()
+        if workers != 1:
+            executor.shutdown()
+        random.setstate(state)
+
+    results = [result for shard in shard_results for result in shard]
+    stats = merge_results(results)
+    if return_results:
+        return stats, results
+    return stats
 
-    reset(PLAYERS, TEAMS)
 
+if __name__ == "__main__":
+    NUM_OF_ROUNDS = 25
+    stats, results = simulate_games(NUM_OF_ROUNDS, return_results=True)
+    for x, result in enumerate(results):
+        if result is None:
+            continue
+        print("Game {}:".format(x), "Trump :{} ".format(
+            SuitsEnum(result.trump_suit).name), end=" ")
+        print("Won" if result.won else "Lost")
 
-print("Win Rate: {:.2f} %".format(TOTAL_SCORE*100/NUM_OF_ROUNDS))
+    print("Win Rate: {:.2f} %".format(stats["win_rate"] * 100))
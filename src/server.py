@@ -0,0 +1,386 @@
+"""Asyncio multi-table game server
+
+Every table is a coroutine playing the rules of runner.play_game on a flat
+GameState, so thousands of tables share one event loop. Each seat is an
+agent with an ``async choose(request) -> card index`` method:
+
+- RandomAgent picks random legal cards on the event loop,
+- PooledAgent sends the move to an AIPool, a bounded process pool running
+  the Monte Carlo or ISMCTS policies of trump_ai,
+- LocalClient is an in-process client driven by the caller, for tests.
+
+The AIPool holds a slot for every decision until its worker is done, so
+tables wait for a slot instead of piling up work (backpressure), and a move
+that misses its deadline falls back to a random legal card.
+
+    python server.py --games 1000 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import random
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import bitboard
+import logic
+import trump_ai
+from card_tracker import CardTracker
+from runner import GameResult, merge_results
+from state import GameState
+from trump import CARDS, PASS, Player, SuitsEnum
+
+# Seats of the team playing with the AI, seat 0 and its partner like runner.play_game
+AI_SEATS = (0, 2)
+
+# State of a table sent to the agent of the seat to play, cards are bitboard masks and indices,
+# history holds the (seat, card) of every card played so far in play order
+MoveRequest = namedtuple(
+    "MoveRequest", ["table", "seat", "hand", "legal", "trick", "played", "trump_suit", "trump_played",
+                    "history"])
+
+
+def decide(request: MoveRequest, policy="monte_carlo", iteration=100, seed=None, time_budget_ms=None,
+           **options) -> int:
+    """Card index chosen by a trump_ai policy, run in the AIPool workers
+
+    Parameters
+    ----------
+    request : MoveRequest
+    policy : str, optional
+        "monte_carlo", "ismcts" or "random", by default "monte_carlo"
+    iteration : int, optional
+        Simulations per candidate of monte_carlo, by default 100
+    seed : int | None, optional, by default None
+    time_budget_ms : float | None, optional
+        Time budget of ismcts, by default None
+    **options
+        Other keyword arguments of the trump_ai policy, e.g. engine or confidence,
+        by default the policies sample deals consistent with the voids of the
+        request history
+
+    Returns
+    -------
+    int
+    """
+    if policy == "random":
+        return bitboard.random_card(request.legal, random.Random(seed))
+    player = Player()
+    player.set_cards([CARDS[index] for index in bitboard.indices(request.hand)])
+    cards_played = [CARDS[index] for index in bitboard.indices(request.played)]
+    trick = [CARDS[index] for index in request.trick]
+    trump_suit = SuitsEnum(request.trump_suit)
+    if "tracker" not in options:
+        options["tracker"] = history_tracker(request, player)
+    if policy == "monte_carlo":
+        options.setdefault("common_random_numbers", True)
+        if not trick:
+            card = trump_ai.monte_carlo_LP(
+                player, cards_played, trump_played=request.trump_played, trump_suit=trump_suit,
+                iteration=iteration, seed=seed, **options)
+        else:
+            card = trump_ai.monte_carlo_DP(
+                player, cards_played, trick, trump_suit=trump_suit, iteration=iteration,
+                seed=seed, **options)
+    elif policy == "ismcts":
+        card = trump_ai.ismcts_DP(
+            player, cards_played, trick, trump_played=request.trump_played, trump_suit=trump_suit,
+            time_budget_ms=time_budget_ms, max_playouts=None if time_budget_ms else iteration,
+            seed=seed, **options)
+    else:
+        raise ValueError("policy argument is monte_carlo/ismcts/random")
+    return card.index
+
+
+def history_tracker(request: MoveRequest, player: Player) -> CardTracker:
+    """CardTracker of the request history, with player at the seat of the request"""
+    players = [player if seat == request.seat else Player() for seat in range(4)]
+    tracker = CardTracker(players)
+    for position, (seat, index) in enumerate(request.history):
+        card = CARDS[index]
+        if position % 4 == 0:
+            suit_call = None
+            lead = card.suit
+        else:
+            suit_call = lead
+        tracker.observe_play(players[seat], card, suit_call)
+    return tracker
+
+
+class AIPool:
+
+    def __init__(self, workers=None, max_pending=None, move_timeout=1.0, policy="monte_carlo",
+                 iteration=100, executor=None):
+        """Bounded pool of AI decisions
+
+        Parameters
+        ----------
+        workers : int | None, optional
+            Number of processes, by default os.cpu_count()
+        max_pending : int | None, optional
+            Decisions submitted at once, by default twice the workers
+        move_timeout : float | None, optional
+            Deadline of a move in seconds, waiting for a slot included, by
+            default 1.0
+        policy : str, optional
+            See decide, by default "monte_carlo"
+        iteration : int, optional
+            See decide, by default 100
+        executor : concurrent.futures.Executor | None, optional
+            Run the decisions on this executor instead of a new process pool
+        """
+        workers = workers or os.cpu_count() or 1
+        self._owns_executor = executor is None
+        self._executor = executor or ProcessPoolExecutor(max_workers=workers)
+        self._slots = asyncio.Semaphore(max_pending or 2 * workers)
+        self.move_timeout = move_timeout
+        self.policy = policy
+        self.iteration = iteration
+        self.stats = Counter()
+
+    async def _submit(self, request, seed):
+        await self._slots.acquire()
+        loop = asyncio.get_running_loop()
+        # ISMCTS searches for half the deadline, leaving time to queue and answer
+        time_budget_ms = self.move_timeout * 500 if self.policy == "ismcts" and self.move_timeout else None
+        try:
+            future = self._executor.submit(
+                decide, request, self.policy, self.iteration, seed, time_budget_ms)
+        except BaseException:
+            self._slots.release()
+            raise
+        def release(_):
+            # A worker may finish after the event loop closed, e.g. at shutdown
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._slots.release)
+
+        # Keep the slot until the worker is done, even if the move timed out
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    async def decide(self, request: MoveRequest, seed: int, rng=random) -> int:
+        """Card index of the policy, or a random legal card if the deadline is missed"""
+        self.stats["decisions"] += 1
+        try:
+            return await asyncio.wait_for(self._submit(request, seed), self.move_timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            return bitboard.random_card(request.legal, rng)
+
+    def close(self):
+        if self._owns_executor:
+            self._executor.shutdown(cancel_futures=True)
+
+
+class RandomAgent:
+
+    def __init__(self, rng=random):
+        self._rng = rng
+
+    async def choose(self, request: MoveRequest) -> int:
+        return bitboard.random_card(request.legal, self._rng)
+
+
+class PooledAgent:
+
+    def __init__(self, pool: AIPool, rng=random):
+        self._pool = pool
+        self._rng = rng
+
+    async def choose(self, request: MoveRequest) -> int:
+        return await self._pool.decide(request, self._rng.getrandbits(64), self._rng)
+
+
+class LocalClient:
+
+    def __init__(self, policy=None):
+        """In-process client seated at a table
+
+        Parameters
+        ----------
+        policy : callable | None, optional
+            Called with the MoveRequest to answer at once, by default the
+            moves are read with next_request and sent with play
+        """
+        self._policy = policy
+        self._requests = asyncio.Queue()
+        self._moves = asyncio.Queue()
+
+    async def choose(self, request: MoveRequest) -> int:
+        if self._policy is not None:
+            return self._policy(request)
+        await self._requests.put(request)
+        return await self._moves.get()
+
+    async def next_request(self) -> MoveRequest:
+        """Wait for the table to ask this client for a card"""
+        return await self._requests.get()
+
+    async def play(self, card: int):
+        """Answer the last request with a card index"""
+        await self._moves.put(card)
+
+
+def move_request(state: GameState, table=0, history=()) -> MoveRequest:
+    """MoveRequest of the seat to play in a GameState, history is the (seat, card) of the cards played"""
+    seat = state.to_move()
+    held = state.hands[0] | state.hands[1] | state.hands[2] | state.hands[3]
+    trick = tuple(state.trick)
+    return MoveRequest(table, seat, state.hands[seat], state.legal_moves(), trick,
+                       bitboard.FULL_MASK & ~held & ~bitboard.mask_from_indices(trick),
+                       state.trump_suit, state.trump_played, tuple(history))
+
+
+def deal_and_auction(seed=None) -> tuple:
+    """Deal the 4 hands and run the random auction of runner.play_game
+
+    Seat 0 bids first, the auction ends after three passes and the seat
+    that made the last pass is the declarer.
+
+    Parameters
+    ----------
+    seed : int | None, optional, by default None
+
+    Returns
+    -------
+    tuple
+        Hand masks indexed by seat, highest bid (PASS when every player
+        passed) and the seat of the declarer
+    """
+    rng = random.Random(seed)
+    deck = list(range(bitboard.NUM_OF_CARDS))
+    rng.shuffle(deck)
+    hands = [bitboard.mask_from_indices(deck[seat * 13:seat * 13 + 13]) for seat in range(4)]
+
+    bid_history = []
+    highest_bid = PASS
+    seat = -1
+    while True:
+        seat = (seat + 1) % 4
+        bid = trump_ai.random_AB(highest_bid, rng)
+        bid_history.append({"player": seat, "bid": bid})
+        if bid != PASS:
+            highest_bid = bid
+        if logic.check_pass(bid_history):
+            break
+    return hands, highest_bid, bid_history[-1]["player"]
+
+
+async def play_table(agents: list, seed=None, table=0):
+    """Deal, run the auction and play the 13 tricks of a single game
+
+    Same rules as runner.play_game: seat 0 bids first, the auction ends
+    after three passes and the seat that made the last pass leads.
+
+    Parameters
+    ----------
+    agents : list
+        Agent of each seat
+    seed : int | None, optional
+        Seed of the deal and the auction, by default None
+    table : int, optional
+        Table number of the move requests, by default 0
+
+    Returns
+    -------
+    GameResult | None
+        None when every player passed in the auction
+
+    Raises
+    ------
+    ValueError
+        When an agent plays an illegal card
+    """
+    hands, highest_bid, declarer = deal_and_auction(seed)
+    if highest_bid == PASS:
+        return None
+
+    trump_suit = int(highest_bid.suit)
+    state = GameState(hands, declarer, trump_suit)
+    history = []
+    while not state.finished():
+        seat = state.to_move()
+        request = move_request(state, table, history)
+        card = await agents[seat].choose(request)
+        if not request.legal >> card & 1:
+            raise ValueError("Seat {} played an illegal card {}".format(seat, card))
+        state.make_move(card)
+        history.append((seat, card))
+
+    return GameResult(state.tricks[0] > state.tricks[1], trump_suit, highest_bid.value,
+                      declarer, state.tricks[declarer % 2])
+
+
+class TableManager:
+
+    def __init__(self, pool: AIPool = None, ai_seats=AI_SEATS, max_tables=1024):
+        """Run many tables concurrently on the event loop
+
+        Parameters
+        ----------
+        pool : AIPool | None, optional
+            Pool of the AI seats, every seat plays random cards without it
+        ai_seats : tuple, optional
+            Seats played by the pool, by default AI_SEATS
+        max_tables : int, optional
+            Tables in play at once, by default 1024
+        """
+        self.pool = pool
+        self.ai_seats = ai_seats
+        self._tables = asyncio.Semaphore(max_tables)
+
+    def agents(self, rng) -> list:
+        return [PooledAgent(self.pool, rng) if self.pool is not None and seat in self.ai_seats
+                else RandomAgent(rng) for seat in range(4)]
+
+    async def play(self, seed, table=0):
+        async with self._tables:
+            rng = random.Random(seed)
+            return await play_table(self.agents(rng), rng.getrandbits(64), table)
+
+    async def run(self, n_games, seed=None, return_results=False):
+        """Play n_games tables, at most max_tables at once
+
+        Returns
+        -------
+        dict | tuple
+            Statistics from runner.merge_results with the decisions and
+            timeouts of the pool, and the list of results if return_results
+        """
+        seed_stream = random.Random(seed)
+        seeds = [seed_stream.getrandbits(64) for _ in range(n_games)]
+        results = await asyncio.gather(*(self.play(table_seed, table)
+                                         for table, table_seed in enumerate(seeds)))
+        stats = merge_results(results)
+        if self.pool is not None:
+            stats.update(self.pool.stats)
+        if return_results:
+            return stats, results
+        return stats
+
+
+async def serve(n_games, workers=None, max_tables=1024, move_timeout=1.0, policy="monte_carlo",
+                iteration=100, seed=None) -> dict:
+    """Play n_games with the AI seats on a new pool"""
+    pool = AIPool(workers, move_timeout=move_timeout, policy=policy, iteration=iteration)
+    try:
+        return await TableManager(pool, max_tables=max_tables).run(n_games, seed)
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play many tables concurrently")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--tables", type=int, default=1024, help="tables in play at once")
+    parser.add_argument("--timeout", type=float, default=1.0, help="deadline of a move in seconds")
+    parser.add_argument("--policy", default="monte_carlo", choices=["monte_carlo", "ismcts"])
+    parser.add_argument("--iteration", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    stats = asyncio.run(serve(args.games, args.workers, args.tables, args.timeout, args.policy,
+                              args.iteration, args.seed))
+    print("Games: {} All pass: {} Timeouts: {}/{}".format(
+        stats["games"], stats["all_pass"], stats.get("timeouts", 0), stats.get("decisions", 0)))
+    print("Win Rate: {:.2f} %".format(stats["win_rate"] * 100))
@@ -0,0 +1,254 @@
+"""Incremental game state of the play of a hand
+
+GameState holds the whole state of the play as integers: the hand masks,
+the cards of the current trick, the leader, the trump suit and whether a
+trump was played, and the tricks won by each team. make_move and
+unmake_move update it in place and an undo stack restores every field, so
+searches explore a hand without copying anything.
+
+Snapshot is the immutable counterpart for positions that must be kept:
+a namedtuple of small ints and tuples, derived from its parent by play
+without touching it (the hands left unchanged are shared), hashable and
+pickled in a few dozen bytes, e.g. to key search trees, log a replay or
+send positions to worker processes.
+
+Seats go clockwise (next_player) and seats 0/2 play against seats 1/3.
+"""
+from collections import namedtuple
+
+import bitboard
+from bitboard import CARDS_PER_SUIT, SUIT_MASKS
+
+
+class GameState:
+
+    __slots__ = ("hands", "leader", "trick", "suit_call", "trump_suit", "trump_played",
+                 "tricks", "_trump", "_best", "_best_seat", "_undo")
+
+    def __init__(self, hands, leader=0, trump_suit=None, trump_played=False, trick=(), tricks=(0, 0)):
+        """State of the play from a deal
+
+        Parameters
+        ----------
+        hands : iterable
+            Hand mask of each seat
+        leader : int, optional
+            Seat that led the current trick, or leads the next one, by default 0
+        trump_suit : SuitsEnum | int | None, optional, by default None
+        trump_played : bool, optional, by default False
+        trick : iterable, optional
+            Card indices already played to the current trick, they must not
+            be in hands anymore, by default ()
+        tricks : iterable, optional
+            Tricks already won by seats 0/2 and by seats 1/3, by default (0, 0)
+        """
+        self.hands = list(hands)
+        self.leader = leader
+        self.trick = []
+        self.suit_call = 0
+        self.trump_suit = trump_suit
+        self.trump_played = trump_played
+        self.tricks = list(tricks)
+        self._trump = trump_suit - 1 if trump_suit and SUIT_MASKS[trump_suit] else -1
+        self._best = -1
+        self._best_seat = -1
+        self._undo = []
+        # Replay the cards of the current trick on the resolved winning card
+        for card in trick:
+            self._add_to_trick(card, (leader + len(self.trick)) % 4)
+
+    @classmethod
+    def from_players(cls, players: list, leader, trump_suit=None, trump_played=False, trick=()):
+        """State of a game in play, seats follow the order of players
+
+        Parameters
+        ----------
+        players : list
+            list of 4 players (Player Object) in next_player order
+        leader : Player
+            Player who led the current trick
+        trump_suit : SuitsEnum | None, optional, by default None
+        trump_played : bool, optional, by default False
+        trick : iterable, optional
+            Cards (Card Object) already played to the current trick, by default ()
+        """
+        return cls([player.mask for player in players], players.index(leader), trump_suit,
+                   trump_played, [card.index for card in trick])
+
+    @classmethod
+    def from_snapshot(cls, snapshot: "Snapshot"):
+        """Mutable state of a Snapshot"""
+        return cls(snapshot.hands, snapshot.leader, snapshot.trump_suit, snapshot.trump_played,
+                   snapshot.trick, snapshot.tricks)
+
+    def snapshot(self) -> "Snapshot":
+        """Immutable copy of the state"""
+        return Snapshot(tuple(self.hands), self.leader, tuple(self.trick), int(self.trump_suit or 0),
+                        self.trump_played, tuple(self.tricks))
+
+    def to_move(self) -> int:
+        """Seat of the player to play"""
+        return (self.leader + len(self.trick)) % 4
+
+    def legal_moves(self) -> int:
+        """Mask of the cards the player to move can play"""
+        hand = self.hands[(self.leader + len(self.trick)) % 4]
+        if not self.trick:
+            return bitboard.playable_lead(hand, self.trump_played, self.trump_suit)
+        return hand & SUIT_MASKS[self.suit_call] or hand
+
+    def finished(self) -> bool:
+        return not self.trick and not self.hands[self.leader]
+
+    @property
+    def depth(self) -> int:
+        """Number of moves made since the state was created"""
+        return len(self._undo)
+
+    def _add_to_trick(self, card: int, seat: int):
+        trick = self.trick
+        if not trick:
+            self.suit_call = card // CARDS_PER_SUIT + 1
+            self._best = card
+            self._best_seat = seat
+        elif card // CARDS_PER_SUIT == self._best // CARDS_PER_SUIT:
+            if card > self._best:
+                self._best = card
+                self._best_seat = seat
+        elif card // CARDS_PER_SUIT == self._trump:
+            self._best = card
+            self._best_seat = seat
+        trick.append(card)
+
+    def make_move(self, card: int):
+        """Play a card index for the player to move
+
+        Legality is not checked, see legal_moves.
+
+        Raises
+        ------
+        ValueError
+            When the player to move does not hold the card
+        """
+        trick = self.trick
+        seat = (self.leader + len(trick)) % 4
+        bit = 1 << card
+        if not self.hands[seat] & bit:
+            raise ValueError("Card {} is not in the hand of seat {}".format(card, seat))
+        undo = (card, self.leader, self.suit_call, self._best, self._best_seat, self.trump_played)
+        self.hands[seat] ^= bit
+        self._add_to_trick(card, seat)
+        if len(trick) < 4:
+            self._undo.append(undo + (None,))
+            return
+        # The winner of the trick leads the next one
+        winner = self._best_seat
+        self.tricks[winner & 1] += 1
+        if self._best // CARDS_PER_SUIT == self._trump:
+            self.trump_played = True
+        self.leader = winner
+        self.trick = []
+        self._undo.append(undo + (trick,))
+
+    def unmake_move(self) -> int:
+        """Undo the last move and return its card index"""
+        card, leader, self.suit_call, self._best, self._best_seat, self.trump_played, \
+            completed_trick = self._undo.pop()
+        if completed_trick is not None:
+            self.tricks[self.leader & 1] -= 1
+            self.trick = completed_trick
+        self.leader = leader
+        self.trick.pop()
+        self.hands[(leader + len(self.trick)) % 4] |= 1 << card
+        return card
+
+
+class Snapshot(namedtuple("Snapshot", ["hands", "leader", "trick", "trump_suit", "trump_played", "tricks"])):
+    """Immutable state of the play
+
+    Fields are those of GameState as tuples: hands is the hand mask of each
+    seat, trick the card indices of the current trick, trump_suit a
+    SuitsEnum value (0 without trumps) and tricks the tricks won by seats
+    0/2 and by seats 1/3.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def start(cls, hands, leader=0, trump_suit=None, trump_played=False):
+        """Snapshot at the start of the play of a deal
+
+        Parameters
+        ----------
+        hands : iterable
+            Hand mask of each seat
+        leader : int, optional
+            Seat leading the first trick, by default 0
+        trump_suit : SuitsEnum | int | None, optional, by default None
+        trump_played : bool, optional, by default False
+        """
+        return cls(tuple(hands), leader, (), int(trump_suit or 0), trump_played, (0, 0))
+
+    @classmethod
+    def from_players(cls, players: list, leader, trump_suit=None, trump_played=False, trick=(),
+                     tricks=(0, 0)):
+        """Snapshot of a game in play, seats follow the order of players
+
+        Parameters
+        ----------
+        players : list
+            list of 4 players (Player Object) in next_player order
+        leader : Player
+            Player who led the current trick
+        trump_suit : SuitsEnum | None, optional, by default None
+        trump_played : bool, optional, by default False
+        trick : iterable, optional
+            Cards (Card Object) already played to the current trick, by default ()
+        tricks : iterable, optional
+            Tricks already won by seats 0/2 and by seats 1/3, by default (0, 0)
+        """
+        return cls(tuple(player.mask for player in players), players.index(leader),
+                   tuple(card.index for card in trick), int(trump_suit or 0), trump_played,
+                   tuple(tricks))
+
+    def to_move(self) -> int:
+        """Seat of the player to play"""
+        return (self.leader + len(self.trick)) % 4
+
+    def legal_moves(self) -> int:
+        """Mask of the cards the player to move can play"""
+        hand = self.hands[(self.leader + len(self.trick)) % 4]
+        if not self.trick:
+            return bitboard.playable_lead(hand, self.trump_played, self.trump_suit)
+        return hand & SUIT_MASKS[self.trick[0] // CARDS_PER_SUIT + 1] or hand
+
+    def finished(self) -> bool:
+        return not self.trick and not self.hands[self.leader]
+
+    def play(self, card: int) -> "Snapshot":
+        """Snapshot after the player to move plays a card index
+
+        Legality is not checked, see legal_moves.
+
+        Raises
+        ------
+        ValueError
+            When the player to move does not hold the card
+        """
+        hands, leader, trick, trump_suit, trump_played, tricks = self
+        seat = (leader + len(trick)) % 4
+        bit = 1 << card
+        if not hands[seat] & bit:
+            raise ValueError("Card {} is not in the hand of seat {}".format(card, seat))
+        hands = hands[:seat] + (hands[seat] ^ bit,) + hands[seat + 1:]
+        trick += (card,)
+        if len(trick) < 4:
+            return tuple.__new__(Snapshot, (hands, leader, trick, trump_suit, trump_played, tricks))
+        # The winner of the trick leads the next one
+        best = bitboard.winner(bitboard.mask_from_indices(trick), trick[0] // CARDS_PER_SUIT + 1,
+                               trump_suit)
+        winner = (leader + trick.index(best)) % 4
+        if trump_suit and SUIT_MASKS[trump_suit] >> best & 1:
+            trump_played = True
+        tricks = (tricks[0] + 1, tricks[1]) if winner % 2 == 0 else (tricks[0], tricks[1] + 1)
+        return tuple.__new__(Snapshot, (hands, winner, (), trump_suit, trump_played, tricks))
@@ -0,0 +1,382 @@
+"""Endgame tablebase of the last tricks
+
+Exact tricks won by the side of the leader for every position with up to
+max_cards cards per hand at the start of a trick. Positions are keyed with
+the rank equivalence of the remaining cards (only the owners of the
+remaining cards of each suit from the top down matter, as in
+transposition.py), the seats are turned so the leader is seat 0 and the
+suits other than the trump suit are sorted, so the four trump suits share
+one table and no trump has the other one.
+
+The tables are solved backwards from one card per hand: every trick is
+searched to its end and the rest of the hand is read from the positions
+with one card less. They are stored as sorted uint64 keys and uint8 values
+and read back through memory maps.
+
+A trump has always been played before the last 3 tricks, so trump_played
+only changes the key while the 13 trumps remain.
+
+    python tablebase.py tablebase.bin --max-cards 2
+"""
+import argparse
+import struct
+from functools import lru_cache
+
+import numpy as np
+
+import bitboard
+from bitboard import CARDS_PER_SUIT, SUIT_MASKS
+from transposition import TranspositionTable
+
+MAGIC = b"TCEB"
+VERSION = 1
+# magic, version, max_cards, trump entries, no trump entries
+HEADER = struct.Struct("<4sIIII4x")
+HEADER_SIZE = HEADER.size
+
+# Tables of the file
+TRUMP = 0
+NOTRUMP = 1
+# Trump suit of the positions of the TRUMP table, the suits of a key are placed in suit order
+TABLE_TRUMP_SUIT = (1, None)
+
+SUIT_BITS = (1 << CARDS_PER_SUIT) - 1
+
+# Size of the least recently used cache of suit codes
+SUIT_CODE_CACHE_SIZE = 1 << 16
+# Default size of the cache of the positions read by a Tablebase
+CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=SUIT_CODE_CACHE_SIZE)
+def suit_code(suit_masks: tuple) -> tuple:
+    """Length and owners of the remaining cards of a suit
+
+    Parameters
+    ----------
+    suit_masks : tuple
+        13-bit masks of a single suit, one per seat
+
+    Returns
+    -------
+    tuple
+        (length, owners) with the seats of the cards packed 2 bits each
+        from the top down
+    """
+    remaining = suit_masks[0] | suit_masks[1] | suit_masks[2] | suit_masks[3]
+    length = remaining.bit_count()
+    owners = 0
+    while remaining:
+        top = remaining.bit_length() - 1
+        remaining ^= 1 << top
+        for seat, mask in enumerate(suit_masks):
+            if mask >> top & 1:
+                owners = owners << 2 | seat
+                break
+    return length, owners
+
+
+def _pack(codes, locked: bool) -> int:
+    """Key of 4 suit codes, the lengths first so the owners can be told apart"""
+    key = int(locked)
+    for length, _ in codes:
+        key = key << 5 | length
+    for length, owners in codes:
+        key = key << 2 * length | owners
+    return key
+
+
+def _table(trump_suit) -> int:
+    return TRUMP if trump_suit and SUIT_MASKS[trump_suit] else NOTRUMP
+
+
+def position_key(hands, trump_suit=None, trump_played=False) -> int:
+    """Key of a position at the start of a trick led by seat 0
+
+    Parameters
+    ----------
+    hands : list
+        4 hand masks of equal size, indexed by seat
+    trump_suit : SuitsEnum | int | None, optional, by default None
+    trump_played : bool, optional, by default False
+
+    Returns
+    -------
+    int
+        Key in the table of the trump suit
+    """
+    trump = trump_suit if _table(trump_suit) == TRUMP else 0
+    codes = []
+    trump_code = None
+    for suit in range(1, 5):
+        shift = (suit - 1) * CARDS_PER_SUIT
+        code = suit_code((hands[0] >> shift & SUIT_BITS, hands[1] >> shift & SUIT_BITS,
+                          hands[2] >> shift & SUIT_BITS, hands[3] >> shift & SUIT_BITS))
+        if suit == trump:
+            trump_code = code
+        else:
+            codes.append(code)
+    codes.sort(reverse=True)
+    if trump_code is None:
+        return _pack(codes, False)
+    return _pack([trump_code] + codes, not trump_played and trump_code[0] == CARDS_PER_SUIT)
+
+
+def trick_tricks(hands, leader: int, trick, trump_suit, trump_played, lookup) -> int:
+    """Tricks won by seats 0/2 from the trick in progress to the end of the hand
+
+    The trick is searched to its end, the tricks after it are given by
+    lookup(hands, leader, trump_played).
+
+    Parameters
+    ----------
+    hands : list
+        4 hand masks indexed by seat, without the cards of trick
+    leader : int
+        Seat who led the trick
+    trick : tuple
+        Card indices of the trick in play order
+    trump_suit : SuitsEnum | int | None
+    trump_played : bool
+    lookup : callable
+
+    Returns
+    -------
+    int
+    """
+    position = len(trick)
+    if position == 4:
+        suit_call = bitboard.suit_of(trick[0])
+        winning_card = bitboard.winner(bitboard.mask_from_indices(trick), suit_call, trump_suit)
+        winner = (leader + trick.index(winning_card)) % 4
+        if trump_suit and SUIT_MASKS[trump_suit] & bitboard.mask_from_indices(trick):
+            trump_played = True
+        return (winner % 2 == 0) + lookup(hands, winner, trump_played)
+
+    seat = (leader + position) % 4
+    hand = hands[seat]
+    if position == 0:
+        legal = bitboard.playable_lead(hand, trump_played, trump_suit)
+    else:
+        legal = bitboard.playable(hand, bitboard.suit_of(trick[0]))
+    maximizing = seat % 2 == 0
+    # Tricks left including the one in progress
+    upper = hand.bit_count() + (position > 0)
+    best = -1 if maximizing else upper + 1
+    for card in bitboard.indices(legal):
+        hands[seat] = hand ^ (1 << card)
+        value = trick_tricks(hands, leader, trick + (card,), trump_suit, trump_played, lookup)
+        hands[seat] = hand
+        if maximizing:
+            best = max(best, value)
+            if best == upper:
+                break
+        else:
+            best = min(best, value)
+            if best == 0:
+                break
+    return best
+
+
+def _owner_sequences(length: int, remaining: tuple):
+    """Every owner sequence of a suit, with the cards left to each seat"""
+    if length == 0:
+        yield 0, remaining
+        return
+    for seat in range(4):
+        if remaining[seat]:
+            left = remaining[:seat] + (remaining[seat] - 1,) + remaining[seat + 1:]
+            for owners, rest in _owner_sequences(length - 1, left):
+                yield seat << 2 * (length - 1) | owners, rest
+
+
+def canonical_codes(num_of_cards: int, table: int):
+    """Suit codes of every position of a table with num_of_cards cards per hand
+
+    The suits after the trump suit (every suit without trumps) are in
+    decreasing order, so each position is generated once.
+    """
+    def suits(index, remaining, previous):
+        if index == 4:
+            if not any(remaining):
+                yield ()
+            return
+        free = index > 0 or table == NOTRUMP
+        total = sum(remaining)
+        lengths = [total] if index == 3 else range(total + 1)
+        for length in lengths:
+            if free and previous is not None and length > previous[0]:
+                break
+            for owners, left in _owner_sequences(length, remaining):
+                code = (length, owners)
+                if free and previous is not None and code > previous:
+                    continue
+                for rest in suits(index + 1, left, code if free else previous):
+                    yield (code,) + rest
+    return suits(0, (num_of_cards,) * 4, None)
+
+
+def representative(codes) -> list:
+    """Hands of a position from its suit codes, suit i + 1 holds the code i from the ACE down"""
+    hands = [0] * 4
+    for index, (length, owners) in enumerate(codes):
+        top = index * CARDS_PER_SUIT + CARDS_PER_SUIT - 1
+        for rank in range(length):
+            seat = owners >> 2 * (length - 1 - rank) & 3
+            hands[seat] |= 1 << (top - rank)
+    return hands
+
+
+def _rotated_lookup(table_lookup):
+    """lookup of trick_tricks from a lookup of positions led by seat 0"""
+    def lookup(hands, leader, trump_played):
+        if not hands[leader]:
+            return 0
+        rotated = [hands[(leader + i) % 4] for i in range(4)]
+        tricks = table_lookup(rotated, trump_played)
+        return tricks if leader % 2 == 0 else hands[leader].bit_count() - tricks
+    return lookup
+
+
+def build(max_cards=2, verbose=False) -> dict:
+    """Solve every position with up to max_cards cards per hand
+
+    Parameters
+    ----------
+    max_cards : int, optional
+        The tables grow about 40 times per card, by default 2
+    verbose : bool, optional, by default False
+
+    Returns
+    -------
+    dict
+        TRUMP / NOTRUMP -> {key: tricks of the leader's side}
+    """
+    if not 1 <= max_cards <= CARDS_PER_SUIT:
+        raise ValueError("max_cards must be between 1 and 13")
+    tables = {}
+    for table in (TRUMP, NOTRUMP):
+        trump_suit = TABLE_TRUMP_SUIT[table]
+        solved = {}
+        lookup = _rotated_lookup(
+            lambda hands, trump_played: solved[position_key(hands, trump_suit, trump_played)])
+        for num_of_cards in range(1, max_cards + 1):
+            for codes in canonical_codes(num_of_cards, table):
+                hands = representative(codes)
+                locks = (False, True) if table == TRUMP and codes[0][0] == CARDS_PER_SUIT else (False,)
+                for locked in locks:
+                    solved[_pack(codes, locked)] = trick_tricks(
+                        hands, 0, (), trump_suit, not locked, lookup)
+            if verbose:
+                print("{} cards: {} positions".format(num_of_cards, len(solved)))
+        tables[table] = solved
+    return tables
+
+
+def save(path, tables: dict, max_cards: int):
+    """Write the tables of build, sorted by key"""
+    arrays = []
+    for table in (TRUMP, NOTRUMP):
+        keys = np.fromiter(tables[table].keys(), dtype=np.uint64, count=len(tables[table]))
+        values = np.fromiter(tables[table].values(), dtype=np.uint8, count=len(tables[table]))
+        order = np.argsort(keys)
+        arrays.append((keys[order], values[order]))
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, max_cards, len(arrays[0][0]), len(arrays[1][0])))
+        for keys, _ in arrays:
+            file.write(keys.tobytes())
+        for _, values in arrays:
+            file.write(values.tobytes())
+
+
+class Tablebase:
+
+    def __init__(self, path, cache_size=CACHE_SIZE):
+        """Memory-mapped read only endgame tablebase
+
+        Parameters
+        ----------
+        path : str | os.PathLike
+        cache_size : int, optional
+            Positions of each table kept in a least recently used cache,
+            by default CACHE_SIZE
+        """
+        with open(path, "rb") as file:
+            magic, version, max_cards, *sizes = HEADER.unpack(file.read(HEADER_SIZE))
+        if magic != MAGIC:
+            raise ValueError("Not a tablebase file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported tablebase version {version}")
+        self.max_cards = max_cards
+        self._keys = []
+        self._values = []
+        offset = HEADER_SIZE
+        for size in sizes:
+            self._keys.append(np.memmap(path, dtype=np.uint64, mode="r", offset=offset, shape=(size,)))
+            offset += 8 * size
+        for size in sizes:
+            self._values.append(np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(size,)))
+            offset += size
+        self._cache = (TranspositionTable(cache_size), TranspositionTable(cache_size))
+
+    def __len__(self) -> int:
+        return len(self._keys[TRUMP]) + len(self._keys[NOTRUMP])
+
+    def covers(self, hand_size: int) -> bool:
+        """Check if tricks solves the positions with hand_size cards per hand
+
+        The trick in progress is searched, so the tables cover one card more
+        than max_cards.
+        """
+        return hand_size <= self.max_cards + 1
+
+    def _leader_tricks(self, hands, trump_suit, trump_played) -> int:
+        table = _table(trump_suit)
+        key = position_key(hands, trump_suit, trump_played)
+        cache = self._cache[table]
+        tricks = cache.get(key)
+        if tricks is None:
+            keys = self._keys[table]
+            index = int(np.searchsorted(keys, np.uint64(key)))
+            if index == len(keys) or int(keys[index]) != key:
+                raise KeyError("Position of {} cards per hand is not in the tablebase".format(
+                    hands[0].bit_count()))
+            tricks = int(self._values[table][index])
+            cache.store(key, tricks)
+        return tricks
+
+    def tricks(self, hands, leader: int, trump_suit=None, trump_played=False, trick=()) -> int:
+        """Exact tricks won by seats 0/2 from the trick in progress to the end of the hand
+
+        Parameters
+        ----------
+        hands : list
+            4 hand masks indexed by seat, without the cards of trick
+        leader : int
+            Seat who leads the trick in progress
+        trump_suit : SuitsEnum | int | None, optional, by default None
+        trump_played : bool, optional
+            A trump was played before the trick in progress, by default False
+        trick : iterable, optional
+            Card indices of the trick in progress in play order, by default ()
+
+        Returns
+        -------
+        int
+
+        Raises
+        ------
+        KeyError
+            When the hands hold more cards than covers allows
+        """
+        lookup = _rotated_lookup(
+            lambda rotated, played: self._leader_tricks(rotated, trump_suit, played))
+        return trick_tricks(list(hands), leader, tuple(trick), trump_suit, trump_played, lookup)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the endgame tablebase")
+    parser.add_argument("path")
+    parser.add_argument("--max-cards", type=int, default=2)
+    args = parser.parse_args()
+    save(args.path, build(args.max_cards, verbose=True), args.max_cards)
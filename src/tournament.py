@@ -0,0 +1,205 @@
+"""Duplicate tournament of two AI policies
+
+Every deal is played twice with the same hands and contract: policy A
+holds seats 0/2 and policy B seats 1/3 at the first table, and the seats
+are swapped at the second one. The luck of the cards cancels out of the
+difference between the two tables, so the paired differences have a much
+smaller variance than the win rates of independent games.
+
+A policy is a dict of server.decide arguments, e.g. {"policy": "random"}
+or {"policy": "monte_carlo", "iteration": 200, "engine": "numpy"}. The
+moves of both tables are seeded from the same stream, so identical
+policies make identical moves.
+
+    python tournament.py --deals 500 --workers 4 --a '{"iteration": 400}' --b '{"iteration": 100}'
+"""
+import argparse
+import json
+import math
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+from server import decide, deal_and_auction, move_request
+from state import GameState
+from trump import PASS
+
+# Number of deals played by one worker task, results do not depend on the number of workers
+SHARD_SIZE = 20
+
+# Tricks won by seats 0/2 at the table where A holds them and where B holds them
+DealResult = namedtuple("DealResult", ["trump_suit", "contract_value", "declarer", "a_tricks", "b_tricks"])
+
+
+def play_table(hands, declarer: int, trump_suit: int, policies, seed) -> int:
+    """Play the 13 tricks of a deal, policies[0] holds seats 0/2 and policies[1] seats 1/3
+
+    Returns
+    -------
+    int
+        Tricks won by seats 0/2
+    """
+    rng = random.Random(seed)
+    state = GameState(hands, declarer, trump_suit)
+    history = []
+    while not state.finished():
+        request = move_request(state, history=history)
+        options = dict(policies[request.seat % 2])
+        card = decide(request, options.pop("policy", "monte_carlo"), seed=rng.getrandbits(64),
+                      **options)
+        state.make_move(card)
+        history.append((request.seat, card))
+    return state.tricks[0]
+
+
+def play_deal(policies, seed) -> DealResult:
+    """Play a deal at both tables, None when every player passed
+
+    Parameters
+    ----------
+    policies : tuple
+        Options of policy A and policy B
+    seed : int
+        Seed of the deal, the auction and the moves
+
+    Returns
+    -------
+    DealResult | None
+    """
+    hands, highest_bid, declarer = deal_and_auction(seed)
+    if highest_bid == PASS:
+        return None
+    trump_suit = int(highest_bid.suit)
+    a_policy, b_policy = policies
+    return DealResult(trump_suit, highest_bid.value, declarer,
+                      play_table(hands, declarer, trump_suit, (a_policy, b_policy), seed),
+                      play_table(hands, declarer, trump_suit, (b_policy, a_policy), seed))
+
+
+def _play_shard(policies, seeds) -> list:
+    """Worker task playing the deals of a shard"""
+    return [play_deal(policies, seed) for seed in seeds]
+
+
+def _interval(values, confidence) -> dict:
+    """Mean, standard error and normal confidence interval of paired differences"""
+    n = len(values)
+    mean = sum(values) / n if n else 0.0
+    variance = sum((value - mean) ** 2 for value in values) / (n - 1) if n > 1 else 0.0
+    std_error = math.sqrt(variance / n) if n else 0.0
+    radius = NormalDist().inv_cdf((1 + confidence) / 2) * std_error
+    return {"mean": mean, "std_error": std_error, "low": mean - radius, "high": mean + radius}
+
+
+def summarize(results, confidence=0.95) -> dict:
+    """Paired statistics of the deals of a tournament
+
+    Parameters
+    ----------
+    results : iterable of DealResult | None
+    confidence : float, optional
+        Level of the confidence intervals, by default 0.95
+
+    Returns
+    -------
+    dict
+        deals, all_pass, a_win_rate and b_win_rate over both tables,
+        win_rate_difference (A - B) and trick_difference (tricks per deal
+        of A - B) as {mean, std_error, low, high}, and unpaired_std_error,
+        the standard error of the win rate difference from the same number
+        of independent games
+    """
+    all_pass = 0
+    played = []
+    for result in results:
+        if result is None:
+            all_pass += 1
+        else:
+            played.append(result)
+    # Seats 0/2 win with 7 tricks or more
+    a_wins = [result.a_tricks > 6 for result in played]
+    b_wins = [result.b_tricks > 6 for result in played]
+    deals = len(played)
+    a_win_rate = (sum(a_wins) + deals - sum(b_wins)) / (2 * deals) if deals else 0.0
+    # Independent games of A against B win with a_win_rate
+    unpaired = math.sqrt(4 * a_win_rate * (1 - a_win_rate) / (2 * deals)) if deals else 0.0
+    return {
+        "deals": deals,
+        "all_pass": all_pass,
+        "a_win_rate": a_win_rate,
+        "b_win_rate": 1 - a_win_rate if deals else 0.0,
+        "win_rate_difference": _interval(
+            [int(a) - int(b) for a, b in zip(a_wins, b_wins)], confidence),
+        "trick_difference": _interval(
+            [result.a_tricks - result.b_tricks for result in played], confidence),
+        "unpaired_std_error": unpaired,
+    }
+
+
+def run_tournament(policy_a: dict, policy_b: dict, n_deals: int, workers=1, seed=None, confidence=0.95,
+                   return_results=False):
+    """Duplicate tournament of policy A against policy B over process shards
+
+    Each shard gets its deal seeds from seed, so a seeded run gives the
+    same statistics for any number of workers.
+
+    Parameters
+    ----------
+    policy_a : dict
+        Options of server.decide, "policy" defaults to "monte_carlo"
+    policy_b : dict
+    n_deals : int
+        Number of deals, all-pass deals included
+    workers : int, optional
+        Number of processes, 1 runs in the current process, by default 1
+    seed : int | None, optional, by default None
+    confidence : float, optional
+        See summarize, by default 0.95
+    return_results : bool, optional
+        Also return the list of DealResult | None, by default False
+
+    Returns
+    -------
+    dict | tuple
+        Statistics from summarize, and the list of results if return_results
+    """
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    seed_stream = random.Random(seed)
+    seeds = [seed_stream.getrandbits(64) for _ in range(n_deals)]
+    shards = [seeds[start:start + SHARD_SIZE] for start in range(0, n_deals, SHARD_SIZE)]
+    policies = (policy_a, policy_b)
+    if workers == 1:
+        shard_results = [_play_shard(policies, shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            shard_results = list(executor.map(_play_shard, [policies] * len(shards), shards))
+
+    results = [result for shard in shard_results for result in shard]
+    stats = summarize(results, confidence)
+    if return_results:
+        return stats, results
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Duplicate tournament of two AI policies")
+    parser.add_argument("--a", type=json.loads, default={"policy": "monte_carlo"},
+                        help="options of policy A as JSON")
+    parser.add_argument("--b", type=json.loads, default={"policy": "random"},
+                        help="options of policy B as JSON")
+    parser.add_argument("--deals", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    args = parser.parse_args()
+    stats = run_tournament(args.a, args.b, args.deals, args.workers, args.seed, args.confidence)
+    print("Deals: {} All pass: {}".format(stats["deals"], stats["all_pass"]))
+    print("Win Rate A: {:.2f} % B: {:.2f} %".format(stats["a_win_rate"] * 100, stats["b_win_rate"] * 100))
+    for name in ("win_rate_difference", "trick_difference"):
+        interval = stats[name]
+        print("{}: {:+.3f} [{:+.3f}, {:+.3f}]".format(
+            name, interval["mean"], interval["low"], interval["high"]))
+    print("Paired std error: {:.4f} Unpaired: {:.4f}".format(
+        stats["win_rate_difference"]["std_error"], stats["unpaired_std_error"]))
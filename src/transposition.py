@@ -0,0 +1,205 @@
+"""Canonical game state keys and a bounded transposition table for game tree search
+
+Positions are keyed by the owner sequence of the remaining cards in each suit,
+so two positions that only differ by cards already played share a key.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+
+from bitboard import CARDS_PER_SUIT
+
+# Size of the least recently used cache of suit owner sequences
+SUIT_PATTERN_CACHE_SIZE = 1 << 16
+
+SUIT_BITS = (1 << CARDS_PER_SUIT) - 1
+
+
+@lru_cache(maxsize=SUIT_PATTERN_CACHE_SIZE)
+def suit_pattern(suit_masks: tuple) -> int:
+    """Encode the owners of the remaining cards of a suit from the top down
+
+    Parameters
+    ----------
+    suit_masks : tuple
+        13-bit masks of a single suit, one per owner (at most 8 owners)
+
+    Returns
+    -------
+    int
+        Owner indices packed 3 bits each behind a leading 1 bit
+    """
+    remaining = 0
+    for mask in suit_masks:
+        remaining |= mask
+    pattern = 1
+    while remaining:
+        top = remaining.bit_length() - 1
+        remaining ^= 1 << top
+        for owner, mask in enumerate(suit_masks):
+            if mask >> top & 1:
+                pattern = pattern << 3 | owner
+                break
+    return pattern
+
+
+def state_key(hands, leader: int, trick=(), trump_suit=None, trump_played=False) -> tuple:
+    """Canonical hashable key of a game state
+
+    Cards of the trick in progress count as remaining cards owned by their
+    position in the trick, so the key keeps whether they beat the cards in hand.
+
+    Parameters
+    ----------
+    hands : iterable
+        4 hand masks indexed by seat, e.g. [player.mask for player in players]
+    leader : int
+        Seat of the player who led the current trick
+    trick : iterable, optional
+        Card indices of the trick in progress in play order, by default ()
+    trump_suit : SuitsEnum | int | None, optional, by default None
+    trump_played : bool, optional, by default False
+
+    Returns
+    -------
+    tuple
+    """
+    owners = list(hands)
+    for card in trick:
+        owners.append(1 << card)
+    key = []
+    for suit in range(4):
+        shift = suit * CARDS_PER_SUIT
+        key.append(suit_pattern(
+            tuple(mask >> shift & SUIT_BITS for mask in owners)))
+    key.append(leader)
+    key.append(len(owners) - 4)
+    key.append(int(trump_suit or 0))
+    key.append(bool(trump_played))
+    return tuple(key)
+
+
+class TranspositionTable:
+
+    def __init__(self, max_size=1_000_000, policy="lru"):
+        """Size bounded cache of search results
+
+        Parameters
+        ----------
+        max_size : int, optional
+            Maximum number of entries, by default 1_000_000
+        policy : str, optional
+            "lru" evicts the least recently used entry when full,
+            "depth" hashes keys to max_size slots and only replaces an entry
+            with one of the same or a greater depth, by default "lru"
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if policy not in ("lru", "depth"):
+            raise ValueError("policy argument is lru/depth")
+        self._max_size = max_size
+        self._policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+        self.clear()
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    @property
+    def policy(self) -> str:
+        return self._policy
+
+    def clear(self):
+        """Remove every entry, the counters are kept"""
+        self._entries = OrderedDict()
+        self._slots = [None] * self._max_size if self._policy == "depth" else None
+        self._size = 0
+
+    def get(self, key, default=None):
+        """Value stored for key, default when missing
+
+        Parameters
+        ----------
+        key : hashable
+        default : optional, by default None
+        """
+        if self._policy == "lru":
+            value = self._entries.get(key, self)
+            if value is self:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        slot = self._slots[hash(key) % self._max_size]
+        if slot is not None and slot[0] == key:
+            self.hits += 1
+            return slot[1]
+        self.misses += 1
+        return default
+
+    def store(self, key, value, depth=0):
+        """Store a value for key
+
+        Parameters
+        ----------
+        key : hashable
+        value
+        depth : int, optional
+            Size of the subtree the value was searched from, only used by the
+            "depth" policy, by default 0
+        """
+        if self._policy == "lru":
+            entries = self._entries
+            if key in entries:
+                entries.move_to_end(key)
+            elif len(entries) >= self._max_size:
+                entries.popitem(last=False)
+                self.evictions += 1
+            entries[key] = value
+            return
+
+        index = hash(key) % self._max_size
+        slot = self._slots[index]
+        if slot is None:
+            self._size += 1
+        elif slot[0] != key:
+            if depth < slot[2]:
+                self.rejections += 1
+                return
+            self.evictions += 1
+        self._slots[index] = (key, value, depth)
+
+    def __contains__(self, key) -> bool:
+        if self._policy == "lru":
+            return key in self._entries
+        slot = self._slots[hash(key) % self._max_size]
+        return slot is not None and slot[0] == key
+
+    def __len__(self) -> int:
+        if self._policy == "lru":
+            return len(self._entries)
+        return self._size
+
+    def stats(self) -> dict:
+        """Counters of the table
+
+        Returns
+        -------
+        dict
+            size, max_size, hits, misses, evictions, rejections and hit_rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_size": self._max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "rejections": self.rejections,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,5 +1,6 @@
 from enum import IntEnum
 import random
+import bitboard
 
 
 class PipsEnum(IntEnum):
@@ -39,29 +40,72 @@ class SuitsEnum(IntEnum):
 
 class Card:
 
-    def __init__(self, suit_enum: SuitsEnum, pip_enum: PipsEnum, owner=None):
+    __slots__ = ("_suit", "_pip", "_index")
+
+    def __new__(cls, suit_enum: SuitsEnum, pip_enum: PipsEnum):
         """A card representation of a suit and its value
 
+        There is a single immutable instance per card, Card(suit, pip) returns
+        the same object as CARDS[index]. Owners of the cards are tracked by
+        the players holding them, not by the card.
+
         Parameters
         ----------
         suit_enum : SuitsEnum\n
         pip_enum : PipsEnum\n
-        owner : Player | None, optional, by default None
         """
-        if suit_enum not in SuitsEnum.suits_only():
+        if not SuitsEnum.CLUBS <= suit_enum <= SuitsEnum.SPADES:
             raise ValueError("Card Object only takes SuitEnum values of 1-4")
-        self._suit = suit_enum
-        self._pip = pip_enum
-        self._owner = owner
+        if not PipsEnum.TWO <= pip_enum <= PipsEnum.ACE:
+            raise ValueError("Card Object only takes PipsEnum values of 2-14")
+        index = bitboard.card_index(suit_enum, pip_enum)
+        card = _INTERNED_CARDS[index]
+        if card is None:
+            card = super().__new__(cls)
+            object.__setattr__(card, "_suit", SuitsEnum(suit_enum))
+            object.__setattr__(card, "_pip", PipsEnum(pip_enum))
+            object.__setattr__(card, "_index", index)
+            _INTERNED_CARDS[index] = card
+        return card
+
+    @classmethod
+    def from_index(cls, index: int):
+        """Card of a bitboard index
+
+        Parameters
+        ----------
+        index : int
+            Card index from 0-51
+
+        Returns
+        -------
+        Card
+        """
+        return CARDS[index]
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Card objects are immutable")
 
-    # def __eq__(self, other):
-    #     if self._suit == other._suit and self._pip == other._pip:
-    #         return True
-    #     else:
-    #         return super().__eq__(other)
+    def __delattr__(self, name):
+        raise AttributeError("Card objects are immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, Card):
+            return NotImplemented
+        return self._index == other._index
 
     def __hash__(self):
-        return hash((self._suit, self._pip))
+        return self._index
+
+    def __reduce__(self):
+        # Unpickle to the interned instance
+        return (Card, (self._suit, self._pip))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     @property
     def suit(self) -> SuitsEnum:
@@ -88,26 +132,9 @@ class Card:
         return self._pip.name
 
     @property
-    def owner(self):
-        """Player object for the owner of the card
-
-        Returns
-        -------
-        Player
-            Player | None object of the owner of the card
-        """
-        return self._owner
-
-    def set_owner(self, owner):
-        """Set the card's owner
-
-        Parameters
-        ----------
-        owner : Player | None
-            A player object to which the card belongs to
-            None if the card is still in deck or not in players hands
-        """
-        self._owner = owner
+    def index(self) -> int:
+        """Bit index of the card in a bitboard mask"""
+        return self._index
 
     def __repr__(self):
         """Card Representation
@@ -120,6 +147,13 @@ class Card:
         return f"{self.card_name}-{self.suit_name}"
 
 
+_INTERNED_CARDS = [None] * bitboard.NUM_OF_CARDS
+
+# Every card ordered by bitboard index
+CARDS = tuple(Card(SuitsEnum(bitboard.suit_of(index)), PipsEnum(bitboard.pip_of(index)))
+              for index in range(bitboard.NUM_OF_CARDS))
+
+
 class Deck:
 
     def __init__(self, shuffle=False):
@@ -131,20 +165,25 @@ class Deck:
             shuffle the card by initialization, by default False
         """
         self._cards = []
+        self._mask = 0
         self.build_cards()
         if shuffle:
             self.shuffle()
 
     def build_cards(self):
         """Generate a full deck of cards to the deck"""
-        for suit in SuitsEnum.suits_only():
-            for pip in PipsEnum:
-                self._cards.append(Card(suit, pip))
+        self._cards.extend(CARDS)
+        self._mask = bitboard.FULL_MASK
 
     @property
     def cards(self):
         return self._cards
 
+    @property
+    def mask(self) -> int:
+        """Bitboard mask of the cards remaining in the deck"""
+        return self._mask
+
     def shuffle(self):
         """Shuffle the deck"""
         random.shuffle(self._cards)
@@ -174,18 +213,27 @@ class Deck:
         Card
             object
         """
-        return self._cards.pop()
+        card = self._cards.pop()
+        self._mask &= ~(1 << card.index)
+        return card
 
     def remove_cards(self, cards: list):
         for card in cards:
             self._cards.remove(card)
+            self._mask &= ~(1 << card.index)
 
 
 class Bid:
 
-    def __init__(self, value: int, suit):
+    __slots__ = ("_rank", "_value", "_suit")
+
+    def __new__(cls, value: int, suit):
         """A bid class with a value and a suit
 
+        Bids are interned ordinals, the rank 0 is PASS and the bid of value
+        1-6 and suit 1-5 has the rank (value - 1) * 5 + suit, so the 31 bids
+        of BID_LADDER are ordered by rank.
+
         *Note Bid(0,SuitsEnum(0)) is considered a PASS
 
         Parameters
@@ -199,68 +247,85 @@ class Bid:
         if suit == SuitsEnum(0) and value != 0:
             raise ValueError("PASS must be the bid Bid(0,SuitsEnum(0))")
 
-        if value == 0 and suit != SuitsEnum(0):
+        if value == 0:
             # print("Automatic insertion of PASS: Bid(0,SuitsEnum(0))")
             # print(value, suit)
-            self._suit = SuitsEnum(0)
-        else:
-            self._suit = suit
+            return cls.from_rank(0)
+        if not 1 <= value <= 6 or not 1 <= suit <= 5:
+            raise ValueError("Bid takes values of 1-6 and SuitEnum values of 1-5")
+        return cls.from_rank((value - 1) * 5 + suit)
+
+    @classmethod
+    def from_rank(cls, rank: int):
+        """Bid of an ordinal rank
+
+        Parameters
+        ----------
+        rank : int
+            Rank from 0 (PASS) to 30 (6-NOTRUMP)
+
+        Returns
+        -------
+        Bid
+        """
+        bid = _INTERNED_BIDS[rank]
+        if bid is None:
+            bid = super().__new__(cls)
+            object.__setattr__(bid, "_rank", rank)
+            object.__setattr__(bid, "_value", (rank - 1) // 5 + 1 if rank else 0)
+            object.__setattr__(bid, "_suit", SuitsEnum((rank - 1) % 5 + 1 if rank else 0))
+            _INTERNED_BIDS[rank] = bid
+        return bid
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Bid objects are immutable")
 
-        self._value = value
+    def __delattr__(self, name):
+        raise AttributeError("Bid objects are immutable")
 
     def __lt__(self, other):
-        if not isinstance(other, type(self)):
-            return self.value < other
-        if self.value < other.value:
-            return True
-        if self.value == other.value and self.suit < other.suit:
-            return True
-        return False
+        if not isinstance(other, Bid):
+            return self._value < other
+        return self._rank < other._rank
 
     def __le__(self, other):
-        if not isinstance(other, type(self)):
-            return self.value <= other
-        if self.value < other.value:
-            return True
-        if self.value == other.value and self.suit < other.suit:
-            return True
-        if self == other:
-            return True
-        return False
+        if not isinstance(other, Bid):
+            return self._value <= other
+        return self._rank <= other._rank
 
     def __eq__(self, other):
-        if not isinstance(other, type(self)):
-            return self.value == other
-        if self.value == other.value and self.suit == other.suit:
-            return True
-        return False
+        if not isinstance(other, Bid):
+            return self._value == other
+        return self._rank == other._rank
 
     def __ne__(self, other):
-        if not isinstance(other, type(self)):
-            return self.value != other
-        if self.value != other.value or self.suit != other.suit:
-            return True
-        return False
+        if not isinstance(other, Bid):
+            return self._value != other
+        return self._rank != other._rank
 
     def __gt__(self, other):
-        if not isinstance(other, type(self)):
-            return self.value > other
-        if self.value > other.value:
-            return True
-        if self.value == other.value and self.suit > other.suit:
-            return True
-        return False
+        if not isinstance(other, Bid):
+            return self._value > other
+        return self._rank > other._rank
 
     def __ge__(self, other):
-        if not isinstance(other, type(self)):
-            return self.value >= other
-        if self.value > other.value:
-            return True
-        if self.value == other.value and self.suit > other.suit:
-            return True
-        if self == other:
-            return True
-        return False
+        if not isinstance(other, Bid):
+            return self._value >= other
+        return self._rank >= other._rank
+
+    def __hash__(self):
+        # A bid equals the int of its value, so the bids of a value share its hash
+        return hash(self._value)
+
+    def __reduce__(self):
+        # Unpickle to the interned instance
+        return (Bid, (self._value, self._suit))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def num_of_tricks_to_win(self) -> int:
         """Number of tricks to be won by the bid
@@ -272,6 +337,11 @@ class Bid:
         """
         return int(self.value + 6)
 
+    @property
+    def rank(self) -> int:
+        """Ordinal of the bid from 0 (PASS) to 30"""
+        return self._rank
+
     @property
     def suit(self):
         return self._suit
@@ -284,7 +354,15 @@ class Bid:
         return f"{self.value}-{self.suit.name}"
 
 
-PASS = Bid(0, SuitsEnum(0))
+_INTERNED_BIDS = [None] * 31
+
+# Every bid ordered by rank, BID_LADDER[0] is PASS
+BID_LADDER = tuple(Bid.from_rank(rank) for rank in range(31))
+
+PASS = BID_LADDER[0]
+
+# Legal bids of the auction indexed by the rank of the highest current bid
+LEGAL_BIDS = tuple((PASS,) + BID_LADDER[rank + 1:] for rank in range(31))
 
 
 class Player:
@@ -296,6 +374,7 @@ class Player:
         Note : Player desicions should not be implemented here
         """
         self._cards = []
+        self._mask = 0
         self._bid_history = []
         self._current_bid = None
         self._teammate = None
@@ -307,8 +386,28 @@ class Player:
     def cards(self):
         return self._cards
 
+    @property
+    def mask(self) -> int:
+        """Bitboard mask of the cards in hand"""
+        return self._mask
+
     def set_cards(self, cards: list):
         self._cards = cards
+        self._mask = bitboard.mask_of(cards)
+
+    def cards_from_mask(self, mask: int) -> list:
+        """Card objects in hand selected by a bitboard mask
+
+        Parameters
+        ----------
+        mask : int
+            Mask of cards, should be a subset of Player.mask
+
+        Returns
+        -------
+        list
+        """
+        return [CARDS[index] for index in bitboard.indices(mask)]
 
     @property
     def teammate(self):
@@ -402,8 +501,8 @@ class Player:
         for _ in range(num_of_cards):
             # This changes deck object
             card = deck.draw()
-            card.set_owner(self)
             self._cards.append(card)
+            self._mask |= 1 << card.index
 
     def sort_cards(self, sort_by="all", reverse=False):
         """Sort the deck by value and its suits"""
@@ -430,7 +529,7 @@ class Player:
             A set of available suits
         """
 
-        return set(map(lambda card: card.suit, self._cards))
+        return set(map(SuitsEnum, bitboard.available_suits(self._mask)))
 
     def unavailable_suits(self) -> str:
         """Check the unavailabe Suits in Player.cards
@@ -458,11 +557,7 @@ class Player:
         list
             list of cards
         """
-        cards = []
-        for card in self._cards:
-            if card.suit == suit:
-                cards.append(card)
-        return cards
+        return self.cards_from_mask(self._mask & bitboard.SUIT_MASKS[suit])
 
     def isVoid(self) -> bool:
         """Player has no card of some Suit
@@ -471,13 +566,12 @@ class Player:
         -------
         bool
         """
-        if self.unavailable_suits():
-            return True
-        return False
+        return bitboard.is_void(self._mask)
 
     def play(self, card):
         """Player draws a card,plays a hand and remove it from Player.Cards"""
         self._cards.remove(card)
+        self._mask &= ~(1 << card.index)
         return card
 
     def playable_cards(self, suit: SuitsEnum) -> list:
@@ -491,13 +585,11 @@ class Player:
         -------
         list
         """
-        if suit not in self.available_suits():
+        cards_same_suit = self._mask & bitboard.SUIT_MASKS[suit]
+        if not cards_same_suit:
             # print("No more card of suit {}".format(suit.name))
             return self._cards
-        else:
-            cards_same_suit = list(filter(
-                lambda card: card.suit == suit, self._cards))
-            return cards_same_suit
+        return self.cards_from_mask(cards_same_suit)
 
     def playable_lead_cards(self, trump_played=False, trump_suit=None):
         # TODO : Possible Error scenario Trump-Card not yet played but only trump suit remains
@@ -515,12 +607,13 @@ class Player:
         -------
         list
         """
-        if trump_played:
+        if trump_played or not trump_suit:
             return self._cards
         else:
-            cards_no_trump_suit = list(filter(
-                lambda card: card.suit != trump_suit, self._cards))
-            if len(cards_no_trump_suit) == 0:
+            cards_no_trump_suit = self._mask & ~bitboard.SUIT_MASKS[trump_suit]
+            if cards_no_trump_suit == self._mask:
+                return self._cards
+            if not cards_no_trump_suit:
                 try:
                     raise Exception(
                         "Possible Error scenario Trump-Card not yet played but only trump suit remains")
@@ -528,10 +621,11 @@ class Player:
                     print(
                         "Possible Error scenario Trump-Card not yet played but only trump suit remains")
                     return self._cards
-            return cards_no_trump_suit
+            return self.cards_from_mask(cards_no_trump_suit)
 
     def reset(self):
         self._cards = []
+        self._mask = 0
         self._bid_history = []
         self._current_bid = None
 
@@ -1,38 +1,47 @@
 # AB = Auction Bid
 # LP = Leading Player
 # DP = Defending Player
-from trump import Player, Bid, SuitsEnum, Deck, PASS
-from logic import compare_cards, playable_bid
+from trump import Player, Bid, Card, SuitsEnum, PASS, CARDS
+import bitboard
+import double_dummy
+import hand_features
+import instrument
+from card_tracker import ConstraintDealer
+import ismcts
+import math
 import random
-import time
 
+# Simulations given to every remaining candidate per round of the adaptive monte_carlo_LP
+ADAPTIVE_BATCH_SIZE = 10
 
-def random_AB(highest_bid=PASS) -> Bid:
+
+def random_AB(highest_bid=PASS, rng=random) -> Bid:
     """Use random exponential and beta distribution to make Auction Bids given the highest current bid in the auction
 
     Parameters
     ----------
     highest_bid : , optional
         Highest current bid in the auction, by default PASS
+    rng : random.Random, optional, by default the random module
 
     Returns
     -------
     Bid
         The choosen random Bid
     """
-    valid_bid = playable_bid(highest_bid=highest_bid)
-
     # Use Random Exponential Distribution to make card bids
-    num_from_exp_dist = random.expovariate(1)
+    num_from_exp_dist = rng.expovariate(1)
     bid_value_choice = min([0, 1, 2, 3, 4, 5, 6],
                            key=lambda x: abs(x-num_from_exp_dist))
     # Find the closest value from random beta distribution for suits
-    num_from_beta_dist = random.betavariate(2, 2)*4
+    num_from_beta_dist = rng.betavariate(2, 2)*4
     bid_suit_choice = min([0, 1, 2, 3, 4],
                           key=lambda x: abs(x-num_from_beta_dist))+1
-    if Bid(bid_value_choice, SuitsEnum(bid_suit_choice)) not in valid_bid:
+    bid = Bid(bid_value_choice, SuitsEnum(bid_suit_choice))
+    # Only PASS and bids higher than the highest bid are legal
+    if bid <= highest_bid:
         return PASS
-    return Bid(bid_value_choice, SuitsEnum(bid_suit_choice))
+    return bid
 
 
 def random_LP(player: Player, trump_played=False, trump_suit=None):
@@ -43,7 +52,221 @@ def random_DP(player: Player, suit: SuitsEnum):
     return random.choice(player.playable_cards(suit))
 
 
-def monte_carlo_LP(player: Player, cards_played: list, trump_played=False, trump_suit=None, iteration=100):
+def _trick_wins(card, iteration, cards_not_played, hand_size, trick=(), trump_suit=None, dealer=None,
+                count_partner=False, rng=random) -> int:
+    """Number of simulated tricks won by playing a card after the cards of trick, one trick at a time
+
+    The players yet to play hold hand_size cards each and answer with random
+    legal cards. Only the tricks won by the card itself count, unless
+    count_partner also counts the tricks won by the partner.
+    """
+    score = 0
+    position = len(trick)
+    num_of_dummy_players = 3 - position
+    suit_call = bitboard.suit_of(trick[0]) if trick else card.suit
+    # Cards of the trick by position, to find the position of the winning card
+    positions = list(trick) + [card.index]
+    for i in range(iteration):
+        # Simulate random card distribution to the dummy players
+        if dealer is not None:
+            dummy_hands = dealer.sample(rng)[:num_of_dummy_players]
+        else:
+            random_cards = rng.sample(
+                cards_not_played, hand_size * num_of_dummy_players)
+            dummy_hands = [bitboard.mask_from_indices(random_cards[j:j + hand_size])
+                           for j in range(0, len(random_cards), hand_size)]
+        played = positions[:]
+        for dummy_hand in dummy_hands:
+            # Simulate random card being played by the dummy player
+            played.append(bitboard.random_card(bitboard.playable(dummy_hand, suit_call), rng))
+
+        # If the card (or the partner's card) wins the trick update the score
+        winning_position = played.index(bitboard.winner(
+            bitboard.mask_from_indices(played), suit_call, trump_suit))
+        if winning_position == position or \
+                (count_partner and (winning_position - position) % 2 == 0):
+            score += 1
+    return score
+
+
+def _common_trick_wins(cards, iteration, cards_not_played, hand_size, trick=(), trump_suit=None,
+                       dealer=None, count_partner=False, rng=random) -> list:
+    """Number of simulated tricks won by each card, all the cards are played on the same deals
+
+    The hands yet to play are dealt once per iteration in a random order and
+    each player answers with the first legal card in that order, so the
+    replies are uniformly random for every card and shared by all of them.
+    """
+    scores = [0] * len(cards)
+    position = len(trick)
+    num_of_dummy_players = 3 - position
+    for i in range(iteration):
+        if dealer is not None:
+            dummy_hands = [rng.sample(hand, len(hand)) for hand in map(
+                bitboard.indices, dealer.sample(rng)[:num_of_dummy_players])]
+        else:
+            random_cards = rng.sample(
+                cards_not_played, hand_size * num_of_dummy_players)
+            dummy_hands = [random_cards[j:j + hand_size]
+                           for j in range(0, len(random_cards), hand_size)]
+        for c, card in enumerate(cards):
+            played = list(trick)
+            played.append(card.index)
+            suit_call = bitboard.suit_of(played[0])
+            for dummy_hand in dummy_hands:
+                for reply in dummy_hand:
+                    if bitboard.suit_of(reply) == suit_call:
+                        break
+                else:
+                    # Void players play their first card
+                    reply = dummy_hand[0]
+                played.append(reply)
+
+            winning_position = played.index(bitboard.winner(
+                bitboard.mask_from_indices(played), suit_call, trump_suit))
+            if winning_position == position or \
+                    (count_partner and (winning_position - position) % 2 == 0):
+                scores[c] += 1
+    return scores
+
+
+def _simulate_function(engine, card_candidates, cards_not_played, hand_size, trick=(), trump_suit=None,
+                       dealer=None, count_partner=False, common_random_numbers=False, seed=None):
+    """Shared simulate(candidate_indices, n) of the Monte Carlo policies, returning the wins of each candidate
+
+    Every call draws from one random stream, seeded with seed when given and
+    from the random module otherwise.
+    """
+    trick_indices = [card.index for card in trick]
+    if engine == "numpy":
+        import vectorized
+        position = len(trick_indices)
+        rng = vectorized.default_rng(seed)
+
+        def simulate(candidates, n):
+            winners = vectorized.kernel().trick_winners(
+                [card_candidates[i].index for i in candidates], n, cards_not_played,
+                hand_size, trick=trick_indices, trump_suit=trump_suit, rng=rng, dealer=dealer,
+                common=common_random_numbers)
+            if count_partner:
+                return ((winners - position) % 2 == 0).sum(axis=1)
+            return (winners == position).sum(axis=1)
+    elif engine == "python":
+        rng = random if seed is None else random.Random(seed)
+        if common_random_numbers:
+            def simulate(candidates, n):
+                return _common_trick_wins(
+                    [card_candidates[i] for i in candidates], n, cards_not_played, hand_size,
+                    trick=trick_indices, trump_suit=trump_suit, dealer=dealer,
+                    count_partner=count_partner, rng=rng)
+        else:
+            def simulate(candidates, n):
+                return [_trick_wins(card_candidates[i], n, cards_not_played, hand_size,
+                                    trick=trick_indices, trump_suit=trump_suit, dealer=dealer,
+                                    count_partner=count_partner, rng=rng)
+                        for i in candidates]
+    else:
+        raise ValueError("engine argument is python/numpy")
+    return simulate
+
+
+def _rank_candidates(simulate, card_candidates, iteration, confidence=None, stats=None):
+    """Best candidate card of a simulate function with a fixed or adaptive allocation"""
+    if confidence is None:
+        scores = simulate(range(len(card_candidates)), iteration)
+        simulations = len(card_candidates) * iteration
+        rounds = 1
+        active = range(len(card_candidates))
+    else:
+        scores, simulations, rounds, active = _race(
+            simulate, len(card_candidates), iteration, confidence)
+    if stats is not None:
+        stats.update({"simulations": simulations, "rounds": rounds,
+                      "candidates": len(card_candidates)})
+    if instrument.ENABLED:
+        instrument.count("rollouts", simulations)
+
+    # Eliminated candidates keep the rate of their early rounds, only the survivors are ranked
+    card_rank = [{"card": card_candidates[i], "score": scores[i]} for i in active]
+    # Sort the list and return the card with the highest score
+    card_rank.sort(key=lambda x: x["score"], reverse=True)
+    return card_rank[0]['card']
+
+
+def _race(simulate, num_of_candidates, iteration, confidence, batch_size=ADAPTIVE_BATCH_SIZE):
+    """Successive elimination of the candidates with Hoeffding confidence bounds
+
+    Every active candidate gets batch_size more simulations per round, the
+    candidates whose upper bound falls below the best lower bound stop being
+    sampled, and the race stops once a single candidate is left or every
+    active candidate reached iteration simulations.
+
+    Parameters
+    ----------
+    simulate : callable
+        simulate(candidate_indices, n) returns the wins of n simulations of each candidate
+    num_of_candidates : int
+    iteration : int
+        Maximum number of simulations per candidate
+    confidence : float
+        Probability that the best candidate is never eliminated, e.g. 0.95
+    batch_size : int, optional, by default ADAPTIVE_BATCH_SIZE
+
+    Returns
+    -------
+    tuple
+        Win rate of each candidate, number of simulations, number of rounds
+        and the indices of the candidates left
+    """
+    wins = [0] * num_of_candidates
+    counts = [0] * num_of_candidates
+    active = list(range(num_of_candidates))
+    rounds = 0
+    delta = 1 - confidence
+    while len(active) > 1 and counts[active[0]] < iteration:
+        n = min(batch_size, iteration - counts[active[0]])
+        for candidate, score in zip(active, simulate(active, n)):
+            wins[candidate] += int(score)
+            counts[candidate] += n
+        rounds += 1
+        # Active candidates share the same number of simulations and radius,
+        # the union bound over candidates and rounds keeps the error under delta
+        radius = math.sqrt(math.log(4 * num_of_candidates * rounds * rounds / delta)
+                           / (2 * counts[active[0]]))
+        best_lower_bound = max(wins[i] / counts[i] for i in active) - radius
+        active = [i for i in active if wins[i] / counts[i] + radius >= best_lower_bound]
+    rates = [wins[i] / counts[i] if counts[i] else 0.0 for i in range(num_of_candidates)]
+    return rates, sum(counts), rounds, active
+
+
+def _endgame_choice(player: Player, card_candidates, dealer, trick, trump_suit, trump_played, tablebase,
+                    iteration, seed=None, stats=None) -> Card:
+    """Candidate winning the most tricks to the end of the hand over sampled deals, read from a tablebase
+
+    The player sits at seat 0 and the hidden hands are dealt clockwise from
+    it, every candidate is scored on the same deals.
+    """
+    rng = random if seed is None else random.Random(seed)
+    trick_indices = [card.index for card in trick]
+    leader = -len(trick_indices) % 4
+    scores = [0] * len(card_candidates)
+    for i in range(iteration):
+        hands = [player.mask] + dealer.sample(rng)
+        for c, card in enumerate(card_candidates):
+            hands[0] = player.mask ^ (1 << card.index)
+            scores[c] += tablebase.tricks(hands, leader, trump_suit, trump_played,
+                                          trick_indices + [card.index])
+    if stats is not None:
+        stats.update({"simulations": iteration * len(card_candidates), "rounds": 1,
+                      "candidates": len(card_candidates)})
+    if instrument.ENABLED:
+        instrument.count("tablebase_moves")
+    return card_candidates[scores.index(max(scores))]
+
+
+def monte_carlo_LP(player: Player, cards_played: list, trump_played=False, trump_suit=None, iteration=100, engine="python",
+                   tracker=None, confidence=None, stats=None, common_random_numbers=False, seed=None,
+                   book=None, tablebase=None):
     """Return the best card played from a MonteCarlo Simulation by iterating over a sample of possilble card outcomes and distribution
 
     Parameters
@@ -53,6 +276,33 @@ def monte_carlo_LP(player: Player, cards_played: list, trump_played=False, trump
     trump_played : bool, optional, by default False
     trump_suit : [type], optional, by default None
     iteration : int, number of monte carlo simulations optional, by default 100
+    engine : str, optional
+        "python" simulates one trick at a time, "numpy" simulates all the
+        iterations at once with the vectorized engine, by default "python".
+        Without a tracker 10000 numpy iterations take about as long as 100
+        python ones
+    tracker : CardTracker | None, optional
+        Only sample deals consistent with the tracked voids, by default None
+    confidence : float | None, optional
+        When given, candidates are raced in rounds of ADAPTIVE_BATCH_SIZE
+        simulations and stop being sampled once they are worse than the best
+        card with this confidence, iteration becomes the maximum number of
+        simulations per candidate, by default None
+    stats : dict | None, optional
+        Filled with the number of simulations and rounds when given
+    common_random_numbers : bool, optional
+        Score every candidate on the same hidden deals and random replies so
+        the candidates are compared on paired outcomes, by default False
+    seed : int | None, optional
+        Seed of the random stream of the simulations, by default drawn
+        from the random module
+    book : lead_book.LeadBook | None, optional
+        Look the opening lead up in this book instead of simulating it, the
+        lead is simulated when its pattern is missing, by default None
+    tablebase : tablebase.Tablebase | None, optional
+        Once the hand fits in the tablebase, score the candidates with the
+        exact tricks of the team to the end of the hand on iteration
+        sampled deals instead of simulating the trick, by default None
 
     Returns
     -------
@@ -60,61 +310,228 @@ def monte_carlo_LP(player: Player, cards_played: list, trump_played=False, trump
         Best card from the monte carlo iteration
     """
 
-    # TODO : Create a callback function for the opponents DP AI
+    # The opening lead only depends on the hand, read it from the book
+    if book is not None and not cards_played:
+        index = book.lead(player.mask, trump_suit, trump_played)
+        if index is not None:
+            if instrument.ENABLED:
+                instrument.count("lead_book_hits")
+            return CARDS[index]
 
     # Get all cards that have not been played
-    random_deck = Deck()
-    cards_not_played = list(set(random_deck.cards) -
-                            set(player.cards+cards_played))
-    # Create dummy players as sample
-    # print(len(set(set(random_deck.cards) - set(player.cards+cards_played))))
-    dummy_players = []
-    for _ in range(3):
-        dummy_players.append(Player())
+    cards_not_played = bitboard.indices(
+        bitboard.FULL_MASK & ~(player.mask | bitboard.mask_of(cards_played)))
+    # Each dummy player holds as many cards as the player
+    hand_size = len(player.cards)
+    dealer = None
+    if tracker is not None:
+        dealer, _ = ConstraintDealer.from_tracker(tracker, player)
 
     # Simulate the best score from canidates cards
     card_candidates = player.playable_lead_cards(
         trump_played=trump_played, trump_suit=trump_suit)
-    card_rank = list()
-    for card in card_candidates:
-        score = 0
-        for i in range(iteration):
-            # Simulate cards being played and get the score for the card played by the leading player
-            cards = []
-            for dum_player in dummy_players:
-                # Simulate random card distribution
-                card_not_played_copy = cards_not_played.copy()
-                random_cards = random.sample(card_not_played_copy, int(
-                    len(cards_not_played)/len(dummy_players)))
-                for random_card in random_cards:
-                    card_not_played_copy.remove(random_card)
-                dum_player.set_cards(random_cards)
-                # Simulate random card being played by player
-                play_random_card = random.choice(
-                    dum_player.playable_cards(card.suit))
-                cards.append(dum_player.play(play_random_card))
-            cards.append(card)
-
-            # TODO : Check if winning cards belongs to Teammate to add to points
-            winning_card = compare_cards(
-                cards, suit_call=card.suit, trump_suit=trump_suit)
-
-            # If the leading player wins the card update the score
-            if winning_card.owner == player:
-                score += 1
-            else:
-                continue
-        card_rank.append({
-            "card": card,
-            "score": score
-        })
-    # Sort the list and return the card with the highest score
-    card_rank.sort(key=lambda x: x["score"], reverse=True)
-    return card_rank[0]['card']
+    if tablebase is not None and tablebase.covers(hand_size):
+        if dealer is None:
+            dealer = _hidden_hands_dealer(player, cards_played)
+        return _endgame_choice(player, card_candidates, dealer, [], trump_suit, trump_played,
+                               tablebase, iteration, seed, stats)
+    simulate = _simulate_function(engine, card_candidates, cards_not_played, hand_size,
+                                  trump_suit=trump_suit, dealer=dealer,
+                                  common_random_numbers=common_random_numbers, seed=seed)
+    with instrument.phase("monte_carlo_LP"):
+        return _rank_candidates(simulate, card_candidates, iteration, confidence, stats)
 
 
-def find_best_hand(player: Player):
-    """This AI knows each players card and try to find the best bid by using the min max algorithm 
+def monte_carlo_DP(player: Player, cards_played: list, trick: list, trump_suit=None, iteration=100, engine="python",
+                   tracker=None, confidence=None, stats=None, common_random_numbers=False, seed=None,
+                   tablebase=None):
+    """Return the best card to play in a defending position from a MonteCarlo Simulation
+
+    Every legal card is played after the cards of trick and the players yet to
+    play answer with random legal cards. A card scores when the player's team
+    wins the trick. Uses the same rollout kernels as monte_carlo_LP.
+
+    Parameters
+    ----------
+    player : Player
+    cards_played : list
+        Cards of the completed tricks
+    trick : list
+        Cards already played to the current trick in play order
+    trump_suit : [type], optional, by default None
+    iteration : int, number of monte carlo simulations optional, by default 100
+    engine : str, optional
+        "python" or "numpy", see monte_carlo_LP, by default "python"
+    tracker : CardTracker | None, optional
+        Only sample deals consistent with the tracked voids, by default None
+    confidence : float | None, optional
+        Adaptive allocation confidence, see monte_carlo_LP, by default None
+    stats : dict | None, optional
+        Filled with the number of simulations and rounds when given
+    common_random_numbers : bool, optional
+        See monte_carlo_LP, by default False
+    seed : int | None, optional
+        See monte_carlo_LP, by default None
+    tablebase : tablebase.Tablebase | None, optional
+        See monte_carlo_LP, by default None
 
+    Returns
+    -------
+    Card
+        Best card from the monte carlo iteration
+    """
+    cards_not_played = bitboard.indices(bitboard.FULL_MASK & ~(
+        player.mask | bitboard.mask_of(cards_played) | bitboard.mask_of(trick)))
+    hand_size = len(player.cards)
+    dealer = None
+    if tracker is not None:
+        dealer = _hidden_hands_dealer(player, cards_played, trick, tracker)
+
+    card_candidates = player.playable_cards(trick[0].suit)
+    if len(card_candidates) == 1:
+        if stats is not None:
+            stats.update({"simulations": 0, "rounds": 0, "candidates": 1})
+        return card_candidates[0]
+    if tablebase is not None and tablebase.covers(hand_size):
+        if dealer is None:
+            dealer = _hidden_hands_dealer(player, cards_played, trick)
+        # Every card of the completed tricks is known, a trump among them unlocks the trump leads
+        trump_played = any(card.suit == trump_suit for card in cards_played)
+        return _endgame_choice(player, card_candidates, dealer, trick, trump_suit, trump_played,
+                               tablebase, iteration, seed, stats)
+    simulate = _simulate_function(engine, card_candidates, cards_not_played, hand_size,
+                                  trick=trick, trump_suit=trump_suit, dealer=dealer,
+                                  count_partner=True, common_random_numbers=common_random_numbers,
+                                  seed=seed)
+    with instrument.phase("monte_carlo_DP"):
+        return _rank_candidates(simulate, card_candidates, iteration, confidence, stats)
+
+
+def _hidden_hands_dealer(player: Player, cards_played: list, trick=(), tracker=None):
+    """Dealer of the hands of the 3 other players, clockwise from the player"""
+    if tracker is not None:
+        return ConstraintDealer.from_tracker(tracker, player)[0]
+    unseen = bitboard.FULL_MASK & ~(
+        player.mask | bitboard.mask_of(cards_played) | bitboard.mask_of(trick))
+    hand_size = len(player.cards)
+    # Players who already played to the current trick hold one card less
+    counts = [hand_size - 1 if offset >= 4 - len(trick) else hand_size
+              for offset in range(1, 4)]
+    return ConstraintDealer([unseen] * 3, counts)
+
+
+def ismcts_LP(player: Player, cards_played: list, trump_played=False, trump_suit=None,
+              time_budget_ms=None, max_playouts=None, tracker=None, stats=None, seed=None):
+    """Return the best card to lead from an Information Set Monte Carlo Tree Search
+
+    The search plays every sampled deal to the end of the hand and stops
+    when the time budget or the playouts run out, returning the best card
+    found so far.
+
+    Parameters
+    ----------
+    player : Player
+    cards_played : list
+    trump_played : bool, optional, by default False
+    trump_suit : [type], optional, by default None
+    time_budget_ms : float | None, optional
+        Wall clock budget of the move in milliseconds, by default None
+    max_playouts : int | None, optional
+        Maximum number of playouts, by default 1000 when there is no time budget
+    tracker : CardTracker | None, optional
+        Only sample deals consistent with the tracked voids, by default None
+    stats : dict | None, optional
+        Filled with playouts, elapsed and playouts_per_sec when given
+    seed : int | None, optional
+        Seed of the sampled deals and playouts, by default drawn from the
+        random module
+
+    Returns
+    -------
+    Card
+    """
+    return ismcts_DP(player, cards_played, [], trump_played=trump_played, trump_suit=trump_suit,
+                     time_budget_ms=time_budget_ms, max_playouts=max_playouts,
+                     tracker=tracker, stats=stats, seed=seed)
+
+
+def ismcts_DP(player: Player, cards_played: list, trick: list, trump_played=False, trump_suit=None,
+              time_budget_ms=None, max_playouts=None, tracker=None, stats=None, seed=None):
+    """Return the best card to play in a defending position from an Information Set Monte Carlo Tree Search
+
+    Parameters
+    ----------
+    player : Player
+    cards_played : list
+        Cards of the completed tricks
+    trick : list
+        Cards already played to the current trick in play order
+    trump_played : bool, optional, by default False
+    trump_suit : [type], optional, by default None
+    time_budget_ms : float | None, optional
+        Wall clock budget of the move in milliseconds, by default None
+    max_playouts : int | None, optional
+        Maximum number of playouts, by default 1000 when there is no time budget
+    tracker : CardTracker | None, optional
+        Only sample deals consistent with the tracked voids, by default None
+    stats : dict | None, optional
+        Filled with playouts, elapsed and playouts_per_sec when given
+    seed : int | None, optional
+        See ismcts_LP, by default None
+
+    Returns
+    -------
+    Card
+    """
+    dealer = _hidden_hands_dealer(player, cards_played, trick, tracker)
+    rng = random if seed is None else random.Random(seed)
+    with instrument.phase("ismcts"):
+        move, search_stats = ismcts.search(
+            player.mask, dealer, [card.index for card in trick], trump_suit=trump_suit,
+            trump_played=trump_played, time_budget_ms=time_budget_ms, max_playouts=max_playouts,
+            rng=rng)
+    if stats is not None:
+        stats.update(search_stats)
+    if instrument.ENABLED:
+        instrument.count("ismcts_playouts", search_stats["playouts"])
+    return CARDS[move]
+
+
+def find_best_hand(player: Player, highest_bid=PASS, exact=False) -> Bid:
+    """This AI knows each players card and bids the best contract of its partnership
+
+    The tricks of every strain are estimated from the hand features of the
+    player and the partner (hand_features.partnership_tricks). The double
+    dummy solver gives the exact tricks with exact, but the pure Python
+    search takes about 0.1s per strain for 8 card hands, 0.5s for 9 and
+    grows about 5 times per card, so a full 13 card deal takes minutes and
+    exact is only meant for analysis.
+
+    Parameters
+    ----------
+    player : Player
+    highest_bid : Bid, optional
+        Highest current bid in the auction, by default PASS
+    exact : bool, optional
+        Solve every strain double dummy with the player as the declarer
+        leading the first trick, by default False
+
+    Returns
+    -------
+    Bid
+        Highest legal contract the player expects to make, PASS if there is none
     """
-    pass
+    partner = player.next_player().next_player()
+    hands = [player.mask, player.next_player().mask, partner.mask, player.prev_player().mask]
+    best_bid = PASS
+    for strain in range(1, 6):
+        if exact:
+            tricks = double_dummy.solve(hands, 0, trump_suit=strain)
+        else:
+            tricks = hand_features.partnership_tricks(player.mask, partner.mask, strain)
+        if tricks < 7:
+            continue
+        bid = Bid(min(tricks - 6, 6), SuitsEnum(strain))
+        if bid > highest_bid and bid > best_bid:
+            best_bid = bid
+    return best_bid
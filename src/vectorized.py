@@ -0,0 +1,483 @@
+"""Vectorized NumPy engine for the Monte Carlo simulations
+
+Cards are handled as the bitboard indices from bitboard.py, so for an index
+``i`` the suit is ``i // 13 + 1`` and the rank inside the suit is ``i % 13``.
+"""
+import functools
+import math
+import random
+from collections import defaultdict
+import numpy as np
+import bitboard
+
+# Upper bound on the number of simulated tricks resolved in one NumPy step
+BATCH_SIZE = 8192
+
+
+def default_rng(seed=None):
+    """NumPy Generator of a seed, seeded from the random module by default so random.seed stays reproducible"""
+    if seed is None:
+        seed = random.getrandbits(64)
+    return np.random.default_rng(seed)
+
+
+def deal_constrained(dealer, num_of_deals: int, rng=None, num_of_players=None) -> np.ndarray:
+    """Deal a batch of hands from a card_tracker.ConstraintDealer
+
+    Parameters
+    ----------
+    dealer : ConstraintDealer
+        Dealer of the hidden hands, the hands kept must be of equal size
+    num_of_deals : int
+    rng : np.random.Generator | None, optional, by default default_rng()
+    num_of_players : int | None, optional
+        Only keep the hands of the first players clockwise, by default all
+
+    Returns
+    -------
+    np.ndarray
+        Sorted card indices of shape (num_of_deals, num_of_players, hand_size)
+    """
+    owners = dealer.sample_batch(num_of_deals, rng if rng is not None else default_rng())
+    if num_of_players is None:
+        num_of_players = len(dealer.counts)
+    # nonzero walks the deals in order, so each deal gets hand_size cards of the seat
+    return np.stack([np.nonzero(owners == seat)[1].reshape(num_of_deals, -1)
+                     for seat in range(num_of_players)], axis=1)
+
+
+def trick_winner(tricks: np.ndarray, suit_call: np.ndarray, trump_suit=None) -> np.ndarray:
+    """Position of the winning card in each trick of a batch
+
+    Parameters
+    ----------
+    tricks : np.ndarray
+        Card indices of shape (batch, cards_in_trick)
+    suit_call : np.ndarray
+        Suit index (0-3) called for each trick, shape (batch,)
+    trump_suit : SuitsEnum | int | None, optional, by default None
+
+    Returns
+    -------
+    np.ndarray
+        Position of the winning card in the trick, shape (batch,)
+    """
+    suits = tricks // bitboard.CARDS_PER_SUIT
+    strength = tricks % bitboard.CARDS_PER_SUIT
+    strength = np.where(suits == suit_call[:, None], strength + 13, -1)
+    if trump_suit and bitboard.SUIT_MASKS[trump_suit]:
+        strength = np.where(suits == trump_suit - 1,
+                            tricks % bitboard.CARDS_PER_SUIT + 26, strength)
+    return strength.argmax(axis=1)
+
+
+def _strengths(cards: np.ndarray, suit_call: int, trump: int) -> np.ndarray:
+    """Strength of cards in a trick, as in trick_winner, trump is the 0-based suit or -1"""
+    suits = cards // bitboard.CARDS_PER_SUIT
+    ranks = cards % bitboard.CARDS_PER_SUIT
+    return np.where(suits == trump, ranks + 26, np.where(suits == suit_call, ranks + 13, -1))
+
+
+@functools.lru_cache(maxsize=None)
+def _follow_pattern_cdf(suit_cards: int, unseen: int, hand_size: int, num_of_players: int) -> np.ndarray:
+    """Cumulative distribution of the followers able to follow the called suit
+
+    The followers are dealt hand_size cards each in turn from the unseen
+    cards, suit_cards of them of the called suit. Bit j of a pattern is set
+    when follower j holds a card of the suit.
+    """
+    states = {(suit_cards, unseen, 0): 1.0}
+    for follower in range(num_of_players):
+        deals = math.comb(unseen - follower * hand_size, hand_size)
+        next_states = defaultdict(float)
+        for (left, total, pattern), probability in states.items():
+            for held in range(min(left, hand_size) + 1):
+                ways = math.comb(left, held) * math.comb(total - left, hand_size - held)
+                if ways:
+                    next_states[left - held, total - hand_size, pattern | (held > 0) << follower] += \
+                        probability * ways / deals
+        states = next_states
+    probabilities = np.zeros(1 << num_of_players)
+    for (_, _, pattern), probability in states.items():
+        probabilities[pattern] += probability
+    cdf = np.cumsum(probabilities)
+    cdf[-1] = 1.0
+    return cdf
+
+
+def _distinct_draws(randoms: np.ndarray, size: int) -> list:
+    """Three distinct positions below size drawn in turn, from uniform randoms of shape (3, n)
+
+    Draws past the first size ones are meaningless but stay within size + 2.
+    """
+    first = (randoms[0] * size).astype(np.int32)
+    second = (randoms[1] * (size - 1)).astype(np.int32)
+    second += second >= first
+    third = (randoms[2] * (size - 2)).astype(np.int32)
+    low = np.minimum(first, second)
+    third += third >= low
+    third += third >= first + second - low
+    return [first, second, third]
+
+
+class RolloutKernel:
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        """Batched single trick rollouts with buffers reused between calls
+
+        Parameters
+        ----------
+        batch_size : int, optional
+            Maximum number of tricks resolved in one NumPy step, by default BATCH_SIZE
+        """
+        self._batch_size = batch_size
+        # Flat buffers so that every reshaped view stays contiguous
+        self._deal_keys = np.empty(batch_size * bitboard.NUM_OF_CARDS)
+        self._reply_keys = np.empty(batch_size * 3 * bitboard.CARDS_PER_SUIT)
+        self._reply_scores = np.empty(batch_size * 3 * bitboard.CARDS_PER_SUIT)
+        self._tricks = np.empty((batch_size, 4), dtype=np.int64)
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    def _deal(self, cards_not_played, num_of_deals, num_of_players, hand_size, rng):
+        keys = self._deal_keys[:num_of_deals * len(cards_not_played)].reshape(
+            num_of_deals, len(cards_not_played))
+        rng.random(out=keys)
+        order = keys.argsort(axis=1)[:, :hand_size * num_of_players]
+        return cards_not_played[order].reshape(num_of_deals, num_of_players, hand_size)
+
+    def _reply_keys_for(self, hands, rng):
+        keys = self._reply_keys[:hands.size].reshape(hands.shape)
+        rng.random(out=keys)
+        return keys
+
+    def _replies(self, hands, suit_call, keys):
+        """Legal card of each hand with the highest random key"""
+        follows = hands // bitboard.CARDS_PER_SUIT == suit_call[:, None, None]
+        # Void players may play any card
+        legal = follows | ~follows.any(axis=2, keepdims=True)
+        scores = self._reply_scores[:keys.size].reshape(keys.shape)
+        scores.fill(-1)
+        np.copyto(scores, keys, where=legal)
+        choice = scores.argmax(axis=2)
+        return np.take_along_axis(hands, choice[:, :, None], axis=2)[:, :, 0]
+
+    def _deal_hands(self, cards_not_played, num_of_deals, num_of_players, hand_size, rng, dealer):
+        if dealer is None:
+            return self._deal(cards_not_played, num_of_deals, num_of_players, hand_size, rng)
+        return deal_constrained(dealer, num_of_deals, rng, num_of_players)
+
+    def trick_winners(self, candidates, iteration, cards_not_played, hand_size, trick=(),
+                      trump_suit=None, rng=None, dealer=None, common=False) -> np.ndarray:
+        """Position in the trick of the winner of every simulation
+
+        Each candidate card is played after the cards of trick and the
+        remaining players answer with random legal cards.
+
+        Parameters
+        ----------
+        candidates : list
+            Card indices the player can play
+        iteration : int, number of simulations per candidate
+        cards_not_played : list
+            Card indices held by the other players
+        hand_size : int
+            Cards held by each player yet to play to the trick
+        trick : iterable, optional
+            Card indices already played to the trick, by default ()
+        trump_suit : SuitsEnum | None, optional, by default None
+        rng : np.random.Generator | None, optional, by default default_rng()
+        dealer : ConstraintDealer | None, optional
+            Deal the hands with the dealer instead of uniformly, by default None
+        common : bool, optional
+            Play every candidate on the same deals and random reply keys,
+            by default False
+
+        Returns
+        -------
+        np.ndarray
+            Winning positions of shape (len(candidates), iteration)
+        """
+        if rng is None:
+            rng = default_rng()
+        trick = list(trick)
+        position = len(trick)
+        num_of_players = 3 - position
+        candidates = np.asarray(candidates, dtype=np.int64)
+        cards_not_played = np.asarray(cards_not_played, dtype=np.int64)
+        if common:
+            return self._common_trick_winners(candidates, iteration, cards_not_played, hand_size,
+                                              trick, trump_suit, rng, dealer)
+        if dealer is None:
+            return self._sampled_trick_winners(candidates, iteration, cards_not_played, hand_size,
+                                               trick, trump_suit, rng)
+        plays = np.repeat(candidates, iteration)
+        winners = np.empty(len(plays), dtype=np.int64)
+        for start in range(0, len(plays), self._batch_size):
+            play = plays[start:start + self._batch_size]
+            num_of_deals = len(play)
+            tricks = self._tricks[:num_of_deals]
+            tricks[:, :position] = trick
+            tricks[:, position] = play
+            suit_call = tricks[:, 0] // bitboard.CARDS_PER_SUIT
+            if num_of_players:
+                hands = self._deal_hands(cards_not_played, num_of_deals, num_of_players,
+                                         hand_size, rng, dealer)
+                tricks[:, position + 1:] = self._replies(
+                    hands, suit_call, self._reply_keys_for(hands, rng))
+            winners[start:start + num_of_deals] = trick_winner(
+                tricks, suit_call, trump_suit)
+        return winners.reshape(len(candidates), iteration)
+
+    def _sampled_trick_winners(self, candidates, iteration, cards_not_played, hand_size, trick,
+                               trump_suit, rng) -> np.ndarray:
+        """trick_winners of uniformly dealt hands without dealing them
+
+        A random legal reply is a random card of the called suit among the
+        unseen ones for a follower holding the suit, and a random other card
+        for a void one, without the cards already drawn. Only which followers
+        are void needs the deal, and it is drawn from its exact distribution.
+        """
+        position = len(trick)
+        num_of_players = 3 - position
+        trump = trump_suit - 1 if trump_suit and bitboard.SUIT_MASKS[trump_suit] else -1
+        winners = np.empty((len(candidates), iteration), dtype=np.int64)
+        for c, candidate in enumerate(candidates):
+            played = np.array(trick + [candidate])
+            suit_call = played[0] // bitboard.CARDS_PER_SUIT
+            strength = _strengths(played, suit_call, trump)
+            winners[c] = best_position = strength.argmax()
+            if not num_of_players:
+                continue
+            follows_suit = cards_not_played // bitboard.CARDS_PER_SUIT == suit_call
+            suit_cards = cards_not_played[follows_suit]
+            cdf = _follow_pattern_cdf(len(suit_cards), len(cards_not_played), hand_size,
+                                      num_of_players)
+            randoms = rng.random((7, iteration))
+            patterns = cdf.searchsorted(randoms[0], side="right")
+            # Padded for the meaningless draws of a short suit
+            padding = np.full(3, -1)
+            follow_strengths = np.concatenate([_strengths(suit_cards, suit_call, trump), padding])
+            discard_strengths = np.concatenate([_strengths(
+                cards_not_played[~follows_suit], suit_call, trump), padding])
+            follows = [follow_strengths[draw] for draw in _distinct_draws(
+                randoms[1:4], len(suit_cards))]
+            discards = [discard_strengths[draw] for draw in _distinct_draws(
+                randoms[4:7], len(cards_not_played) - len(suit_cards))]
+            best = np.full(iteration, strength[best_position])
+            position_of_best = winners[c]
+            followed = np.zeros(iteration, dtype=np.int64)
+            for follower in range(num_of_players):
+                holds_suit = (patterns >> follower) & 1 == 1
+                reply = np.where(holds_suit, np.choose(followed, follows[:follower + 1]),
+                                 np.choose(follower - followed, discards[:follower + 1]))
+                better = reply > best
+                best = np.maximum(reply, best)
+                position_of_best[better] = position + 1 + follower
+                followed += holds_suit
+        return winners
+
+    def _common_trick_winners(self, candidates, iteration, cards_not_played, hand_size, trick,
+                              trump_suit, rng, dealer) -> np.ndarray:
+        position = len(trick)
+        num_of_players = 3 - position
+        winners = np.empty((len(candidates), iteration), dtype=np.int64)
+        for start in range(0, iteration, self._batch_size):
+            num_of_deals = min(self._batch_size, iteration - start)
+            if num_of_players:
+                hands = self._deal_hands(cards_not_played, num_of_deals, num_of_players,
+                                         hand_size, rng, dealer)
+                keys = self._reply_keys_for(hands, rng)
+            tricks = self._tricks[:num_of_deals]
+            tricks[:, :position] = trick
+            # The deals and reply keys are shared, only the candidate changes
+            for c, candidate in enumerate(candidates):
+                tricks[:, position] = candidate
+                suit_call = tricks[:, 0] // bitboard.CARDS_PER_SUIT
+                if num_of_players:
+                    tricks[:, position + 1:] = self._replies(hands, suit_call, keys)
+                winners[c, start:start + num_of_deals] = trick_winner(
+                    tricks, suit_call, trump_suit)
+        return winners
+
+
+_KERNEL = None
+
+
+def kernel() -> RolloutKernel:
+    """Rollout kernel shared by the Monte Carlo policies"""
+    global _KERNEL
+    if _KERNEL is None:
+        _KERNEL = RolloutKernel()
+    return _KERNEL
+
+
+# Deals played in step by playouts, small enough for the work arrays to stay in the CPU cache
+PLAYOUT_CHUNK_SIZE = 4096
+
+
+def _select_table() -> np.ndarray:
+    """Index of the k-th set bit of every 13 bit suit holding, flat at holding * 13 + k"""
+    table = np.zeros((1 << bitboard.CARDS_PER_SUIT, bitboard.CARDS_PER_SUIT), dtype=np.int32)
+    for holding in range(1 << bitboard.CARDS_PER_SUIT):
+        for k, index in enumerate(bitboard.indices(holding)):
+            table[holding, k] = index
+    return table.reshape(-1)
+
+
+_SELECT = None
+_COUNT = np.bitwise_count(np.arange(1 << bitboard.CARDS_PER_SUIT, dtype=np.uint16)).astype(np.int32)
+
+
+def _random_suits(flat, base, randoms, trump=-1, trump_played=True) -> tuple:
+    """Uniformly random card of hands given by their suit holdings
+
+    Parameters
+    ----------
+    flat : np.ndarray
+        Suit holdings, the 4 suits of a hand follow each other
+    base : np.ndarray
+        Index in flat of the CLUBS holding of each hand, no hand empty
+    randoms : np.ndarray
+        Uniform floats in [0, 1), one per hand
+    trump : int, optional
+        0-based trump suit, left out of the hands holding other suits
+        unless trump_played, by default -1
+    trump_played : np.ndarray | bool, optional, by default True
+
+    Returns
+    -------
+    tuple
+        Suit index (0-3) of the card, holding of its suit and position of
+        the card in the holding
+    """
+    counts = [_COUNT[flat[base + suit]] for suit in range(4)]
+    if trump >= 0:
+        # Trumps can't be led before a trump is played, unless only trumps remain
+        others = sum(count for suit, count in enumerate(counts) if suit != trump)
+        counts[trump] = np.where(trump_played | (others == 0), counts[trump], 0)
+    first = counts[0]
+    second = first + counts[1]
+    third = second + counts[2]
+    k = (randoms * (third + counts[3])).astype(np.int32)
+    after_first, after_second, after_third = k >= first, k >= second, k >= third
+    suit = after_first.astype(np.int32) + after_second + after_third
+    k -= after_first * counts[0] + after_second * counts[1] + after_third * counts[2]
+    return suit, flat[base + suit], k
+
+
+def _playout_chunk(holdings, leader, trump, trump_played, trick, winning, rng) -> np.ndarray:
+    """Tricks won by seats 0/2 in playouts of suit holdings of shape (num_of_deals, 4, 4)"""
+    num_of_deals = len(holdings)
+    flat = holdings.reshape(-1).copy()
+    base_of_deal = np.arange(0, flat.size, 16, dtype=np.int32)
+    num_of_moves = int(_COUNT[holdings[0]].sum())
+    randoms = rng.random((num_of_moves, num_of_deals))
+    trump_played = np.full(num_of_deals, trump_played)
+    tricks = np.zeros(num_of_deals, dtype=np.int32)
+
+    # Seats are kept as seat * 4, the offset of their holdings in a deal
+    position = len(trick)
+    seat = np.full(num_of_deals, (leader + position) % 4 * 4, dtype=np.int32)
+    if trick:
+        suit = np.full(num_of_deals, trick[0] // bitboard.CARDS_PER_SUIT, dtype=np.int32)
+        best_suit, best = divmod(trick[winning], bitboard.CARDS_PER_SUIT)
+        best_seat = np.full(num_of_deals, (leader + winning) % 4 * 4, dtype=np.int32)
+
+    for move in range(num_of_moves):
+        base = base_of_deal + seat
+        if position == 0:
+            card_suit, holding, k = _random_suits(flat, base, randoms[move], trump, trump_played)
+            index = base + card_suit
+        else:
+            card_suit = suit
+            index = base + suit
+            holding = flat[index]
+            k = (randoms[move] * _COUNT[holding]).astype(np.int32)
+            void = np.flatnonzero(holding == 0)
+            if len(void):
+                # Void players may play any card
+                card_suit = suit.copy()
+                card_suit[void], holding[void], k[void] = _random_suits(
+                    flat, base[void], randoms[move, void])
+                index[void] = base[void] + card_suit[void]
+
+        rank = _SELECT[holding * bitboard.CARDS_PER_SUIT + k]
+        flat[index] = holding ^ (1 << rank)
+
+        if position == 0:
+            suit = best_suit = card_suit
+            best = rank
+            best_seat = seat
+        else:
+            wins = np.where(card_suit == best_suit, rank > best, card_suit == trump)
+            best = np.where(wins, rank, best)
+            best_suit = np.where(wins, card_suit, best_suit)
+            best_seat = np.where(wins, seat, best_seat)
+
+        if position == 3:
+            # The winner of the trick leads the next one
+            tricks += best_seat & 4 == 0
+            if trump >= 0:
+                trump_played |= best_suit == trump
+            seat = best_seat
+            position = 0
+        else:
+            seat = (seat + 4) & 12
+            position += 1
+    return tricks
+
+
+def playouts(hands, leader: int, trump_suit=None, trump_played=False, trick=(), rng=None) -> np.ndarray:
+    """Play a batch of deals to the end of the hand with random legal cards
+
+    Every deal of the batch starts from the same trick, so the playouts of
+    a chunk of PLAYOUT_CHUNK_SIZE deals move in step and each move is
+    resolved for the whole chunk at once. The hands are kept as 13 bit suit
+    holdings and a random card is read from a table of the k-th card of
+    every holding.
+
+    Parameters
+    ----------
+    hands : np.ndarray
+        Hand masks of shape (batch, 4) by seat clockwise, left unchanged
+    leader : int
+        Seat that led the current trick, or leads the next one
+    trump_suit : SuitsEnum | int | None, optional, by default None
+    trump_played : bool, optional
+        Whether a trump was already played, by default False
+    trick : iterable, optional
+        Card indices already played to the current trick, by default ()
+    rng : np.random.Generator | None, optional, by default default_rng()
+
+    Returns
+    -------
+    np.ndarray
+        Tricks won by seats 0/2 and by seats 1/3, shape (batch, 2)
+    """
+    global _SELECT
+    if _SELECT is None:
+        _SELECT = _select_table()
+    if rng is None:
+        rng = default_rng()
+    hands = np.asarray(hands, dtype=np.uint64)
+    shifts = np.arange(4, dtype=np.uint64) * np.uint64(bitboard.CARDS_PER_SUIT)
+    holdings = ((hands[:, :, None] >> shifts) & np.uint64(0x1FFF)).astype(np.int32)
+    trump = trump_suit - 1 if trump_suit and bitboard.SUIT_MASKS[trump_suit] else -1
+    trick = list(trick)
+    winning = 0
+    if trick:
+        winning = int(trick_winner(np.array([trick]), np.array([trick[0] // bitboard.CARDS_PER_SUIT]),
+                                   trump_suit)[0])
+
+    tricks = np.empty((len(hands), 2), dtype=np.int64)
+    # Tricks left, the current one included
+    num_of_tricks = int(_COUNT[holdings[0, (leader + len(trick)) % 4]].sum()) if len(hands) else 0
+    for start in range(0, len(hands), PLAYOUT_CHUNK_SIZE):
+        won = _playout_chunk(holdings[start:start + PLAYOUT_CHUNK_SIZE], leader, trump, trump_played,
+                             trick, winning, rng)
+        tricks[start:start + len(won), 0] = won
+    tricks[:, 1] = num_of_tricks - tricks[:, 0]
+    return tricks
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import analytics
+import bitboard
+import game_record
+
+# Seat 0 holds the clubs, 1 the diamonds, 2 the hearts and 3 the spades
+HANDS = [bitboard.SUIT_MASKS[suit] for suit in range(1, 5)]
+# Trick t is the t-th card of every seat, led by seat 0
+PLAY = [seat * 13 + trick for trick in range(13) for seat in range(4)]
+
+
+def write_games(path):
+    with game_record.GameRecordWriter(path) as writer:
+        # 4 SPADES by seat 3, seat 3 wins every trick
+        writer.write_game(HANDS, 0, [19, 0, 0, 0], declarer=3, contract=19, play=PLAY,
+                          trick_winners=[3] * 13, tricks=(0, 13))
+        # 2 HEARTS by seat 2, seat 2 wins every trick
+        writer.write_game(HANDS, 0, [8, 0, 0, 0], declarer=2, contract=8, play=PLAY,
+                          trick_winners=[2] * 13, tricks=(13, 0), won=True)
+        # 6 NOTRUMP by seat 0 going down, 6 tricks to seat 0 then 7 to seat 1
+        writer.write_game(HANDS, 0, [30, 0, 0, 0], declarer=0, contract=30, play=PLAY,
+                          trick_winners=[0] * 6 + [1] * 7, tricks=(6, 7))
+        writer.write_game(HANDS, 1, [0, 0, 0, 0])
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, analytics.CHUNK_SIZE])
+def test_aggregates_of_a_hand_built_file(tmp_path, chunk_size):
+    path = tmp_path / "games.bin"
+    write_games(path)
+    stats = analytics.analyse(path, chunk_size=chunk_size)
+    assert (stats["records"], stats["games"], stats["all_pass"]) == (4, 3, 1)
+    assert np.allclose(stats["win_rate_by_seat"], [1 / 3, 2 / 3, 1 / 3, 2 / 3])
+    assert stats["declarer_success_by_seat"].tolist() == [0, 0, 1, 1]
+    assert stats["contract_success_rate"] == pytest.approx(2 / 3)
+    assert stats["contract_success"] == {8: 1.0, 19: 1.0, 30: 0.0}
+    assert stats["contract_games"] == {8: 1, 19: 1, 30: 1}
+    assert stats["trump_frequencies"] == pytest.approx(
+        {"CLUBS": 0, "DIAMONDS": 0, "HEARTS": 1 / 3, "SPADES": 1 / 3, "NOTRUMP": 1 / 3})
+    expected = np.full(bitboard.NUM_OF_CARDS, 1 / 3)
+    expected[6:19] = 0
+    assert np.allclose(stats["card_trick_win_rate"], expected)
+
+
+def test_sources_agree(tmp_path):
+    path = tmp_path / "games.bin"
+    write_games(path)
+    reader = game_record.GameRecordReader(path)
+    expected = analytics.analyse(path)
+    for source in (reader, np.asarray(reader.records)):
+        stats = analytics.analyse(source)
+        assert stats.keys() == expected.keys()
+        for name, value in expected.items():
+            assert np.array_equal(stats[name], value) if isinstance(value, np.ndarray) \
+                else stats[name] == value
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "games.bin"
+    game_record.GameRecordWriter(path).close()
+    stats = analytics.analyse(path)
+    assert (stats["records"], stats["games"], stats["contract_success"]) == (0, 0, {})
@@ -0,0 +1,57 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+import auction
+import logic
+import trump_ai
+from trump import PASS
+
+
+def reference_auction(rng):
+    """Contract rank, declarer and length of an auction played like runner.play_game"""
+    bid_history = []
+    highest_bid = PASS
+    seat = -1
+    while True:
+        seat = (seat + 1) % 4
+        bid = trump_ai.random_AB(highest_bid, rng)
+        bid_history.append({"player": seat, "bid": bid})
+        if bid != PASS:
+            highest_bid = bid
+        if logic.check_pass(bid_history):
+            return highest_bid.rank, seat, len(bid_history)
+
+
+def test_all_pass_rate_is_exact():
+    # Every bidder passes when the exponential sample rounds to 0
+    stats = auction.auction_statistics(200000, seed=1)
+    assert abs(stats["all_pass_rate"] - (1 - math.exp(-0.5)) ** 3) < 0.003
+    assert stats["length_distribution"][3] == pytest.approx(stats["all_pass_rate"])
+
+
+def test_lengths_and_declarers_follow_the_rules():
+    auctions = auction.simulate_auctions(10000, seed=2)
+    all_pass = auctions["contract"] == 0
+    assert (auctions["length"][all_pass] == 3).all()
+    assert (auctions["length"][~all_pass] >= 4).all()
+    assert (auctions["declarer"] == (auctions["length"] - 1) % 4).all()
+    again = auction.simulate_auctions(10000, seed=2)
+    assert all(np.array_equal(auctions[name], again[name]) for name in auctions)
+
+
+def test_statistics_match_the_runner_auction():
+    rng = random.Random(3)
+    reference = [reference_auction(rng) for _ in range(20000)]
+    stats = auction.auction_statistics(200000, seed=3)
+    lengths = [length for _, _, length in reference]
+    assert abs(np.mean(lengths) - stats["mean_length"]) < 0.05
+    contracts = [contract for contract, _, _ in reference if contract]
+    values = np.bincount([(contract - 1) // 5 + 1 for contract in contracts], minlength=7)[1:]
+    assert np.abs(values / len(contracts) - stats["contract_values"]).max() < 0.02
+    declarers = np.bincount([seat for contract, seat, _ in reference if contract], minlength=4)
+    assert np.abs(declarers / len(contracts) - stats["declarer_rates"]).max() < 0.02
+    assert sum(stats["contracts"].values()) == pytest.approx(1)
+    assert sum(stats["trump_frequencies"].values()) == pytest.approx(1)
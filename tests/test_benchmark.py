@@ -0,0 +1,17 @@
+import sys
+
+import benchmark
+
+
+def test_peak_memory_counts_the_memory_of_each_operation():
+    # A Deck holds a list of 52 cards built on every operation
+    result = benchmark.run_benchmark("deck_build", min_time=0.01, repeats=1)
+    assert result["peak_bytes_per_op"] >= sys.getsizeof([None] * 52)
+    assert result["retained_blocks_per_op"] < 1
+
+
+def test_compare_flags_regressions():
+    suite = {"results": {"fast": {"ops_per_sec": 100.0}, "slow": {"ops_per_sec": 50.0},
+                         "new": {"ops_per_sec": 1.0}}}
+    baseline = {"results": {"fast": {"ops_per_sec": 95.0}, "slow": {"ops_per_sec": 100.0}}}
+    assert benchmark.compare(suite, baseline) == [("slow", 100.0, 50.0, -0.5)]
@@ -0,0 +1,24 @@
+import copy
+import pickle
+
+from trump import BID_LADDER, PASS, Bid, SuitsEnum
+
+
+def test_equal_objects_hash_equal():
+    values = list(range(7))
+    for bid in BID_LADDER:
+        for other in BID_LADDER + tuple(values):
+            if bid == other:
+                assert hash(bid) == hash(other)
+    assert Bid(2, SuitsEnum.HEARTS) in {2}
+    assert {bid: bid.rank for bid in BID_LADDER}[Bid(2, SuitsEnum.HEARTS)] == Bid(2, SuitsEnum.HEARTS).rank
+
+
+def test_ladder_is_ordered_and_interned():
+    assert BID_LADDER[0] is PASS is Bid(0, SuitsEnum(0))
+    for low, high in zip(BID_LADDER, BID_LADDER[1:]):
+        assert low < high and low != high
+    for bid in BID_LADDER:
+        assert Bid(bid.value, bid.suit) is bid
+        assert pickle.loads(pickle.dumps(bid)) is bid
+        assert copy.deepcopy(bid) is bid
@@ -0,0 +1,58 @@
+import random
+
+import numpy as np
+import pytest
+
+import bitboard
+import vectorized
+from card_tracker import ConstraintDealer
+
+
+def constrained_dealer():
+    # 12 unseen cards, the first hidden seat is void in CLUBS and the second cannot hold the last card
+    cards = list(range(0, 48, 4))
+    unseen = bitboard.mask_from_indices(cards)
+    possible = [unseen & ~bitboard.SUIT_MASKS[1], unseen & ~(1 << cards[-1]), unseen]
+    return ConstraintDealer(possible, [4, 4, 4]), possible
+
+
+def seat_frequencies(deals):
+    frequencies = np.zeros((3, bitboard.NUM_OF_CARDS))
+    for hands in deals:
+        for seat, hand in enumerate(hands):
+            frequencies[seat, bitboard.indices(hand)] += 1
+    return frequencies / len(deals)
+
+
+def test_sample_respects_the_constraints():
+    dealer, possible = constrained_dealer()
+    rng = random.Random(1)
+    for _ in range(200):
+        hands = dealer.sample(rng)
+        assert [hand.bit_count() for hand in hands] == [4, 4, 4]
+        assert all(hand & ~mask == 0 for hand, mask in zip(hands, possible))
+        assert hands[0] | hands[1] | hands[2] == possible[2]
+
+
+def test_sample_batch_matches_sample():
+    dealer, possible = constrained_dealer()
+    num_of_deals = 20000
+    batch = vectorized.deal_constrained(dealer, num_of_deals, vectorized.default_rng(2))
+    assert batch.shape == (num_of_deals, 3, 4)
+    deals = [[bitboard.mask_from_indices(hand) for hand in row] for row in batch.tolist()]
+    for hands in deals:
+        assert all(hand & ~mask == 0 for hand, mask in zip(hands, possible))
+        assert hands[0] | hands[1] | hands[2] == possible[2]
+    rng = random.Random(3)
+    expected = seat_frequencies([dealer.sample(rng) for _ in range(num_of_deals)])
+    np.testing.assert_allclose(seat_frequencies(deals), expected, atol=0.03)
+
+
+def test_deal_constrained_keeps_the_first_players():
+    dealer, _ = constrained_dealer()
+    assert vectorized.deal_constrained(dealer, 5, vectorized.default_rng(4), num_of_players=2).shape == (5, 2, 4)
+
+
+def test_inconsistent_constraints():
+    with pytest.raises(ValueError):
+        ConstraintDealer([0b11, 0b11], [3, 1])
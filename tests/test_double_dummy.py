@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+import bitboard
+import double_dummy
+import hand_features
+import runner
+import trump_ai
+from trump import CARDS, PASS, Bid, SuitsEnum
+
+
+def brute_force(hands, leader, trump_suit, trump_played=False, trick=()):
+    """Tricks won by seats 0/2 with a plain minimax over every legal card"""
+    if not trick and not hands[leader]:
+        return 0
+    if len(trick) == 4:
+        winning_card = bitboard.winner(bitboard.mask_from_indices(trick), bitboard.suit_of(trick[0]), trump_suit)
+        winner = (leader + trick.index(winning_card)) % 4
+        if trump_suit and bitboard.SUIT_MASKS[trump_suit] >> winning_card & 1:
+            trump_played = True
+        return (winner % 2 == 0) + brute_force(hands, winner, trump_suit, trump_played)
+    seat = (leader + len(trick)) % 4
+    if trick:
+        legal = bitboard.playable(hands[seat], bitboard.suit_of(trick[0]))
+    else:
+        legal = bitboard.playable_lead(hands[seat], trump_played, trump_suit)
+    values = []
+    for card in bitboard.indices(legal):
+        next_hands = list(hands)
+        next_hands[seat] ^= 1 << card
+        values.append(brute_force(next_hands, leader, trump_suit, trump_played, trick + (card,)))
+    return max(values) if seat % 2 == 0 else min(values)
+
+
+def random_hands(rng, num_of_cards):
+    cards = rng.sample(range(52), 4 * num_of_cards)
+    return [bitboard.mask_from_indices(cards[seat::4]) for seat in range(4)]
+
+
+@pytest.mark.parametrize("num_of_cards", [1, 2, 3])
+def test_solver_matches_brute_force(num_of_cards):
+    rng = random.Random(num_of_cards)
+    for _ in range(40):
+        hands = random_hands(rng, num_of_cards)
+        trump_suit = rng.randint(1, 5)
+        leader = rng.randrange(4)
+        trump_played = rng.random() < 0.5
+        solver = double_dummy.DoubleDummySolver(trump_suit)
+        assert solver.tricks(hands, leader, trump_played) == \
+            brute_force(hands, leader, trump_suit, trump_played)
+
+
+def test_solve_is_from_the_declarer_side():
+    rng = random.Random(4)
+    hands = random_hands(rng, 3)
+    for declarer in range(4):
+        tricks = double_dummy.solve(hands, declarer, 2)
+        seats_02 = brute_force(hands, declarer, 2)
+        assert tricks == (seats_02 if declarer % 2 == 0 else 3 - seats_02)
+
+
+def seated_players(hands):
+    players = runner.generate_players()
+    for player, hand in zip(players, hands):
+        player.set_cards([CARDS[index] for index in bitboard.indices(hand)])
+    return players
+
+
+def test_find_best_hand_exact_solves_every_strain():
+    rng = random.Random(5)
+    for _ in range(5):
+        hands = random_hands(rng, 7)
+        players = seated_players(hands)
+        best_bid = trump_ai.find_best_hand(players[0], exact=True)
+        expected = PASS
+        for strain in range(1, 6):
+            tricks = double_dummy.solve(hands, 0, strain)
+            if tricks >= 7:
+                expected = max(expected, Bid(min(tricks - 6, 6), SuitsEnum(strain)))
+        assert best_bid == expected
+
+
+def test_find_best_hand_bids_the_estimated_tricks():
+    rng = random.Random(6)
+    for _ in range(20):
+        hands = random_hands(rng, 13)
+        players = seated_players(hands)
+        expected = PASS
+        for strain in range(1, 6):
+            tricks = hand_features.partnership_tricks(hands[0], hands[2], strain)
+            if tricks >= 7:
+                expected = max(expected, Bid(min(tricks - 6, 6), SuitsEnum(strain)))
+        assert trump_ai.find_best_hand(players[0]) == expected
+        assert trump_ai.find_best_hand(players[0], highest_bid=Bid(6, SuitsEnum.NOTRUMP)) == PASS
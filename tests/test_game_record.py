@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+import pytest
+
+import bitboard
+import game_record
+
+
+def random_game(rng):
+    cards = rng.sample(range(52), 52)
+    hands = [bitboard.mask_from_indices(cards[seat * 13:seat * 13 + 13]) for seat in range(4)]
+    bids = [rng.randrange(1, 31) for _ in range(rng.randrange(1, 10))] + [0, 0, 0]
+    return dict(hands=hands, first_bidder=rng.randrange(4), bids=bids, declarer=rng.randrange(4),
+                contract=max(bids), play=cards, trick_winners=[rng.randrange(4) for _ in range(13)],
+                tricks=(7, 6), won=True)
+
+
+def test_write_read_round_trip(tmp_path):
+    path = tmp_path / "games.bin"
+    rng = random.Random(1)
+    games = [random_game(rng) for _ in range(10)]
+    with game_record.GameRecordWriter(path, buffer_size=4) as writer:
+        for game in games:
+            writer.write_game(**game)
+        writer.write_game([0] * 4, 1, [0, 0, 0, 0])
+    reader = game_record.GameRecordReader(path)
+    assert len(reader) == 11
+    for record, game in zip(reader.records, games):
+        assert [bitboard.mask_from_indices(hand) for hand in record["deal"].tolist()] == game["hands"]
+        assert record["first_bidder"] == game["first_bidder"]
+        assert record["bids"][:record["num_of_bids"]].tolist() == game["bids"]
+        assert record["declarer"] == game["declarer"] and record["contract"] == game["contract"]
+        assert record["play"].tolist() == game["play"]
+        assert record["trick_winners"].tolist() == game["trick_winners"]
+        assert record["tricks"].tolist() == [7, 6] and record["won"] == 1
+    # All pass game, the unused slots stay EMPTY
+    assert reader["declarer"][-1] == game_record.EMPTY
+    assert (reader["play"][-1] == game_record.EMPTY).all()
+
+
+def test_writer_appends_to_existing_file(tmp_path):
+    path = tmp_path / "games.bin"
+    rng = random.Random(2)
+    records = game_record.empty_records(3)
+    for record in records:
+        game_record.fill_record(record, **random_game(rng))
+    with game_record.GameRecordWriter(path) as writer:
+        writer.write_records(records[:2])
+    with game_record.GameRecordWriter(path) as writer:
+        writer.write_records(records[2:])
+    reader = game_record.GameRecordReader(path)
+    assert np.array_equal(np.asarray(reader.records), records)
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "games.bin"
+    game_record.GameRecordWriter(path).close()
+    assert len(game_record.GameRecordReader(path)) == 0
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "games.bin"
+    path.write_bytes(b"XXXX" + bytes(12))
+    with pytest.raises(ValueError):
+        game_record.GameRecordReader(path)
+    with pytest.raises(ValueError):
+        game_record.GameRecordWriter(path)
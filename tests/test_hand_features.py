@@ -0,0 +1,64 @@
+import random
+
+import numpy as np
+
+import bitboard
+import hand_features
+from trump import CARDS, PipsEnum as P, SuitsEnum as S
+
+HONOUR_POINTS = {P.ACE: 4, P.KING: 3, P.QUEEN: 2, P.JACK: 1}
+
+
+def direct_features(cards):
+    """HandFeatures computed from the cards, without the holding tables"""
+    pips = [sorted((card.card_value for card in cards if card.suit == suit), reverse=True)
+            for suit in S.suits_only(list)]
+    lengths = tuple(len(suit) for suit in pips)
+    suit_hcp = tuple(sum(HONOUR_POINTS.get(pip, 0) for pip in suit) for suit in pips)
+    # A, Kx, Qxx or Jxxx
+    stoppers = tuple(any(pip >= P.JACK and len(suit) >= P.ACE - pip + 1 for pip in suit)
+                     for suit in pips)
+    quick_tricks = 0.0
+    for suit in pips:
+        top = set(suit)
+        if P.ACE in top:
+            quick_tricks += 2.0 if P.KING in top else 1.5 if P.QUEEN in top else 1.0
+        elif P.KING in top:
+            quick_tricks += 1.0 if P.QUEEN in top else 0.5 if len(suit) >= 2 else 0.0
+    longest = max(range(4), key=lambda suit: (lengths[suit], suit)) + 1
+    return hand_features.HandFeatures(lengths, sum(suit_hcp), suit_hcp, stoppers, quick_tricks,
+                                      longest)
+
+
+def hand_mask(*suits):
+    """Mask of the pips of each suit, CLUBS to SPADES"""
+    return bitboard.mask_from_indices(bitboard.card_index(suit, pip)
+                                      for suit, pips in enumerate(suits, 1) for pip in pips)
+
+
+def test_tables_match_direct_features():
+    rng = random.Random(1)
+    hands = [rng.sample(CARDS, rng.randint(0, 13)) for _ in range(2000)]
+    masks = [bitboard.mask_of(cards) for cards in hands]
+    batch = hand_features.batch_features(masks)
+    for i, (cards, mask) in enumerate(zip(hands, masks)):
+        features = hand_features.hand_features(mask)
+        assert features == direct_features(cards)
+        for name, value in features._asdict().items():
+            assert np.allclose(batch[name][i], value)
+
+
+def test_partnership_tricks_of_a_known_deal():
+    # Player: S AKQJT, H AK, D 432, C 432
+    player = hand_mask([2, 3, 4], [2, 3, 4], [P.ACE, P.KING], [14, 13, 12, 11, 10])
+    # Partner: S 432, H 432, D AK, C 98765
+    partner = hand_mask([5, 6, 7, 8, 9], [P.ACE, P.KING], [2, 3, 4], [2, 3, 4])
+    # Side AK + AK, 5 trumps and one diamond ruff in the short trump hand
+    assert hand_features.partnership_tricks(player, partner, S.SPADES) == 4 + 5 + 1
+    # Three AK and the fifth spade
+    assert hand_features.partnership_tricks(player, partner, S.NOTRUMP) == 6 + 1
+    # Side AK + AK and 3 trumps, no short suit next to the 2 hearts
+    assert hand_features.partnership_tricks(player, partner, S.HEARTS) == 4 + 3
+    # Every trump in one hand
+    spades = hand_mask([], [], [], range(2, 15))
+    assert hand_features.partnership_tricks(spades, hand_mask(range(2, 15)), S.SPADES) == 13
@@ -0,0 +1,59 @@
+from collections import Counter
+
+import pytest
+
+import instrument
+import runner
+
+
+@pytest.fixture
+def small_shards(monkeypatch):
+    monkeypatch.setattr(runner, "SHARD_SIZE", 2)
+
+
+def instrumented_run(workers):
+    """Simulate 4 seeded games, return the results, the sink totals and the snapshot"""
+    sink_counts = Counter()
+    sink_times = Counter()
+
+    def sink(kind, name, value):
+        (sink_counts if kind == "count" else sink_times)[name] += value
+    with instrument.instrumented(sink) as snapshot:
+        _, results = runner.simulate_games(4, workers=workers, seed=5, return_results=True)
+        return results, sink_counts, sink_times, snapshot()
+
+
+def test_sink_gets_the_counts_of_runner_trump_ai_and_logic(small_shards):
+    results, sink_counts, sink_times, snapshot = instrumented_run(1)
+    played = sum(result is not None for result in results)
+    counters = snapshot["counters"]
+    assert dict(sink_counts) == counters
+    assert sink_times.keys() == snapshot["timers"].keys()
+    # runner
+    assert counters["games"] == 4
+    assert counters.get("all_pass", 0) == 4 - played
+    assert counters["auction_rounds"] >= 4 * 4
+    assert snapshot["phase_calls"]["deal"] == snapshot["phase_calls"]["auction"] == 4
+    assert snapshot["phase_calls"]["trick_resolution"] == 13 * played
+    # logic
+    assert counters["compare_cards"] == 13 * played
+    # trump_ai
+    assert counters["rollouts"] > 0
+    assert snapshot["phase_calls"]["monte_carlo_LP"] > 0
+
+
+def test_workers_merge_the_same_counts(small_shards):
+    _, _, _, serial = instrumented_run(1)
+    _, sink_counts, _, parallel = instrumented_run(2)
+    assert parallel["counters"] == serial["counters"] == dict(sink_counts)
+    assert parallel["phase_calls"] == serial["phase_calls"]
+
+
+def test_disabled_records_nothing():
+    events = []
+    instrument.reset()
+    instrument.enable(lambda *event: events.append(event))
+    instrument.disable()
+    runner.simulate_games(1, seed=5)
+    assert events == [] and instrument.snapshot()["counters"] == {}
+    assert instrument.phase("deal") is instrument.phase("auction")
@@ -0,0 +1,29 @@
+import random
+
+import pytest
+
+import bitboard
+import ismcts
+from card_tracker import ConstraintDealer
+
+
+def lead_position(rng):
+    """Observer hand and dealer of the three hidden hands of a fresh deal"""
+    cards = list(range(bitboard.NUM_OF_CARDS))
+    rng.shuffle(cards)
+    hand = bitboard.mask_from_indices(cards[:13])
+    return hand, ConstraintDealer([bitboard.FULL_MASK & ~hand] * 3, [13, 13, 13])
+
+
+@pytest.mark.parametrize("max_playouts", [0, -1])
+def test_search_rejects_no_playouts(max_playouts):
+    hand, dealer = lead_position(random.Random(1))
+    with pytest.raises(ValueError):
+        ismcts.search(hand, dealer, max_playouts=max_playouts)
+
+
+def test_search_plays_one_playout_past_the_budget():
+    hand, dealer = lead_position(random.Random(2))
+    move, stats = ismcts.search(hand, dealer, trump_suit=2, time_budget_ms=0, rng=random.Random(3))
+    assert stats["playouts"] == 1
+    assert hand >> move & 1
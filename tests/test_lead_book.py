@@ -0,0 +1,67 @@
+import random
+
+import numpy as np
+import pytest
+
+import bitboard
+import lead_book
+import trump_ai
+import vectorized
+from trump import CARDS
+
+
+def test_representative_hands_hold_13_cards():
+    for length in range(1, 14):
+        for higher in range(13):
+            for trumps in range(16):
+                found = lead_book.representative(length, higher, trumps)
+                if found is None:
+                    continue
+                hand, card, trump_suit = found
+                assert hand.bit_count() == lead_book.HAND_SIZE
+                assert lead_book.pattern(hand, card, trump_suit) == (length, higher, trumps)
+
+
+@pytest.mark.parametrize("trumps", [lead_book.TRUMP_LEAD, lead_book.NOTRUMP, 3])
+def test_pattern_rate_matches_direct_simulation(trumps):
+    rng = random.Random(7)
+    hearts, spades = 3, 4
+    trump_suit = hearts if trumps == lead_book.TRUMP_LEAD else 5 if trumps == lead_book.NOTRUMP else spades
+    # Lead the QUEEN of HEARTS from 4 hearts, the rest of the hand at random
+    card = bitboard.card_index(hearts, 12)
+    hand = 1 << card | bitboard.mask_from_indices(rng.sample(range(26, 36), 3))
+    others = bitboard.FULL_MASK & ~bitboard.SUIT_MASKS[hearts]
+    if trumps == 3:
+        hand |= bitboard.mask_from_indices(rng.sample(bitboard.indices(bitboard.SUIT_MASKS[spades]), 3))
+        others &= ~bitboard.SUIT_MASKS[spades]
+    hand |= bitboard.mask_from_indices(rng.sample(bitboard.indices(others), 13 - hand.bit_count()))
+    key = lead_book.pattern(hand, card, trump_suit)
+    assert key[0] == 4 and key[1] == 2 and key[2] == trumps
+
+    iteration = 20000
+    unseen = bitboard.indices(bitboard.FULL_MASK & ~hand)
+    direct = trump_ai._trick_wins(CARDS[card], iteration, unseen, 13, trump_suit=trump_suit,
+                                  rng=random.Random(1)) / iteration
+    rate = lead_book.pattern_rate(*key, iteration=iteration, rng=vectorized.default_rng(2))
+    assert rate == pytest.approx(direct, abs=0.02)
+
+
+def test_save_and_read_back(tmp_path):
+    table = np.full(lead_book.SHAPE, np.nan, dtype=np.float32)
+    table[4, 2, lead_book.TRUMP_LEAD] = 0.25
+    table[1, 0, lead_book.TRUMP_LEAD] = 0.75
+    path = tmp_path / "book.bin"
+    lead_book.save(path, table, iteration=10)
+    book = lead_book.LeadBook(path)
+    assert book.iteration == 10
+    np.testing.assert_array_equal(np.asarray(book.table), table)
+    # A missing pattern makes the lookup fall back to simulation
+    hand = bitboard.mask_from_indices(range(13))
+    assert book.lead(hand, trump_suit=1) is None
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "book.bin"
+    path.write_bytes(b"XXXX" + bytes(lead_book.HEADER_SIZE))
+    with pytest.raises(ValueError):
+        lead_book.LeadBook(path)
@@ -0,0 +1,46 @@
+import random
+
+import numpy as np
+import pytest
+
+import bitboard
+import playout
+import vectorized
+from state import GameState
+
+
+def random_deal(rng):
+    cards = rng.sample(range(52), 52)
+    return [bitboard.mask_from_indices(cards[seat * 13:seat * 13 + 13]) for seat in range(4)]
+
+
+def state_playout(hands, leader, trump_suit, trick, rng):
+    state = GameState(hands, leader, trump_suit, trick=trick)
+    while not state.finished():
+        state.make_move(rng.choice(bitboard.indices(state.legal_moves())))
+    return state.tricks
+
+
+@pytest.mark.parametrize("trump_suit", [None, 3])
+def test_engines_agree_on_mean_tricks(trump_suit):
+    rng = random.Random(1)
+    hands = random_deal(rng)
+    # Seat 2 leads and seat 3 already followed
+    trick = [bitboard.indices(hands[2])[-1], bitboard.indices(hands[3])[0]]
+    hands[2] ^= 1 << trick[0]
+    hands[3] ^= 1 << trick[1]
+    n = 4000
+    python = np.mean([playout.playout(hands, 2, trump_suit, trick=trick, rng=rng) for _ in range(n)], axis=0)
+    expected = np.mean([state_playout(hands, 2, trump_suit, trick, rng) for _ in range(n)], axis=0)
+    batch = vectorized.playouts(np.tile(hands, (n, 1)), 2, trump_suit, trick=trick,
+                                rng=vectorized.default_rng(2))
+    assert python.sum() == batch.sum(axis=1).mean() == 13
+    assert np.abs(python - expected).max() < 0.15
+    assert np.abs(batch.mean(axis=0) - expected).max() < 0.15
+
+
+def test_hands_are_left_unchanged():
+    hands = random_deal(random.Random(3))
+    copy = list(hands)
+    playout.playout(hands, 0, 2)
+    assert hands == copy
@@ -0,0 +1,37 @@
+import trump_ai
+
+
+def scripted_simulate(rates_by_round):
+    """simulate(candidates, n) returning n * the scripted rate of the round"""
+    calls = []
+
+    def simulate(candidates, n):
+        calls.append(list(candidates))
+        rates = rates_by_round(len(calls))
+        return [round(rates[i] * n) for i in candidates]
+    return simulate, calls
+
+
+def test_race_eliminates_the_worst_candidate():
+    simulate, calls = scripted_simulate(lambda _: [0.2, 0.9, 0.5])
+    rates, simulations, rounds, active = trump_ai._race(simulate, 3, 1000, 0.95)
+    assert active == [1]
+    assert len(calls) == rounds
+    assert simulations < 3 * 1000
+
+
+def test_eliminated_candidate_is_never_returned():
+    # B is eliminated at 0.5 while A and C win everything, then A and C lose everything
+    simulate, _ = scripted_simulate(lambda round_: [1.0, 0.5, 1.0] if round_ <= 15 else [0.0, 0.5, 0.0])
+    rates, _, _, active = trump_ai._race(simulate, 3, 1000, 0.95)
+    assert 1 not in active
+    assert rates[1] > max(rates[i] for i in active)
+    simulate, _ = scripted_simulate(lambda round_: [1.0, 0.5, 1.0] if round_ <= 15 else [0.0, 0.5, 0.0])
+    assert trump_ai._rank_candidates(simulate, ["A", "B", "C"], 1000, confidence=0.95) == "A"
+
+
+def test_fixed_allocation_ranks_every_candidate():
+    simulate, calls = scripted_simulate(lambda _: [0.2, 0.9, 0.5])
+    stats = {}
+    assert trump_ai._rank_candidates(simulate, ["A", "B", "C"], 100, stats=stats) == "B"
+    assert stats == {"simulations": 300, "rounds": 1, "candidates": 3}
@@ -0,0 +1,47 @@
+import random
+
+import logic
+from trump import CARDS, Player, SuitsEnum
+
+TRUMP_SUITS = [None] + list(SuitsEnum)[1:]
+
+
+def reference_playable_cards(cards, suit):
+    """List based rule of Player.playable_cards"""
+    same_suit = [card for card in cards if card.suit == suit]
+    return same_suit or cards
+
+
+def reference_playable_lead_cards(cards, trump_played, trump_suit):
+    """List based rule of Player.playable_lead_cards"""
+    if trump_played:
+        return cards
+    return [card for card in cards if card.suit != trump_suit] or cards
+
+
+def reference_compare_cards(cards, suit_call, trump_suit):
+    """List based rule of logic.compare_cards"""
+    matching = [card for card in cards if card.suit == trump_suit] if trump_suit else []
+    if not matching:
+        matching = [card for card in cards if card.suit == suit_call]
+    return max(matching, key=lambda card: card.card_value, default=None)
+
+
+def test_mask_rules_match_the_list_rules():
+    rng = random.Random(1)
+    for _ in range(2000):
+        player = Player()
+        player.set_cards(rng.sample(CARDS, rng.randint(1, 13)))
+        suit = SuitsEnum(rng.randint(1, 4))
+        trump_suit = rng.choice(TRUMP_SUITS)
+        trump_played = rng.random() < 0.5
+        assert sorted(player.playable_cards(suit), key=CARDS.index) == \
+            sorted(reference_playable_cards(player.cards, suit), key=CARDS.index)
+        assert sorted(player.playable_lead_cards(trump_played, trump_suit), key=CARDS.index) == \
+            sorted(reference_playable_lead_cards(player.cards, trump_played, trump_suit),
+                   key=CARDS.index)
+
+        trick = rng.sample(CARDS, rng.randint(1, 4))
+        suit_call = trick[0].suit if rng.random() < 0.8 else SuitsEnum(rng.randint(1, 4))
+        assert logic.compare_cards(trick, suit_call, trump_suit) is \
+            reference_compare_cards(trick, suit_call, trump_suit)
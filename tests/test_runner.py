@@ -0,0 +1,33 @@
+import random
+
+import numpy as np
+import pytest
+
+import game_record
+import runner
+
+
+@pytest.fixture
+def small_shards(monkeypatch):
+    monkeypatch.setattr(runner, "SHARD_SIZE", 2)
+
+
+def test_workers_give_the_same_results(small_shards, tmp_path):
+    serial = runner.simulate_games(5, seed=1, return_results=True,
+                                   record_path=tmp_path / "serial.bin")
+    parallel = runner.simulate_games(5, workers=2, seed=1, return_results=True,
+                                     record_path=tmp_path / "parallel.bin")
+    assert serial == parallel
+    assert np.array_equal(np.asarray(game_record.GameRecordReader(tmp_path / "serial.bin").records),
+                          np.asarray(game_record.GameRecordReader(tmp_path / "parallel.bin").records))
+
+
+def test_seeded_run_leaves_the_random_module_alone(small_shards):
+    random.seed(2)
+    expected = random.random()
+    random.seed(2)
+    stats, results = runner.simulate_games(3, seed=3, return_results=True)
+    assert random.random() == expected
+    assert len(results) == 3
+    assert stats == runner.merge_results(results)
+    assert stats["games"] + stats["all_pass"] == 3
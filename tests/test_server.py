@@ -0,0 +1,43 @@
+import random
+
+import bitboard
+import server
+from state import GameState
+from trump import Player
+
+
+def played_request(seed, num_of_cards):
+    """MoveRequest after num_of_cards random legal cards of a random deal"""
+    rng = random.Random(seed)
+    hands, _, declarer = server.deal_and_auction(seed)
+    state = GameState(hands, declarer, 2)
+    history = []
+    for _ in range(num_of_cards):
+        seat = state.to_move()
+        card = bitboard.random_card(state.legal_moves(), rng)
+        state.make_move(card)
+        history.append((seat, card))
+    return server.move_request(state, history=history), state
+
+
+def test_history_tracker_matches_the_voids_shown():
+    voids = 0
+    for seed in range(20):
+        request, state = played_request(seed, 30)
+        player = Player()
+        tracker = server.history_tracker(request, player)
+        assert tracker.seat(player) == request.seat
+        assert tracker.played == request.played | bitboard.mask_from_indices(request.trick)
+        for seat in range(4):
+            # Every card a seat still holds is possible for it
+            assert state.hands[seat] & ~tracker.possible(seat) == 0
+            assert tracker.count(seat) == bin(state.hands[seat]).count("1")
+            voids += len(tracker.void_suits(seat))
+    assert voids
+
+
+def test_ismcts_decisions_follow_the_seed():
+    request, _ = played_request(3, 21)
+    moves = [server.decide(request, "ismcts", iteration=50, seed=seed) for seed in range(10)]
+    assert moves == [server.decide(request, "ismcts", iteration=50, seed=seed) for seed in range(10)]
+    assert all(request.legal >> move & 1 for move in moves)
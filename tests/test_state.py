@@ -0,0 +1,111 @@
+import pickle
+import random
+
+import pytest
+
+import bitboard
+from state import GameState, Snapshot
+
+
+def random_deal(rng):
+    cards = rng.sample(range(52), 52)
+    return [bitboard.mask_from_indices(cards[seat * 13:seat * 13 + 13]) for seat in range(4)]
+
+
+def fields(state):
+    return (list(state.hands), state.leader, list(state.trick), state.suit_call, state.trump_played,
+            list(state.tricks), state._best, state._best_seat)
+
+
+def random_game(state, rng):
+    """Cards of a random legal game played on state"""
+    moves = []
+    while not state.finished():
+        card = rng.choice(bitboard.indices(state.legal_moves()))
+        state.make_move(card)
+        moves.append(card)
+    return moves
+
+
+@pytest.mark.parametrize("trump_suit", [None, 2, 5])
+def test_unmake_restores_every_state(trump_suit):
+    rng = random.Random(1)
+    for _ in range(20):
+        state = GameState(random_deal(rng), rng.randrange(4), trump_suit)
+        history = []
+        while not state.finished():
+            history.append(fields(state))
+            state.make_move(rng.choice(bitboard.indices(state.legal_moves())))
+        assert sum(state.tricks) == 13 and state.depth == 52
+        while history:
+            state.unmake_move()
+            assert fields(state) == history.pop()
+        assert state.depth == 0
+
+
+def test_tricks_match_trick_winners():
+    rng = random.Random(2)
+    for trump_suit in (None, 1, 4):
+        hands = random_deal(rng)
+        leader = rng.randrange(4)
+        state = GameState(hands, leader, trump_suit)
+        moves = random_game(state, rng)
+        tricks = [0, 0]
+        for start in range(0, 52, 4):
+            trick = moves[start:start + 4]
+            best = bitboard.winner(bitboard.mask_from_indices(trick), bitboard.suit_of(trick[0]),
+                                   trump_suit)
+            leader = (leader + trick.index(best)) % 4
+            tricks[leader % 2] += 1
+        assert state.tricks == tricks and state.leader == leader
+
+
+def test_trick_in_progress_is_replayed():
+    rng = random.Random(3)
+    state = GameState(random_deal(rng), 1, 3)
+    for _ in range(6):
+        state.make_move(rng.choice(bitboard.indices(state.legal_moves())))
+    copy = GameState(state.hands, state.leader, state.trump_suit, state.trump_played, state.trick,
+                     state.tricks)
+    assert fields(copy) == fields(state)
+
+
+def test_card_not_in_hand():
+    state = GameState(random_deal(random.Random(4)))
+    card = bitboard.indices(state.hands[1])[0]
+    with pytest.raises(ValueError):
+        state.make_move(card)
+
+
+@pytest.mark.parametrize("trump_suit", [None, 2, 5])
+def test_snapshot_play_matches_game_state(trump_suit):
+    rng = random.Random(5)
+    for _ in range(20):
+        hands = random_deal(rng)
+        leader = rng.randrange(4)
+        state = GameState(hands, leader, trump_suit)
+        snapshot = Snapshot.start(hands, leader, trump_suit)
+        assert snapshot == state.snapshot()
+        while not state.finished():
+            assert snapshot.to_move() == state.to_move()
+            assert snapshot.legal_moves() == state.legal_moves()
+            card = rng.choice(bitboard.indices(state.legal_moves()))
+            parent = snapshot
+            snapshot = snapshot.play(card)
+            state.make_move(card)
+            assert snapshot == state.snapshot()
+            assert parent != snapshot
+        assert snapshot.finished()
+
+
+def test_snapshot_round_trips():
+    rng = random.Random(6)
+    state = GameState(random_deal(rng), 2, 4)
+    for _ in range(7):
+        state.make_move(rng.choice(bitboard.indices(state.legal_moves())))
+    snapshot = state.snapshot()
+    copy = pickle.loads(pickle.dumps(snapshot))
+    assert copy == snapshot and hash(copy) == hash(snapshot) and type(copy) is Snapshot
+    assert fields(GameState.from_snapshot(snapshot)) == fields(state)
+    with pytest.raises(ValueError):
+        snapshot.play(bitboard.indices(snapshot.hands[(snapshot.to_move() + 1) % 4])[0])
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+import bitboard
+import double_dummy
+import tablebase
+from test_double_dummy import brute_force, random_hands
+
+
+@pytest.fixture(scope="module")
+def book(tmp_path_factory):
+    path = tmp_path_factory.mktemp("tablebase") / "tablebase.bin"
+    tablebase.save(path, tablebase.build(2), 2)
+    return tablebase.Tablebase(path, cache_size=64)
+
+
+def test_positions_are_generated_once():
+    for table in (tablebase.TRUMP, tablebase.NOTRUMP):
+        codes = list(tablebase.canonical_codes(2, table))
+        trump_suit = tablebase.TABLE_TRUMP_SUIT[table]
+        keys = {tablebase.position_key(tablebase.representative(code), trump_suit, True) for code in codes}
+        assert len(keys) == len(codes)
+
+
+@pytest.mark.parametrize("num_of_cards", [1, 2, 3])
+def test_matches_double_dummy_solver(book, num_of_cards):
+    assert book.covers(num_of_cards)
+    rng = random.Random(num_of_cards)
+    for _ in range(200):
+        hands = random_hands(rng, num_of_cards)
+        trump_suit = rng.randint(1, 5)
+        leader = rng.randrange(4)
+        solver = double_dummy.DoubleDummySolver(trump_suit)
+        assert book.tricks(hands, leader, trump_suit, True) == solver.tricks(hands, leader, True)
+
+
+def test_trick_in_progress_matches_brute_force(book):
+    rng = random.Random(9)
+    for _ in range(200):
+        hands = random_hands(rng, 3)
+        trump_suit = rng.randint(1, 5)
+        leader = rng.randrange(4)
+        trick = ()
+        # Play random legal cards to the trick
+        for position in range(rng.randrange(1, 4)):
+            seat = (leader + position) % 4
+            legal = bitboard.playable(hands[seat], bitboard.suit_of(trick[0])) if trick else hands[seat]
+            card = bitboard.random_card(legal, rng)
+            hands[seat] ^= 1 << card
+            trick += (card,)
+        assert book.tricks(hands, leader, trump_suit, True, trick) == \
+            brute_force(hands, leader, trump_suit, True, trick)
+
+
+def test_larger_hands_are_not_covered(book):
+    assert not book.covers(4)
+    with pytest.raises(KeyError):
+        book.tricks(random_hands(random.Random(1), 4), 0, 1, True)
+
+
+def test_caches_are_bounded(book):
+    assert tablebase.suit_code.cache_info().maxsize == tablebase.SUIT_CODE_CACHE_SIZE
+    assert all(len(cache) <= 64 for cache in book._cache)
@@ -0,0 +1,43 @@
+import pytest
+
+import tournament
+from tournament import DealResult
+
+MONTE_CARLO = {"policy": "monte_carlo", "iteration": 10}
+RANDOM = {"policy": "random"}
+
+
+@pytest.fixture
+def small_shards(monkeypatch):
+    monkeypatch.setattr(tournament, "SHARD_SIZE", 2)
+
+
+def test_workers_give_the_same_results(small_shards):
+    serial = tournament.run_tournament(MONTE_CARLO, RANDOM, 5, seed=1, return_results=True)
+    parallel = tournament.run_tournament(MONTE_CARLO, RANDOM, 5, workers=2, seed=1,
+                                         return_results=True)
+    assert serial == parallel
+
+
+def test_identical_policies_tie_every_deal():
+    stats, results = tournament.run_tournament(RANDOM, RANDOM, 20, seed=2, return_results=True)
+    assert all(result.a_tricks == result.b_tricks for result in results if result is not None)
+    assert stats["a_win_rate"] == 0.5
+    assert stats["win_rate_difference"]["mean"] == stats["trick_difference"]["mean"] == 0
+
+
+def test_summarize_pairs_the_tables():
+    results = [DealResult(4, 2, 0, 8, 8), DealResult(3, 1, 1, 9, 5), None, DealResult(5, 3, 2, 4, 7)]
+    stats = tournament.summarize(results)
+    assert (stats["deals"], stats["all_pass"]) == (3, 1)
+    # A wins the tables 1 and 0, 1 and 1, 0 and 0 of the three deals
+    assert stats["a_win_rate"] == pytest.approx(3 / 6)
+    assert stats["win_rate_difference"]["mean"] == pytest.approx((0 + 1 - 1) / 3)
+    assert stats["trick_difference"]["mean"] == pytest.approx((0 + 4 - 3) / 3)
+    difference = stats["trick_difference"]
+    assert difference["low"] < difference["mean"] < difference["high"]
+
+
+def test_confidence_is_checked():
+    with pytest.raises(ValueError):
+        tournament.run_tournament(RANDOM, RANDOM, 1, confidence=1)
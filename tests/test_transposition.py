@@ -0,0 +1,45 @@
+import pytest
+
+import transposition
+from transposition import TranspositionTable, state_key, suit_pattern
+
+
+def test_state_key_ignores_played_cards():
+    # ACE/KING of CLUBS against QUEEN/JACK is the same position as KING/QUEEN against JACK/TEN
+    high = [1 << 12, 1 << 10, 1 << 11, 1 << 9]
+    low = [1 << 11, 1 << 9, 1 << 10, 1 << 8]
+    assert state_key(high, 0) == state_key(low, 0)
+    assert state_key(high, 0) != state_key(high, 1)
+    assert state_key(high, 0, trump_suit=1) != state_key(high, 0, trump_suit=2)
+
+
+def test_suit_pattern_cache_is_bounded():
+    assert suit_pattern.cache_info().maxsize == transposition.SUIT_PATTERN_CACHE_SIZE
+    assert suit_pattern((0b100, 0b010, 0b001, 0)) == 0b1_000_001_010
+
+
+def test_lru_table_evicts_the_least_recently_used_entry():
+    table = TranspositionTable(max_size=2)
+    table.store("a", 1)
+    table.store("b", 2)
+    assert table.get("a") == 1
+    table.store("c", 3)
+    assert "b" not in table and "a" in table and "c" in table
+    assert len(table) == 2 and table.evictions == 1
+
+
+def test_depth_table_keeps_deeper_entries():
+    table = TranspositionTable(max_size=1, policy="depth")
+    table.store("a", 1, depth=5)
+    table.store("b", 2, depth=3)
+    assert table.get("a") == 1 and table.get("b") is None
+    assert table.rejections == 1
+    table.store("b", 2, depth=5)
+    assert table.get("b") == 2 and len(table) == 1
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        TranspositionTable(max_size=0)
+    with pytest.raises(ValueError):
+        TranspositionTable(policy="fifo")
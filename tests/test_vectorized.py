@@ -0,0 +1,41 @@
+import random
+
+import numpy as np
+import pytest
+
+import trump_ai
+import vectorized
+from trump import CARDS
+
+
+def test_replies_follow_suit():
+    rng = vectorized.default_rng(1)
+    kernel = vectorized.RolloutKernel(batch_size=64)
+    hands = np.stack([rng.permutation(52)[:39].reshape(3, 13) for _ in range(64)])
+    suit_call = rng.integers(0, 4, 64)
+    replies = kernel._replies(hands, suit_call, kernel._reply_keys_for(hands, rng))
+    for deal in range(64):
+        for seat in range(3):
+            hand = hands[deal, seat]
+            assert replies[deal, seat] in hand
+            if (hand // 13 == suit_call[deal]).any():
+                assert replies[deal, seat] // 13 == suit_call[deal]
+
+
+@pytest.mark.parametrize("common", [False, True])
+@pytest.mark.parametrize("trick_length", [0, 2])
+def test_numpy_engine_matches_python_engine(common, trick_length):
+    rng = random.Random(2)
+    hand = rng.sample(CARDS, 13)
+    trick = [card.index for card in rng.sample([card for card in CARDS if card not in hand],
+                                               trick_length)]
+    cards_not_played = [card.index for card in CARDS if card not in hand and card.index not in trick]
+    candidates = hand[:4]
+    iteration = 20000
+    winners = vectorized.RolloutKernel().trick_winners(
+        [card.index for card in candidates], iteration, cards_not_played, 13, trick=trick,
+        trump_suit=2, rng=vectorized.default_rng(3), common=common)
+    for card, row in zip(candidates, winners):
+        expected = trump_ai._trick_wins(card, iteration, cards_not_played, 13, trick=trick,
+                                        trump_suit=2, rng=rng) / iteration
+        assert abs((row == trick_length).mean() - expected) < 0.02